@@ -5,6 +5,7 @@ import { updateLanguage } from './i18n.js';
 // --- State Management ---
 const state = {
     sessionId: null,
+    sessionToken: null,
     currentQuestion: null,
     questionCount: 0,
     totalQuestions: 25,
@@ -133,6 +134,7 @@ async function handleStartTest(e) {
 
         const data = await response.json();
         state.sessionId = data.session_id;
+        state.sessionToken = data.session_token || null;
         state.totalQuestions = data.total_questions;
 
         loadNextQuestion(data.first_question);
@@ -159,6 +161,7 @@ async function handleSubmitAnswer() {
             body: JSON.stringify({
                 user_id: state.userContext.userId,
                 session_id: state.sessionId,
+                session_token: state.sessionToken,
                 question_id: state.currentQuestion.id,
                 answer: answer
             })
@@ -167,6 +170,7 @@ async function handleSubmitAnswer() {
         if (!response.ok) throw new Error('Failed to submit answer');
 
         const data = await response.json();
+        state.sessionToken = data.session_token || null;
 
         if (data.is_finished) {
             showResults(data.results);
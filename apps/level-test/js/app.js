@@ -124,25 +124,40 @@ const App = {
             const totalTimeSpent = AppState.getTotalTimeSpent();
             const isOvertime = totalTimeSpent > CONFIG.TIMER.DURATION;
 
-            // API로 제출 (시간 정보 포함)
-            const data = await API.submitAnswers(answers, {
+            // API로 제출 (시간 정보 포함, 스트리밍)
+            // 채점 결과가 도착하면 바로 결과 화면을 표시하고, 해설/분석은 도착하는 대로 채움
+            const data = await API.submitAnswersStream(answers, {
                 total_time_spent: totalTimeSpent,
                 time_limit: CONFIG.TIMER.DURATION,
                 is_overtime: isOvertime
+            }, {
+                onGraded: (graded) => {
+                    UI.displayResults(graded);
+                    UI.showSection('result');
+                    UI.hideModal();
+
+                    // ⭐ 결과 페이지 맨 위로 스크롤
+                    window.scrollTo({ top: 0, behavior: 'smooth' });
+                },
+                onExplanation: (explanation) => {
+                    UI.updateExplanation(explanation.problem_id, explanation.ai_solution);
+                },
+                onAnalysis: (analysis) => {
+                    UI.updateAnalysisReport(analysis.ai_analysis_report);
+                }
             });
 
+            // 끝내 도착하지 않은 해설/분석은 작성 중 안내 대신 대기/실패 안내로 교체
+            UI.finishStreamedResults(data);
+
             // 상태에 결과 저장
             AppState.setResults(data.test_results, data.ai_analysis_report);
 
-            // UI에 결과 표시
-            UI.displayResults(data);
-            UI.showSection('result');
-            UI.hideModal();
-
-            // ⭐ 결과 페이지 맨 위로 스크롤
-            window.scrollTo({ top: 0, behavior: 'smooth' });
-
-            console.log('답안 제출 및 분석 완료');
+            if (data.stream_error) {
+                console.warn('채점 이후 해설/분석 스트림 오류:', data.stream_error);
+            } else {
+                console.log('답안 제출 및 분석 완료');
+            }
 
         } catch (error) {
             UI.hideModal();
@@ -22,6 +22,11 @@ const CONFIG = {
     ERROR_MESSAGES: {
         NO_PROBLEMS: 'DB에서 문제를 불러오지 못했습니다.',
         NO_ANSWERS: '제출된 답안이 없습니다.',
-        SERVER_ERROR: '서버 오류가 발생했습니다.'
-    }
+        SERVER_ERROR: '서버 오류가 발생했습니다.',
+        EXPLANATION_UNAVAILABLE: '해설을 불러오지 못했습니다. 잠시 후 다시 확인해주세요.',
+        ANALYSIS_UNAVAILABLE: 'AI 분석을 불러오지 못했습니다. 잠시 후 다시 확인해주세요.'
+    },
+
+    // 마감 시간 안에 끝나지 않은 해설 안내 (백엔드 AI_SOLUTION_PENDING_MESSAGE와 동일)
+    EXPLANATION_PENDING_MESSAGE: '해설을 생성하고 있습니다. 잠시 후 다시 확인해주세요.'
 };
\ No newline at end of file
@@ -66,5 +66,118 @@ const API = {
             console.error('답안 제출 실패:', error);
             throw error;
         }
+    },
+
+    /**
+     * 답안 제출 및 AI 분석 스트리밍 요청 (Server-Sent Events)
+     * 채점 결과를 먼저 받고, 해설/약점 분석은 완료되는 대로 전달받음
+     * @param {Array} answers - 답안 리스트
+     * @param {Object} timeInfo - 시간 정보 (optional)
+     * @param {Object} handlers - { onGraded, onExplanation, onAnalysis }
+     * @returns {Promise<Object>} 최종 결과 (submitAnswers 응답과 동일한 형태)
+     *          graded 이후에 스트림이 오류로 끝나면 예외 대신 stream_error에 메시지를 담아 반환
+     */
+    async submitAnswersStream(answers, timeInfo = null, handlers = {}) {
+        const payload = { answers };
+
+        if (timeInfo) {
+            payload.total_time_spent = timeInfo.total_time_spent;
+            payload.time_limit = timeInfo.time_limit;
+            payload.is_overtime = timeInfo.is_overtime;
+        }
+
+        const response = await fetch(`${CONFIG.API_URL}/submit_and_analyze/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(payload)
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || `서버 오류: ${response.status}`);
+        }
+
+        const result = {
+            session_id: null,
+            test_results: [],
+            ai_analysis_report: null,
+            pending_explanations: [],
+            stream_error: null
+        };
+        let graded = false;
+
+        try {
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'graded') {
+                    graded = true;
+                    result.session_id = data.session_id;
+                    result.test_results = data.test_results;
+                    if (handlers.onGraded) handlers.onGraded(result);
+                } else if (event === 'explanation') {
+                    const target = result.test_results.find(r => r.id === data.problem_id);
+                    if (target) {
+                        target.ai_solution = data.ai_solution;
+                        target.ai_solution_status = 'ready';
+                    }
+                    if (handlers.onExplanation) handlers.onExplanation(data);
+                } else if (event === 'analysis') {
+                    result.ai_analysis_report = data.ai_analysis_report;
+                    if (handlers.onAnalysis) handlers.onAnalysis(data);
+                } else if (event === 'done') {
+                    result.pending_explanations = data.pending_explanations || [];
+                } else if (event === 'error') {
+                    throw new Error(data.error || CONFIG.ERROR_MESSAGES.SERVER_ERROR);
+                }
+            });
+        } catch (error) {
+            // 채점 결과 이후의 오류는 제출 실패가 아님 - 남은 해설/분석만 받지 못한 것으로 처리
+            if (!graded) throw error;
+            result.stream_error = error.message;
+        }
+
+        return result;
+    },
+
+    /**
+     * text/event-stream 응답 파싱
+     * @param {Response} response - fetch 응답
+     * @param {Function} onEvent - (event, data) 콜백
+     */
+    async readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // 이벤트는 빈 줄로 구분됨
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                const dataLines = [];
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        dataLines.push(line.slice(6));
+                    }
+                });
+
+                // keep-alive 주석 등 데이터 없는 이벤트는 무시
+                if (dataLines.length > 0) {
+                    onEvent(event, JSON.parse(dataLines.join('\n')));
+                }
+            }
+        }
     }
 };
\ No newline at end of file
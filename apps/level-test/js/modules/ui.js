@@ -191,12 +191,8 @@ const UI = {
      * 결과 표시
      */
     displayResults(data) {
-        // AI 종합 분석
-        const formattedReport = this.formatText(data.ai_analysis_report || "AI 분석 리포트가 없습니다.");
-        this.elements.analysisReportDiv.innerHTML = `
-            <h3 class="text-xl font-semibold text-blue-900 mb-2">종합 진단</h3>
-            <div class="text-base">${formattedReport}</div>
-        `;
+        // AI 종합 분석 (스트리밍 중에는 분석 완료 전까지 안내 문구 표시)
+        this.updateAnalysisReport(data.ai_analysis_report);
 
         // 문항별 해설
         this.elements.resultDetailsDiv.innerHTML =
@@ -221,7 +217,58 @@ const UI = {
         KatexRenderer.renderInElements(explanations);
         KatexRenderer.renderInElements(reports);
     },
+
+    /**
+     * AI 종합 분석 갱신
+     * @param {string|null} report - 분석 리포트 (null이면 분석 중 안내)
+     */
+    updateAnalysisReport(report) {
+        const formattedReport = report === null || report === undefined
+            ? 'AI가 학습 약점을 분석하고 있습니다...'
+            : this.formatText(report || "AI 분석 리포트가 없습니다.");
+        this.elements.analysisReportDiv.innerHTML = `
+            <h3 class="text-xl font-semibold text-blue-900 mb-2">종합 진단</h3>
+            <div class="text-base">${formattedReport}</div>
+        `;
+        KatexRenderer.renderInElements(this.elements.analysisReportDiv.querySelectorAll('.text-base'));
+    },
+
+    /**
+     * 문항별 AI 해설 갱신
+     * @param {string} problemId - 문제 ID
+     * @param {string} solution - AI 해설
+     */
+    updateExplanation(problemId, solution) {
+        const explanationEl = this.elements.resultDetailsDiv.querySelector(
+            `.ai-explanation[data-problem-id="${problemId}"]`
+        );
+        if (!explanationEl) return;
+
+        explanationEl.innerHTML = this.formatText(solution);
+        KatexRenderer.renderInElements([explanationEl]);
+    },
     
+    /**
+     * 스트림 종료 후 도착하지 않은 해설/분석의 안내 문구 교체
+     * (마감 시간을 넘긴 해설은 생성 중 안내, 그 밖에 받지 못한 해설/분석은 실패 안내)
+     * @param {Object} data - submitAnswersStream 결과
+     */
+    finishStreamedResults(data) {
+        data.test_results.forEach(result => {
+            if (result.is_correct || result.ai_solution_status === 'ready') return;
+
+            const pending = !data.stream_error && data.pending_explanations.includes(result.id);
+            this.updateExplanation(
+                result.id,
+                pending ? CONFIG.EXPLANATION_PENDING_MESSAGE : CONFIG.ERROR_MESSAGES.EXPLANATION_UNAVAILABLE
+            );
+        });
+
+        if (data.ai_analysis_report === null) {
+            this.updateAnalysisReport(CONFIG.ERROR_MESSAGES.ANALYSIS_UNAVAILABLE);
+        }
+    },
+
     /**
      * 결과 요소 생성
      */
@@ -243,8 +290,11 @@ const UI = {
                 <p class="mt-2 text-green-700 text-sm sm:text-base"><b>정답:</b> ${result.correct_answer}</p>
             `;
         } else {
-            // ⭐ AI 해설을 formatText로 처리
-            const formattedSolution = this.formatText(result.ai_solution || "해설 생성 중 오류가 발생했습니다.");
+            // ⭐ AI 해설을 formatText로 처리 (스트리밍 중에는 해설 도착 전까지 안내 문구 표시)
+            const solutionText = 'ai_solution' in result
+                ? (result.ai_solution || "해설 생성 중 오류가 발생했습니다.")
+                : "AI 튜터가 해설을 작성하고 있습니다...";
+            const formattedSolution = this.formatText(solutionText);
 
             resultEl.innerHTML = `
                 <h4 class="text-base sm:text-lg font-semibold text-red-800">
@@ -257,7 +307,7 @@ const UI = {
                 </p>
                 <div class="mt-3 sm:mt-4 pt-3 sm:pt-4 border-t border-red-200">
                     <h5 class="font-semibold text-red-900 mb-2 text-sm sm:text-base">AI 튜터의 해설</h5>
-                    <div class="ai-explanation text-gray-700 whitespace-pre-wrap break-words max-w-full overflow-wrap-anywhere text-sm sm:text-base">
+                    <div data-problem-id="${result.id}" class="ai-explanation text-gray-700 whitespace-pre-wrap break-words max-w-full overflow-wrap-anywhere text-sm sm:text-base">
                         ${formattedSolution}
                     </div>
                 </div>
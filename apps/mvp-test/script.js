@@ -253,11 +253,11 @@ async function submitAnswers() {
     const totalTimeSpent = getTotalTimeSpent();
     const isOvertime = totalTimeSpent > TIMER_CONFIG.DURATION;
 
-    // 2. Python 백엔드로 전송
+    // 2. Python 백엔드로 전송 (스트리밍: 채점 결과 → 문항별 해설 → 약점 분석 순으로 수신)
     try {
-        const response = await fetch(`${API_URL}/submit_and_analyze`, {
+        const response = await fetch(`${API_URL}/submit_and_analyze/stream`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
             body: JSON.stringify({
                 user_id: userId,  // 로그인 사용자 또는 게스트 ID
                 is_guest: isGuest,  // 게스트 여부
@@ -277,16 +277,24 @@ async function submitAnswers() {
             throw new Error(errorData.error || `서버 오류: ${response.status}`);
         }
 
-        const data = await response.json();
-
-        // 로딩 모달 숨김
-        hideLoadingModal();
-
-        // 3. 결과 표시
-        displayResults(data);
-        problemSection.classList.add('hidden');
-        resultSection.classList.remove('hidden');
-        messageDiv.innerHTML = ''; // 성공
+        await readEventStream(response, (event, data) => {
+            if (event === 'graded') {
+                // 로딩 모달 숨김
+                hideLoadingModal();
+
+                // 3. 결과 표시 (해설/분석은 도착하는 대로 채움)
+                displayResults(data);
+                problemSection.classList.add('hidden');
+                resultSection.classList.remove('hidden');
+                messageDiv.innerHTML = ''; // 성공
+            } else if (event === 'explanation') {
+                updateExplanation(data.problem_id, data.ai_solution);
+            } else if (event === 'analysis') {
+                updateAnalysisReport(data.ai_analysis_report);
+            } else if (event === 'error') {
+                throw new Error(data.error || '서버 오류가 발생했습니다.');
+            }
+        });
 
     } catch (error) {
         console.error('Error submitting answers:', error);
@@ -296,13 +304,65 @@ async function submitAnswers() {
     }
 }
 
-// 결과 페이지 표시
-function displayResults(data) {
-    // M4: AI 종합 분석
+// text/event-stream 응답 파싱 (이벤트는 빈 줄로 구분됨)
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            const dataLines = [];
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    dataLines.push(line.slice(6));
+                }
+            });
+
+            // keep-alive 주석 등 데이터 없는 이벤트는 무시
+            if (dataLines.length > 0) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
+// AI 종합 분석 갱신 (null이면 분석 중 안내)
+function updateAnalysisReport(report) {
+    const text = report === null || report === undefined
+        ? 'AI가 학습 약점을 분석하고 있습니다...'
+        : (report || "AI 분석 리포트가 없습니다.");
     analysisReportDiv.innerHTML = `
         <h3 class="text-xl font-semibold text-blue-900 mb-2">종합 진단</h3>
-        <p class="text-base">${data.ai_analysis_report || "AI 분석 리포트가 없습니다."}</p>
+        <p class="text-base">${text}</p>
     `;
+}
+
+// 문항별 AI 해설 갱신
+function updateExplanation(problemId, solution) {
+    const explanationEl = resultDetailsDiv.querySelector(`.ai-explanation[data-problem-id="${problemId}"]`);
+    if (!explanationEl) return;
+
+    explanationEl.innerHTML = solution;
+    renderKatexInElements([explanationEl]);
+}
+
+// 결과 페이지 표시
+function displayResults(data) {
+    // M4: AI 종합 분석
+    updateAnalysisReport(data.ai_analysis_report);
 
     // M3: 문항별 해설
     resultDetailsDiv.innerHTML = '<h3 class="text-xl font-semibold text-gray-800 mb-4 border-b pb-2">문항별 상세 해설</h3>';
@@ -335,7 +395,7 @@ function displayResults(data) {
                         서버가 보내는 키는 'ai_solution'입니다.
                         'ai_explanation'을 'ai_solution'으로 변경합니다.
                     -->
-                    <div class="ai-explanation text-gray-700">${result.ai_solution || "해설 생성 중 오류가 발생했습니다."}</div>
+                    <div data-problem-id="${result.id}" class="ai-explanation text-gray-700">${'ai_solution' in result ? (result.ai_solution || "해설 생성 중 오류가 발생했습니다.") : "AI 튜터가 해설을 작성하고 있습니다..."}</div>
                 </div>
             `;
         }
@@ -5,8 +5,10 @@ from flask_cors import CORS
 from config import Config
 from utils.logger import setup_logger
 from utils.firebase_client import initialize_firebase
+from utils.firestore_metrics import instrument_firestore
 from utils.ai_client import initialize_ai_client
 from routes.api_routes import create_api_routes
+from middleware.firestore_metrics_middleware import register_firestore_metrics
 
 # 로거 설정
 logger = setup_logger(__name__)
@@ -43,6 +45,11 @@ def create_app():
     if not db:
         logger.error("Firebase 초기화 실패 - DB 기능이 제한됩니다.")
         # sys.exit(1) # 디버깅을 위해 서버 다운 방지
+
+    # Firestore 읽기/쓰기 계측 (메서드별/요청별 집계, N+1 경고)
+    if Config.FIRESTORE_METRICS_ENABLED:
+        db = instrument_firestore(db)
+        register_firestore_metrics(app)
     
     # AI 클라이언트 초기화
     ai_client = initialize_ai_client()
@@ -0,0 +1,257 @@
+"""
+Synthetic student simulator and throughput benchmark for AdaptiveTestService.
+
+Drives simulated students through start_test/submit_answer against the in-memory
+Firestore fake (testing.fake_firestore) and the stub model provider
+(utils.model_provider, AI_PROVIDER=stub: no network, no cost), then reports
+throughput, per-call latency percentiles, Firestore reads/writes per test,
+generation fallbacks per test and circuit breaker state as JSON that can be
+diffed between commits. Model latency and 429/500/empty-reply rates are
+configurable so retry and breaker behaviour can be exercised under load.
+
+Usage (from backend/):
+    python -m benchmarks.adaptive_simulator --students 2000 --concurrency 32 --output bench.json
+    python -m benchmarks.adaptive_simulator --engine irt --session-mode token --index off
+    python -m benchmarks.adaptive_simulator --model-rate-429 0.05 --model-rate-500 0.02 --model-rate-empty 0.01 --output faults.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import Config
+from services.irt_engine import item_params, probability
+from testing.fake_firestore import FakeFirestore
+from utils.circuit_breaker import FallbackText, breaker_snapshots
+from utils.model_provider import CHOICE_IDS, LATENCY_DISTRIBUTIONS
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+
+
+# ==================== Simulation ====================
+
+def _percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))] * 1000, 3)
+    return {'count': len(ordered), 'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p50': pick(50), 'p95': pick(95), 'p99': pick(99)}
+
+
+def seed_questions(db: FakeFirestore, systems, grades, per_cell: int, calibrated: bool):
+    questions = {}
+    for system in systems:
+        for grade in grades:
+            for difficulty in DIFFICULTIES:
+                for n in range(per_cell):
+                    data = {
+                        'curriculum_system': system, 'grade': grade, 'difficulty': difficulty,
+                        'topic': 'Algebra', 'subtopic': 'Linear Equations',
+                        'text_latex': f"Seeded {difficulty} question {n}",
+                        'choices': [{'id': c, 'text': c} for c in CHOICE_IDS],
+                        'correct_answer': random.choice(CHOICE_IDS),
+                        'random_key': random.random(),
+                        'created_at': datetime.now(timezone.utc)
+                    }
+                    if calibrated:
+                        _, b = item_params(data)
+                        data.update(irt_a=round(random.uniform(0.7, 2.0), 3), irt_b=round(b + random.gauss(0, 0.5), 3))
+                    questions[f"{system}_{grade}_{difficulty}_{n}"] = data
+    db.load('questions', questions)
+
+
+class Simulator:
+    def __init__(self, args):
+        self.args = args
+        self.db = FakeFirestore(
+            read_latency=self._latency(args.firestore_read_ms),
+            write_latency=self._latency(args.firestore_write_ms)
+        )
+        self.model = None
+        self.latencies = {'start_test': [], 'submit_answer': [], 'test': []}
+        self.fallbacks = 0
+        self.errors = 0
+        self.questions_answered = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _latency(median_ms: float):
+        """Lognormal Firestore latency around a median, or None for no delay."""
+        if not median_ms:
+            return None
+        return lambda: median_ms / 1000.0 * math.exp(random.gauss(0, 0.3))
+
+    def build_service(self):
+        Config.ADAPTIVE_ENGINE = self.args.engine
+        Config.ADAPTIVE_SESSION_MODE = self.args.session_mode
+        Config.QUESTION_INDEX_MODE = self.args.index
+        Config.QUESTION_POOL_ENABLED = False
+        Config.SUMMARY_CACHE_PERSIST = False
+        if not Config.SESSION_TOKEN_SECRET:
+            Config.SESSION_TOKEN_SECRET = 'simulator'
+        Config.AI_PROVIDER = 'stub'
+        Config.AI_STUB_LATENCY_DIST = self.args.model_latency_dist
+        Config.AI_STUB_LATENCY_MS = self.args.model_latency_ms
+        Config.AI_STUB_LATENCY_SIGMA = self.args.model_latency_sigma
+        Config.AI_STUB_RATE_429 = self.args.model_rate_429
+        Config.AI_STUB_RATE_500 = self.args.model_rate_500
+        Config.AI_STUB_RATE_EMPTY = self.args.model_rate_empty
+        Config.AI_STUB_SEED = self.args.seed
+
+        from services.adaptive_test_service import AdaptiveTestService
+        service = AdaptiveTestService(self.db)
+        self.model = service.question_service.model
+        index = service.question_service.index
+        if index is not None:
+            deadline = time.monotonic() + 30
+            while not index.ready and time.monotonic() < deadline:
+                time.sleep(0.05)
+        return service
+
+    def _timed(self, name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        with self._lock:
+            self.latencies[name].append(time.perf_counter() - started)
+        return result
+
+    def _answer(self, question: Dict[str, Any], ability: float) -> str:
+        stored = self.db.peek(f"questions/{question['id']}") or {}
+        correct = stored.get('correct_answer', 'A')
+        a, b = item_params(dict(question, **{k: stored[k] for k in ('irt_a', 'irt_b') if k in stored}))
+        p = float(probability(np.array([a]), np.array([b]), np.array([ability]))[0, 0])
+        if random.random() < p:
+            return correct
+        return random.choice([c for c in CHOICE_IDS if c != correct])
+
+    def run_student(self, service, student: int):
+        ability = random.gauss(self.args.ability_mean, self.args.ability_sd)
+        user_context = {'user_id': f"sim_{student}", 'system': random.choice(self.args.systems),
+                        'grade': random.choice(self.args.grades)}
+        started = time.perf_counter()
+        try:
+            result = self._timed('start_test', service.start_test, user_context)
+            session_id, token, question = result['session_id'], result.get('session_token'), result['first_question']
+            answered = 0
+            while True:
+                result = self._timed('submit_answer', service.submit_answer, session_id, question['id'],
+                                     self._answer(question, ability), session_token=token)
+                answered += 1
+                if result['is_finished']:
+                    break
+                token, question = result.get('session_token'), result['next_question']
+
+            results = result['results']
+            fallbacks = sum(isinstance(a.get('explanation'), FallbackText) for a in results['answer_history'])
+            fallbacks += isinstance(results.get('recommendation_text'), FallbackText)
+            with self._lock:
+                self.fallbacks += fallbacks
+                self.questions_answered += answered
+                self.latencies['test'].append(time.perf_counter() - started)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Simulated student {student} failed: {e}", file=sys.stderr)
+
+    def run(self) -> Dict[str, Any]:
+        random.seed(self.args.seed)
+        seed_questions(self.db, self.args.systems, self.args.grades, self.args.questions_per_cell,
+                       calibrated=self.args.calibrated)
+        service = self.build_service()
+        self.db.reset_counts()
+        model_calls_before = self.model.snapshot().get('calls', 0)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            list(pool.map(lambda n: self.run_student(service, n), range(self.args.students)))
+        elapsed = time.perf_counter() - started
+        service.sessions.flush()
+
+        completed = len(self.latencies['test'])
+        model_stats = self.model.snapshot()
+        per_test = (lambda value: round(value / completed, 3) if completed else None)
+        return {
+            'config': {k: v for k, v in sorted(vars(self.args).items()) if k not in ('output', 'verbose')},
+            'completed_tests': completed,
+            'errors': self.errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput': {
+                'tests_per_second': round(completed / elapsed, 3) if elapsed else None,
+                'answers_per_second': round(self.questions_answered / elapsed, 3) if elapsed else None
+            },
+            'latency_ms': {name: _percentiles(samples) for name, samples in self.latencies.items()},
+            'per_test': {
+                'questions': per_test(self.questions_answered),
+                'firestore_reads': per_test(self.db.reads),
+                'firestore_writes': per_test(self.db.writes),
+                'firestore_ops': {op: per_test(n) for op, n in sorted(self.db.ops.items())},
+                'model_calls': per_test(model_stats.get('calls', 0) - model_calls_before),
+                'questions_generated': per_test(service.question_service.generation_stats['generated']),
+                'generation_fallbacks': per_test(self.fallbacks)
+            },
+            'prefetch': service.prefetch_stats,
+            'model': model_stats,
+            'breakers': breaker_snapshots(),
+            'engine': service.engine.snapshot() if service.engine is not None else None
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--ability-mean', type=float, default=0.0)
+    parser.add_argument('--ability-sd', type=float, default=1.0)
+    parser.add_argument('--systems', nargs='+', default=['US'])
+    parser.add_argument('--grades', nargs='+', default=['7', '8', '9'])
+    parser.add_argument('--questions-per-cell', type=int, default=50)
+    parser.add_argument('--calibrated', action='store_true', help='seed questions with irt_a/irt_b')
+    parser.add_argument('--engine', choices=['label', 'irt'], default=Config.ADAPTIVE_ENGINE)
+    parser.add_argument('--session-mode', choices=['memory', 'firestore', 'token'], default=Config.ADAPTIVE_SESSION_MODE)
+    parser.add_argument('--index', choices=['listener', 'poll', 'off'], default='listener')
+    parser.add_argument('--firestore-read-ms', type=float, default=0.0, help='median injected Firestore read latency')
+    parser.add_argument('--firestore-write-ms', type=float, default=0.0, help='median injected Firestore write latency')
+    parser.add_argument('--model-latency-dist', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--model-latency-ms', type=float, default=800.0, help='median stub model latency')
+    parser.add_argument('--model-latency-sigma', type=float, default=0.5, help='lognormal sigma of stub latency')
+    parser.add_argument('--model-rate-429', type=float, default=0.0, help='share of stub calls failing with 429')
+    parser.add_argument('--model-rate-500', type=float, default=0.0, help='share of stub calls failing with 500')
+    parser.add_argument('--model-rate-empty', type=float, default=0.0, help='share of stub calls returning no text')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--verbose', action='store_true', help='keep service INFO logs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    report = Simulator(args).run()
+    text = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
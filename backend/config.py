@@ -14,7 +14,19 @@ class Config:
     # MODEL_PRO = os.getenv('MODEL_NAME_PRO', 'gemini-2.5-pro')
     MODEL_FLASH = os.getenv('MODEL_NAME_FLASH', 'gemini-2.5-flash')
     AI_LOCATION = os.getenv('AI_LOCATION', 'us-central1')
-    
+
+    # 생성 모델 공급자 (vertex: Vertex AI / stub: 로컬 고정 응답 모델, 과금·네트워크 없음)
+    AI_PROVIDER = os.getenv('AI_PROVIDER', 'vertex')
+    # stub 모델 지연 분포 (fixed / uniform / lognormal / exponential), 중앙값(ms), lognormal sigma
+    AI_STUB_LATENCY_DIST = os.getenv('AI_STUB_LATENCY_DIST', 'lognormal')
+    AI_STUB_LATENCY_MS = float(os.getenv('AI_STUB_LATENCY_MS', 800))
+    AI_STUB_LATENCY_SIGMA = float(os.getenv('AI_STUB_LATENCY_SIGMA', 0.5))
+    # stub 모델 오류 주입 비율 (호출당 429 / 500 / 빈 응답 확률), 난수 seed
+    AI_STUB_RATE_429 = float(os.getenv('AI_STUB_RATE_429', 0))
+    AI_STUB_RATE_500 = float(os.getenv('AI_STUB_RATE_500', 0))
+    AI_STUB_RATE_EMPTY = float(os.getenv('AI_STUB_RATE_EMPTY', 0))
+    AI_STUB_SEED = int(os.getenv('AI_STUB_SEED', 0))
+
     # CORS 설정
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://my-mvp-backend.web.app')
     WIX_SITE_URL = os.getenv('WIX_SITE_URL', 'https://www.mathiter.com')
@@ -22,7 +34,135 @@ class Config:
     # 서버 설정
     PORT = int(os.getenv('PORT', 5001))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
-    
+    # 내부 계측 엔드포인트(/debug/ai_metrics) 노출 여부 (기본값: DEBUG, 꺼져 있으면 404)
+    DEBUG_METRICS_ENABLED = os.getenv('DEBUG_METRICS_ENABLED', str(DEBUG)).lower() == 'true'
+
+    # AI 호출 동시성 설정 (비동기 클라이언트 전역 제한, 시도별 타임아웃 초)
+    AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 16))
+    AI_CALL_TIMEOUT = float(os.getenv('AI_CALL_TIMEOUT', 60))
+    # 동기 AI 호출(call_ai_with_retry)을 시도별 타임아웃과 함께 실행하는 스레드 수
+    AI_SYNC_CALL_WORKERS = int(os.getenv('AI_SYNC_CALL_WORKERS', 32))
+
+    # 요청 마감 시간 예산 (Cloud Run 요청 타임아웃보다 짧게, 재시도는 이 안에서만)
+    REQUEST_TIME_BUDGET = float(os.getenv('REQUEST_TIME_BUDGET', 100))
+    # 관측값이 없을 때 AI 호출 1회 예상 소요 시간 (재시도 조기 포기 판단용)
+    AI_EXPECTED_CALL_TIME = float(os.getenv('AI_EXPECTED_CALL_TIME', 8))
+
+    # Vertex AI 서킷 브레이커 (롤링 윈도우 오류율/지연 기준, open 상태에서는 대체 문구로 즉시 응답)
+    CIRCUIT_WINDOW = float(os.getenv('CIRCUIT_WINDOW', 60))
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', 10))
+    CIRCUIT_ERROR_RATE = float(os.getenv('CIRCUIT_ERROR_RATE', 0.5))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', 20))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv('CIRCUIT_SLOW_CALL_RATE', 0.5))
+    CIRCUIT_OPEN_DURATION = float(os.getenv('CIRCUIT_OPEN_DURATION', 30))
+
+    # AI 헤지 요청 (호출 지점별 지연 백분위까지 응답이 없으면 같은 요청을 한 번 더 전송)
+    AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'False').lower() == 'true'
+    AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', 95))
+    AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20))
+    AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', 1.0))
+    AI_HEDGE_BUDGET = float(os.getenv('AI_HEDGE_BUDGET', 0.1))  # 헤지 요청 수 / 호출 수 상한
+    AI_HEDGE_WORKERS = int(os.getenv('AI_HEDGE_WORKERS', 16))
+
+    # AI 해설 병렬 생성 설정
+    AI_SOLUTION_WORKERS = int(os.getenv('AI_SOLUTION_WORKERS', 8))
+    AI_SOLUTION_DEADLINE = float(os.getenv('AI_SOLUTION_DEADLINE', 45))
+    AI_SOLUTION_PENDING_MESSAGE = "해설을 생성하고 있습니다. 잠시 후 다시 확인해주세요."
+
+    # AI 장애 시 대체 문구 (서킷 open, 재시도 실패)
+    AI_FALLBACK_SOLUTION = "AI 해설 서비스가 일시적으로 지연되고 있습니다. 잠시 후 다시 확인해주세요."
+    AI_FALLBACK_ANALYSIS = "AI 약점 분석 서비스가 일시적으로 지연되고 있습니다. 틀린 문제의 해설을 먼저 복습해보세요."
+
+    # 해설 프롬프트 버전 (프롬프트 변경 시 올려서 single-flight/캐시 키 분리)
+    SOLUTION_PROMPT_VERSION = os.getenv('SOLUTION_PROMPT_VERSION', 'v1')
+
+    # 동일 문제 해설 중복 생성 방지 (single-flight)
+    # local: 프로세스 내 / firestore: Firestore 리스 문서 / redis: REDIS_URL
+    SINGLE_FLIGHT_BACKEND = os.getenv('SINGLE_FLIGHT_BACKEND', 'local')
+    SINGLE_FLIGHT_LEASE_TTL = float(os.getenv('SINGLE_FLIGHT_LEASE_TTL', 60))
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', 1.0))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    # 약점 분석 응답 캐시 (카테고리 멀티셋 + 시간 버킷 + 프롬프트 버전 기준)
+    ANALYSIS_PROMPT_VERSION = os.getenv('ANALYSIS_PROMPT_VERSION', 'v1')
+    WEAKNESS_CACHE_SIZE = int(os.getenv('WEAKNESS_CACHE_SIZE', 1024))
+    WEAKNESS_CACHE_TTL = int(os.getenv('WEAKNESS_CACHE_TTL', 7 * 24 * 3600))
+    WEAKNESS_CACHE_PERSIST = os.getenv('WEAKNESS_CACHE_PERSIST', 'False').lower() == 'true'
+
+    # 적응형 테스트 종료 요약 캐시 (학년/점수/토픽 정확도 버킷/최종 난이도 기준)
+    SUMMARY_PROMPT_VERSION = os.getenv('SUMMARY_PROMPT_VERSION', 'v1')
+    SUMMARY_ACCURACY_BUCKET = int(os.getenv('SUMMARY_ACCURACY_BUCKET', 25))
+    SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 2048))
+    SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', 7 * 24 * 3600))
+    SUMMARY_CACHE_PERSIST = os.getenv('SUMMARY_CACHE_PERSIST', 'False').lower() == 'true'
+
+    # 비동기 분석 작업 (submit_and_analyze?mode=job) 설정
+    ANALYSIS_JOB_WORKERS = int(os.getenv('ANALYSIS_JOB_WORKERS', 4))
+    ANALYSIS_JOB_DEADLINE = float(os.getenv('ANALYSIS_JOB_DEADLINE', 300))
+    ANALYSIS_JOB_TTL = int(os.getenv('ANALYSIS_JOB_TTL', 3600))
+
+    # SSE 스트리밍 (submit_and_analyze/stream) keep-alive 간격 (초)
+    SSE_KEEPALIVE_INTERVAL = float(os.getenv('SSE_KEEPALIVE_INTERVAL', 15))
+
+    # 적응형 문제 warm pool (셀별 재고가 LOW_WATERMARK 미만이면 TARGET까지 백그라운드 생성, Vertex 과금 발생)
+    # 인스턴스 간 조정은 SINGLE_FLIGHT_BACKEND 리스로 셀 단위 수행 (local이면 인스턴스마다 따로 보충)
+    QUESTION_POOL_ENABLED = os.getenv('QUESTION_POOL_ENABLED', 'False').lower() == 'true'
+    QUESTION_POOL_LOW_WATERMARK = int(os.getenv('QUESTION_POOL_LOW_WATERMARK', 10))
+    QUESTION_POOL_TARGET = int(os.getenv('QUESTION_POOL_TARGET', 20))
+    QUESTION_POOL_WORKERS = int(os.getenv('QUESTION_POOL_WORKERS', 2))
+    QUESTION_POOL_RATE_PER_MINUTE = float(os.getenv('QUESTION_POOL_RATE_PER_MINUTE', 20))
+    QUESTION_POOL_MAX_PENDING = int(os.getenv('QUESTION_POOL_MAX_PENDING', 100))
+    QUESTION_POOL_CHECK_INTERVAL = float(os.getenv('QUESTION_POOL_CHECK_INTERVAL', 300))
+    # 셀 보충 리스 유지 시간 (초, 한 번의 보충이 이 안에 끝나야 다른 인스턴스가 중복 생성하지 않음)
+    QUESTION_POOL_LEASE_TTL = float(os.getenv('QUESTION_POOL_LEASE_TTL', 600))
+
+    # 문제 은행 인메모리 인덱스 (listener: Firestore 스냅샷 리스너 / poll: 주기적 증분 조회 / off)
+    QUESTION_INDEX_MODE = os.getenv('QUESTION_INDEX_MODE', 'listener')
+    QUESTION_INDEX_POLL_INTERVAL = float(os.getenv('QUESTION_INDEX_POLL_INTERVAL', 60))
+    QUESTION_INDEX_FULL_RELOAD = float(os.getenv('QUESTION_INDEX_FULL_RELOAD', 3600))
+
+    # 인덱스 미준비 시 Firestore random_key 범위 조회로 읽는 후보 수 (고정, 제외할 문제는 읽은 뒤 거름)
+    # / 읽은 후보가 모두 제외 대상이면 새 시작점으로 다시 조회하는 최대 횟수
+    QUESTION_SAMPLE_SIZE = int(os.getenv('QUESTION_SAMPLE_SIZE', 3))
+    QUESTION_SAMPLE_ATTEMPTS = int(os.getenv('QUESTION_SAMPLE_ATTEMPTS', 3))
+
+    # 적응형 테스트 다음 문제 선행 조회 (정답/오답 두 분기 모두 미리 조회, 세션별 캐시)
+    ADAPTIVE_PREFETCH_ENABLED = os.getenv('ADAPTIVE_PREFETCH_ENABLED', 'True').lower() == 'true'
+    ADAPTIVE_PREFETCH_WORKERS = int(os.getenv('ADAPTIVE_PREFETCH_WORKERS', 8))
+    ADAPTIVE_PREFETCH_CACHE_SIZE = int(os.getenv('ADAPTIVE_PREFETCH_CACHE_SIZE', 10000))
+    ADAPTIVE_PREFETCH_TTL = int(os.getenv('ADAPTIVE_PREFETCH_TTL', 1800))
+    ADAPTIVE_PREFETCH_WAIT = float(os.getenv('ADAPTIVE_PREFETCH_WAIT', 10))
+
+    # 적응형 테스트 종료 시 누락 해설 병렬 생성 마감 시간 (초, 넘으면 대체 문구 표시)
+    ADAPTIVE_EXPLANATION_DEADLINE = float(os.getenv('ADAPTIVE_EXPLANATION_DEADLINE', 20))
+
+    # 적응형 세션 저장 방식 (firestore: 매 단계 읽기/쓰기 / memory: 인메모리 + write-behind, sticky 라우팅 필요
+    # / token: 진행 상태를 HMAC 서명 토큰으로 클라이언트에 전달, 최종 결과만 저장, SESSION_TOKEN_SECRET 필요)
+    ADAPTIVE_SESSION_MODE = os.getenv('ADAPTIVE_SESSION_MODE', 'firestore')
+    ADAPTIVE_SESSION_FLUSH_INTERVAL = float(os.getenv('ADAPTIVE_SESSION_FLUSH_INTERVAL', 1.0))
+    ADAPTIVE_SESSION_CACHE_SIZE = int(os.getenv('ADAPTIVE_SESSION_CACHE_SIZE', 10000))
+    ADAPTIVE_SESSION_TTL = int(os.getenv('ADAPTIVE_SESSION_TTL', 3600))
+
+    # 적응형 세션 토큰 서명 키 (token 모드 필수, 모든 인스턴스가 같은 값 사용, 없으면 시작 시 오류) / 토큰 유효 시간 (초)
+    SESSION_TOKEN_SECRET = os.getenv('SESSION_TOKEN_SECRET', '')
+    SESSION_TOKEN_TTL = int(os.getenv('SESSION_TOKEN_TTL', 7200))
+
+    # 적응형 문항 선택 엔진 (label: 정답/오답에 따라 Easy/Medium/Hard 한 단계 이동 / irt: 2PL IRT 기반 CAT)
+    ADAPTIVE_ENGINE = os.getenv('ADAPTIVE_ENGINE', 'label')
+    # IRT CAT: 능력 추정 격자 점 수, 정보량 상위 N개 중 무작위 선택 (노출 제어), 최소/최대 문항 수, 조기 종료 표준오차
+    ADAPTIVE_IRT_GRID_POINTS = int(os.getenv('ADAPTIVE_IRT_GRID_POINTS', 81))
+    ADAPTIVE_IRT_RANDOMESQUE = int(os.getenv('ADAPTIVE_IRT_RANDOMESQUE', 5))
+    ADAPTIVE_IRT_MIN_ITEMS = int(os.getenv('ADAPTIVE_IRT_MIN_ITEMS', 3))
+    ADAPTIVE_IRT_MAX_ITEMS = int(os.getenv('ADAPTIVE_IRT_MAX_ITEMS', 10))
+    ADAPTIVE_IRT_SE_TARGET = float(os.getenv('ADAPTIVE_IRT_SE_TARGET', 0.45))
+
+    # Firestore 계측 (서비스 메서드별/요청별 읽기·쓰기·바이트·지연 집계, /debug/ai_metrics 의 firestore 항목)
+    FIRESTORE_METRICS_ENABLED = os.getenv('FIRESTORE_METRICS_ENABLED', 'True').lower() == 'true'
+    # 요청별 수치를 X-Firestore-* 응답 헤더로 노출 (기본값: DEBUG)
+    FIRESTORE_METRICS_HEADERS = os.getenv('FIRESTORE_METRICS_HEADERS', str(DEBUG)).lower() == 'true'
+    # 한 요청에서 같은 컬렉션 단건 get이 이 횟수 이상이면 N+1 의심 경고
+    FIRESTORE_N_PLUS_ONE_THRESHOLD = int(os.getenv('FIRESTORE_N_PLUS_ONE_THRESHOLD', 3))
+
     # AI 프롬프트
     SOLUTION_SYSTEM_PROMPT = (
         "당신은 세계 최고의 SAT 수학 튜터입니다. 학생이 방금 틀린 문제를 설명해줘야 합니다.\n\n"
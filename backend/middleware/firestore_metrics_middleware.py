@@ -0,0 +1,37 @@
+"""
+Firestore 요청별 계측 미들웨어
+"""
+from flask import g, request
+from config import Config
+from utils.firestore_metrics import get_metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def register_firestore_metrics(app, metrics=None):
+    """
+    요청마다 Firestore 사용량 계측을 시작/종료하는 훅 등록
+
+    - 엔드포인트별 누적 사용량과 N+1 의심 경고는 utils.firestore_metrics 에 집계
+    - FIRESTORE_METRICS_HEADERS 가 켜져 있으면 X-Firestore-* 응답 헤더로 요청별 수치 노출
+
+    Usage:
+        db = instrument_firestore(initialize_firebase())
+        register_firestore_metrics(app)
+    """
+    metrics = metrics or get_metrics()
+
+    @app.before_request
+    def _begin_firestore_metrics():
+        g.firestore_metrics = metrics.begin_request(request.endpoint or request.path)
+
+    @app.after_request
+    def _end_firestore_metrics(response):
+        handle = g.pop('firestore_metrics', None)
+        if handle is None:
+            return response
+        stats = metrics.end_request(handle)
+        if Config.FIRESTORE_METRICS_HEADERS:
+            response.headers.update(stats.headers())
+        return response
@@ -1,17 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_cors import CORS
 from google.cloud import firestore
+from config import Config
 from services.problem_service import ProblemService
 from services.grading_service import GradingService
 from services.ai_service import AIService
 from services.user_service import UserService
 from services.curriculum_service import CurriculumService
 from services.adaptive_test_service import AdaptiveTestService
+from services.adaptive_session_store import StaleSessionError
+from services.job_service import JobService
 from middleware.auth_middleware import verify_firebase_token
+from utils.circuit_breaker import breaker_snapshots
+from utils.firestore_metrics import firestore_snapshot
+from utils.hedging import call_site_snapshots
 from utils.logger import setup_logger
+from utils.single_flight import build_single_flight
+from utils.unit_of_work import UnitOfWork
+from utils.retry import Deadline
+from utils.session_token import InvalidSessionToken
+import copy
 import hmac
 import hashlib
+import json
 import os
+import queue
 
 logger = setup_logger(__name__)
 
@@ -24,10 +37,11 @@ def create_api_routes(db, ai_client):
     # 서비스 초기화
     problem_service = ProblemService(db)
     grading_service = GradingService()
-    ai_service = AIService(ai_client)
+    ai_service = AIService(ai_client, single_flight=build_single_flight(db), db=db)
     user_service = UserService(db)
     curriculum_service = CurriculumService()
     adaptive_test_service = AdaptiveTestService(db)
+    job_service = JobService(db)
 
     # Wix Webhook 시크릿 키 (환경 변수에서 로드)
     WIX_WEBHOOK_SECRET = os.getenv('WIX_WEBHOOK_SECRET', '')
@@ -49,105 +63,152 @@ def create_api_routes(db, ai_client):
             logger.error(f"문제 조회 실패: {e}", exc_info=True)
             return jsonify({'error': f'서버 오류: {str(e)}'}), 500
     
-    @api_bp.route('/submit_and_analyze', methods=['POST'])
-    def submit_and_analyze():
-        """답안 제출 및 AI 분석 (계층적 구조)"""
-        try:
-            logger.info("POST /submit_and_analyze 요청 수신")
+    def _parse_submission(data):
+        """
+        submit_and_analyze 요청 데이터 검증 및 정규화
 
-            # 1. 요청 데이터 검증
-            data = request.json
-            if not data or not isinstance(data, dict):
-                return jsonify({'error': '유효하지 않은 요청 형식'}), 400
+        Returns:
+            tuple: (submission dict, 에러 메시지 또는 None)
+        """
+        if not data or not isinstance(data, dict):
+            return None, '유효하지 않은 요청 형식'
 
-            # 사용자 ID (필수)
-            user_id = data.get('user_id')
-            if not user_id:
-                return jsonify({'error': '사용자 ID가 필요합니다.'}), 400
+        # 사용자 ID (필수)
+        user_id = data.get('user_id')
+        if not user_id:
+            return None, '사용자 ID가 필요합니다.'
 
-            # 게스트 모드 확인
-            is_guest = data.get('is_guest', False)
+        answers = data.get('answers', {})
 
-            answers = data.get('answers', {})
+        # 시간 정보 추출
+        time_info = {
+            'total_time_spent': data.get('total_time_spent'),
+            'time_limit': data.get('time_limit', 600),
+            'is_overtime': data.get('is_overtime', False)
+        }
 
+        if time_info['total_time_spent'] is not None:
+            logger.info(f"시간 정보 수신 - 소요시간: {time_info['total_time_spent']}초, "
+                      f"제한시간: {time_info['time_limit']}초, "
+                      f"초과여부: {time_info['is_overtime']}")
+
+        # answers 형식 처리
+        if isinstance(answers, list):
+            processed_answers = {}
+            for item in answers:
+                if 'problem_id' in item and 'user_answer' in item:
+                    processed_answers[item['problem_id']] = item['user_answer']
+            answers = processed_answers
+        elif not isinstance(answers, dict):
+            answers = {}
+
+        if not answers:
+            return None, '제출된 답안이 없습니다.'
+
+        return {
+            'user_id': user_id,
+            # 게스트 모드 확인
+            'is_guest': data.get('is_guest', False),
+            'answers': answers,
             # 테스트 메타데이터
-            test_metadata = {
+            'test_metadata': {
                 'test_type': data.get('test_type', 'level_test'),
                 'grade': data.get('grade'),
                 'curriculum_category': data.get('curriculum_category'),
                 'target_difficulty': data.get('target_difficulty', 'Medium')
-            }
+            },
+            'time_info': time_info
+        }, None
 
-            # 시간 정보 추출
-            time_info = {
-                'total_time_spent': data.get('total_time_spent'),
-                'time_limit': data.get('time_limit', 600),
-                'is_overtime': data.get('is_overtime', False)
-            }
+    def _grade_submission(submission, uow=None):
+        """
+        세션 생성, 문제 조회, 채점, 답변 저장 (AI 호출 없음)
 
-            if time_info['total_time_spent'] is not None:
-                logger.info(f"시간 정보 수신 - 소요시간: {time_info['total_time_spent']}초, "
-                          f"제한시간: {time_info['time_limit']}초, "
-                          f"초과여부: {time_info['is_overtime']}")
-
-            # answers 형식 처리
-            if isinstance(answers, list):
-                processed_answers = {}
-                for item in answers:
-                    if 'problem_id' in item and 'user_answer' in item:
-                        processed_answers[item['problem_id']] = item['user_answer']
-                answers = processed_answers
-            elif not isinstance(answers, dict):
-                answers = {}
-
-            if not answers:
-                return jsonify({'error': '제출된 답안이 없습니다.'}), 400
-
-            problem_ids = list(answers.keys())
-            logger.info(f"{len(problem_ids)}개 답안 처리 시작 - User: {user_id} (게스트: {is_guest})")
-
-            # 2. 테스트 세션 생성 (게스트가 아닐 때만)
-            session_id = None
-            if not is_guest:
-                session_id = user_service.create_test_session(
+        Args:
+            uow: UnitOfWork (세션/답변 쓰기를 모아 _analyze_submission 끝에서 일괄 커밋)
+
+        Returns:
+            tuple: (session_id, problems, results, wrong_categories)
+        """
+        user_id = submission['user_id']
+        is_guest = submission['is_guest']
+        answers = submission['answers']
+        test_metadata = submission['test_metadata']
+        time_info = submission['time_info']
+
+        problem_ids = list(answers.keys())
+        logger.info(f"{len(problem_ids)}개 답안 처리 시작 - User: {user_id} (게스트: {is_guest})")
+
+        # 2. 테스트 세션 생성 (게스트가 아닐 때만)
+        session_id = None
+        if not is_guest:
+            session_id = user_service.create_test_session(
+                user_id=user_id,
+                test_type=test_metadata['test_type'],
+                grade=test_metadata['grade'],
+                curriculum_category=test_metadata['curriculum_category'],
+                target_difficulty=test_metadata['target_difficulty'],
+                time_limit=time_info['time_limit'],
+                uow=uow
+            )
+
+            if not session_id:
+                raise RuntimeError('테스트 세션 생성 실패')
+
+        # 3. 문제 정보 조회
+        problems = problem_service.get_problems_by_ids(problem_ids)
+
+        # 4. 채점
+        results, wrong_categories = grading_service.grade_answers(answers, problems)
+
+        # 5. 문제별 답변 저장 (게스트가 아닐 때만)
+        if not is_guest:
+            for result in results:
+                problem_id = result['id']
+
+                user_service.save_answer(
                     user_id=user_id,
-                    test_type=test_metadata['test_type'],
-                    grade=test_metadata['grade'],
-                    curriculum_category=test_metadata['curriculum_category'],
-                    target_difficulty=test_metadata['target_difficulty'],
-                    time_limit=time_info['time_limit']
+                    session_id=session_id,
+                    problem_id=problem_id,
+                    user_answer=result.get('user_answer', ''),
+                    correct_answer=result['correct_answer'],
+                    is_correct=result['is_correct'],
+                    problem_data={
+                        'category': result.get('category', 'Unknown'),
+                        'subcategory': result.get('subcategory', ''),
+                        'difficulty': result.get('difficulty', 'Medium')
+                    },
+                    time_spent=0,  # TODO: 개별 문제 시간 추적 구현 시 업데이트
+                    uow=uow
                 )
 
-                if not session_id:
-                    return jsonify({'error': '테스트 세션 생성 실패'}), 500
+        return session_id, problems, results, wrong_categories
 
-            # 3. 문제 정보 조회
-            problems = problem_service.get_problems_by_ids(problem_ids)
+    def _analyze_submission(submission, session_id, problems, results, wrong_categories,
+                            timeout=None, on_solution=None, on_analysis=None, uow=None,
+                            deadline=None):
+        """
+        AI 해설/약점 분석 생성 및 세션 완료 저장
 
-            # 4. 채점
-            results, wrong_categories = grading_service.grade_answers(answers, problems)
+        uow가 주어지면 모아 둔 쓰기를 마지막에 일괄 커밋합니다.
 
-            # 5. 문제별 답변 저장 (게스트가 아닐 때만)
-            if not is_guest:
-                for result in results:
-                    problem_id = result['id']
+        Args:
+            timeout: 해설 생성 마감 시간 (초)
+            on_solution: 해설 완료 시 추가로 호출되는 콜백 (problem_id, solution)
+            on_analysis: 약점 분석 완료 시 (DB 저장 전) 호출되는 콜백 (analysis_report)
+            uow: UnitOfWork
+            deadline: 요청 마감 시간 (Deadline) - 해설 대기와 AI 재시도가 이 안에서 끝나도록 제한
 
-                    user_service.save_answer(
-                        user_id=user_id,
-                        session_id=session_id,
-                        problem_id=problem_id,
-                        user_answer=result.get('user_answer', ''),
-                        correct_answer=result['correct_answer'],
-                        is_correct=result['is_correct'],
-                        problem_data={
-                            'category': result.get('category', 'Unknown'),
-                            'subcategory': result.get('subcategory', ''),
-                            'difficulty': result.get('difficulty', 'Medium')
-                        },
-                        time_spent=0  # TODO: 개별 문제 시간 추적 구현 시 업데이트
-                    )
+        Returns:
+            tuple: (analysis_report, pending_ids)
+        """
+        user_id = submission['user_id']
+        is_guest = submission['is_guest']
+        time_info = submission['time_info']
 
-            # 6. AI 해설 생성 (틀린 문제만, 캐싱 적용)
+        try:
+            # 6. AI 해설 생성 (틀린 문제만, 캐싱 적용, 병렬 + 마감 시간)
+            solution_tasks = []
             for result in results:
                 if not result['is_correct']:
                     problem_id = result['id']
@@ -158,25 +219,48 @@ def create_api_routes(db, ai_client):
                     if cached_explanation:
                         logger.info(f"문제 {problem_id} 캐시된 해설 사용")
                         result['ai_solution'] = cached_explanation
+                        result['ai_solution_status'] = 'ready'
+                        if on_solution:
+                            on_solution(problem_id, cached_explanation)
                     else:
                         # AI 해설 생성 (일반 해설, user_answer 제외)
-                        logger.info(f"문제 {problem_id} AI 해설 생성")
-                        solution = ai_service.generate_solution(
-                            problem_id=problem_id,
-                            problem_text=result.get('text_latex', ''),
-                            correct_answer=result['correct_answer'],
-                            db_solution=result.get('solution')
-                        )
-                        result['ai_solution'] = solution
-
-                        # 생성된 해설을 데이터베이스에 캐싱
-                        problem_service.cache_explanation(problem_id, solution)
+                        solution_tasks.append({
+                            'problem_id': problem_id,
+                            'problem_text': result.get('text_latex', ''),
+                            'correct_answer': result['correct_answer'],
+                            'db_solution': result.get('solution'),
+                            'deadline': deadline
+                        })
+
+            # 생성된 해설은 마감 이후에 끝나더라도 데이터베이스에 캐싱
+            # (동시에 같은 문제를 틀린 요청끼리는 한 번만 생성/캐싱하고 결과를 공유)
+            # single-flight 리스가 풀리기 전에 다른 인스턴스가 조회할 수 있어야 하므로
+            # uow에 모으지 않고 즉시 저장
+            solutions, pending_ids = ai_service.generate_solutions(
+                solution_tasks,
+                timeout=deadline.cap(timeout) if deadline is not None else timeout,
+                on_complete=on_solution,
+                cache=lambda pid, solution: _cache_explanation(problems, pid, solution),
+                fetch_cached=problem_service.get_explanation
+            )
+
+            for result in results:
+                problem_id = result['id']
+                if problem_id in solutions:
+                    result['ai_solution'] = solutions[problem_id]
+                    result['ai_solution_status'] = 'ready'
+                elif problem_id in pending_ids:
+                    result['ai_solution'] = Config.AI_SOLUTION_PENDING_MESSAGE
+                    result['ai_solution_status'] = 'pending'
 
             # 7. AI 약점 분석 (시간 정보 포함)
             analysis_report = ai_service.analyze_weakness(
                 wrong_categories,
-                time_info if time_info['total_time_spent'] is not None else None
+                time_info if time_info['total_time_spent'] is not None else None,
+                deadline=deadline
             )
+            if on_analysis:
+                on_analysis(analysis_report)
 
             # 8. 테스트 세션 완료 및 통계 업데이트 (게스트가 아닐 때만)
             if not is_guest:
@@ -185,7 +269,8 @@ def create_api_routes(db, ai_client):
                     session_id=session_id,
                     results=results,
                     analysis_report=analysis_report,
-                    time_info=time_info
+                    time_info=time_info,
+                    uow=uow
                 )
 
                 # 9. 기존 test_history에도 저장 (호환성 유지)
@@ -193,39 +278,301 @@ def create_api_routes(db, ai_client):
                     user_id=user_id,
                     results=results,
                     analysis_report=analysis_report,
-                    time_info=time_info
+                    time_info=time_info,
+                    uow=uow
                 )
 
             logger.info(f"답안 처리 완료 - Session: {session_id} (게스트: {is_guest})")
 
+            return analysis_report, pending_ids
+        finally:
+            if uow is not None:
+                uow.commit()
+
+    def _cache_explanation(problems, problem_id, solution, uow=None):
+        """존재하는 문제에만 해설 캐싱 (없는 문서 update는 배치 전체를 실패시킴)"""
+        if problem_id not in problems:
+            logger.warning(f"문제 {problem_id} 문서 없음 - 해설 캐싱 건너뜀")
+            return False
+        return problem_service.cache_explanation(problem_id, solution, uow=uow)
+
+    def _submission_error_response(e):
+        """답안 처리 예외를 사용자용 에러 응답으로 변환"""
+        # 에러 타입에 따라 다른 메시지 반환
+        error_message = '서버 오류가 발생했습니다.'
+        error_type = 'SERVER_ERROR'
+
+        error_str = str(e).lower()
+        if 'timeout' in error_str or 'deadline' in error_str:
+            error_message = '네트워크 연결이 느립니다. 안정적인 Wi-Fi 환경에서 다시 시도해주세요.'
+            error_type = 'NETWORK_TIMEOUT'
+        elif 'network' in error_str or 'connection' in error_str:
+            error_message = '네트워크 연결에 문제가 있습니다. 인터넷 연결을 확인하고 다시 시도해주세요.'
+            error_type = 'NETWORK_ERROR'
+        elif 'unavailable' in error_str or 'service' in error_str:
+            error_message = '서버에 일시적인 문제가 발생했습니다. 잠시 후 다시 시도해주세요.'
+            error_type = 'SERVICE_UNAVAILABLE'
+
+        return {
+            'error': error_message,
+            'error_type': error_type
+        }
+
+    @api_bp.route('/submit_and_analyze', methods=['POST'])
+    def submit_and_analyze():
+        """
+        답안 제출 및 AI 분석 (계층적 구조)
+
+        mode=job (쿼리 또는 Body) 이면 채점 결과와 job_id를 즉시 반환하고,
+        AI 해설/약점 분석/세션 저장은 백그라운드에서 처리합니다.
+        결과는 GET /submit_and_analyze/jobs/<job_id> 로 조회합니다.
+        """
+        try:
+            logger.info("POST /submit_and_analyze 요청 수신")
+            deadline = Deadline(Config.REQUEST_TIME_BUDGET)
+
+            # 1. 요청 데이터 검증
+            data = request.json
+            submission, error_message = _parse_submission(data)
+            if error_message:
+                return jsonify({'error': error_message}), 400
+
+            job_mode = (request.args.get('mode') or data.get('mode')) == 'job'
+
+            # 요청 단위 쓰기 모음 (세션/답변/해설/통계 쓰기를 배치 커밋)
+            uow = UnitOfWork(db, name=f"submit:{submission['user_id']}")
+
+            try:
+                session_id, problems, results, wrong_categories = _grade_submission(submission, uow)
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 500
+
+            if job_mode:
+                # 백그라운드 작업이 results를 수정하므로 응답용 스냅샷을 먼저 확보
+                graded_results = copy.deepcopy(results)
+                job_id = job_service.create_job(
+                    user_id=submission['user_id'],
+                    session_id=session_id,
+                    results=graded_results
+                )
+
+                def _run_job():
+                    analysis_report, pending_ids = _analyze_submission(
+                        submission, session_id, problems, results, wrong_categories,
+                        timeout=Config.ANALYSIS_JOB_DEADLINE,
+                        on_solution=lambda pid, solution: job_service.add_explanation(job_id, pid, solution),
+                        uow=uow,
+                        deadline=Deadline(Config.ANALYSIS_JOB_DEADLINE)
+                    )
+                    job_service.complete_job(job_id, analysis_report, pending_ids)
+
+                job_service.run(job_id, _run_job)
+
+                return jsonify({
+                    'job_id': job_id,
+                    'status': 'running',
+                    'session_id': session_id,
+                    'test_results': graded_results
+                }), 202
+
+            analysis_report, pending_ids = _analyze_submission(
+                submission, session_id, problems, results, wrong_categories,
+                timeout=Config.AI_SOLUTION_DEADLINE,
+                uow=uow,
+                deadline=deadline
+            )
+
             return jsonify({
                 'session_id': session_id,
                 'test_results': results,
-                'ai_analysis_report': analysis_report
+                'ai_analysis_report': analysis_report,
+                'pending_explanations': pending_ids
             }), 200
 
         except Exception as e:
             logger.error(f"답안 처리 실패: {e}", exc_info=True)
+            return jsonify(_submission_error_response(e)), 500
+
+    @api_bp.route('/submit_and_analyze/stream', methods=['POST'])
+    def submit_and_analyze_stream():
+        """
+        답안 제출 및 AI 분석 (Server-Sent Events)
 
-            # 에러 타입에 따라 다른 메시지 반환
-            error_message = '서버 오류가 발생했습니다.'
-            error_type = 'SERVER_ERROR'
-
-            error_str = str(e).lower()
-            if 'timeout' in error_str or 'deadline' in error_str:
-                error_message = '네트워크 연결이 느립니다. 안정적인 Wi-Fi 환경에서 다시 시도해주세요.'
-                error_type = 'NETWORK_TIMEOUT'
-            elif 'network' in error_str or 'connection' in error_str:
-                error_message = '네트워크 연결에 문제가 있습니다. 인터넷 연결을 확인하고 다시 시도해주세요.'
-                error_type = 'NETWORK_ERROR'
-            elif 'unavailable' in error_str or 'service' in error_str:
-                error_message = '서버에 일시적인 문제가 발생했습니다. 잠시 후 다시 시도해주세요.'
-                error_type = 'SERVICE_UNAVAILABLE'
+        요청 Body는 /submit_and_analyze 와 동일합니다.
 
+        이벤트 순서:
+            graded       {"session_id", "test_results"}           채점 직후
+            explanation  {"problem_id", "ai_solution"}            해설이 완료될 때마다
+            analysis     {"ai_analysis_report"}                   약점 분석 완료
+            done         {"session_id", "pending_explanations"}   저장까지 완료
+            error        {"error", "error_type"}                  처리 중 오류
+        """
+        try:
+            logger.info("POST /submit_and_analyze/stream 요청 수신")
+            deadline = Deadline(Config.REQUEST_TIME_BUDGET)
+
+            data = request.json
+            submission, error_message = _parse_submission(data)
+            if error_message:
+                return jsonify({'error': error_message}), 400
+
+            uow = UnitOfWork(db, name=f"submit_stream:{submission['user_id']}")
+
+            try:
+                session_id, problems, results, wrong_categories = _grade_submission(submission, uow)
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 500
+
+        except Exception as e:
+            logger.error(f"답안 처리 실패: {e}", exc_info=True)
+            return jsonify(_submission_error_response(e)), 500
+
+        graded_results = copy.deepcopy(results)
+        events = queue.Queue()
+
+        def _run_analysis():
+            try:
+                analysis_report, pending_ids = _analyze_submission(
+                    submission, session_id, problems, results, wrong_categories,
+                    timeout=Config.AI_SOLUTION_DEADLINE,
+                    on_solution=lambda pid, solution: events.put(
+                        ('explanation', {'problem_id': pid, 'ai_solution': solution})
+                    ),
+                    on_analysis=lambda report: events.put(
+                        ('analysis', {'ai_analysis_report': report})
+                    ),
+                    uow=uow,
+                    deadline=deadline
+                )
+                events.put(('done', {
+                    'session_id': session_id,
+                    'pending_explanations': pending_ids
+                }))
+            except Exception as e:
+                logger.error(f"스트리밍 답안 분석 실패: {e}", exc_info=True)
+                events.put(('error', _submission_error_response(e)))
+
+        # 해설 워커 풀을 기다리는 작업이므로 별도 풀(작업 실행기)에서 실행
+        job_service.executor.submit(_run_analysis)
+
+        def _format_event(event, payload):
+            return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+        def _stream():
+            yield _format_event('graded', {
+                'session_id': session_id,
+                'test_results': graded_results
+            })
+
+            sent_explanations = set()
+            while True:
+                try:
+                    event, payload = events.get(timeout=Config.SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    # 프록시/로드밸런서 유휴 연결 종료 방지
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event == 'explanation':
+                    # 마감 이후 끝난 해설은 done 이후라 전송되지 않음 (DB 캐싱만 수행)
+                    if payload['problem_id'] in sent_explanations:
+                        continue
+                    sent_explanations.add(payload['problem_id'])
+
+                yield _format_event(event, payload)
+
+                if event in ('done', 'error'):
+                    break
+
+        return Response(_stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    @api_bp.route('/submit_and_analyze/jobs/<job_id>', methods=['GET'])
+    def get_analysis_job(job_id):
+        """
+        비동기 분석 작업 조회 (부분/최종 결과)
+
+        쿼리 파라미터:
+            user_id: 작업을 생성한 사용자 ID (선택, 지정 시 일치 여부 확인)
+
+        응답:
+        {
+            "job_id": "...",
+            "status": "running" | "completed" | "failed",
+            "session_id": "...",
+            "test_results": [...],          # 완료된 해설은 ai_solution 포함
+            "ai_analysis_report": "...",    # 완료 전에는 null
+            "pending_explanations": [...]
+        }
+        """
+        try:
+            job = job_service.get_job(job_id)
+
+            user_id = request.args.get('user_id')
+            if not job or (user_id and job.get('user_id') != user_id):
+                return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+
+            return jsonify(job), 200
+
+        except Exception as e:
+            logger.error(f"분석 작업 조회 실패 - Job: {job_id}, 오류: {e}", exc_info=True)
+            return jsonify({'error': f'서버 오류: {str(e)}'}), 500
+
+    # ==================== 계측 API ====================
+
+    @api_bp.route('/debug/ai_metrics', methods=['GET'])
+    def get_ai_metrics():
+        """
+        AI 호출 계측 정보 (DEBUG_METRICS_ENABLED가 켜져 있을 때만 노출)
+
+        응답:
+        {
+            "circuit_breakers": {"vertex": {"state", "error_rate", "slow_call_rate", "stats", "transitions"}},
+            "call_sites": {"generate_solution": {"p50", "p95", "p99", "hedged", "hedge_win_rate", ...}},
+            "caches": {"weakness": {...}, "performance_summary": {...}},
+            "question_generation": {"generated", "repaired", "field_retries", "full_retries"},
+            "question_index": {"mode", "ready", "questions", "cells", ...},
+            "adaptive_prefetch": {"started", "hits", "misses"},
+            "adaptive_sessions": {...} (memory/token 모드 세션 저장소 통계),
+            "adaptive_engine": {"selections", "fallbacks", "bank_builds", "banks"} (irt 엔진 사용 시),
+            "question_pool": {"scheduled", "generated", "failed", "pending", "low_cells", ...},
+            "firestore": {"methods": {...}, "endpoints": {...}, "n_plus_one": {...}} (메서드별/엔드포인트별 읽기·쓰기·바이트·지연)
+        }
+        """
+        if not Config.DEBUG_METRICS_ENABLED:
+            return jsonify({'error': '요청한 리소스를 찾을 수 없습니다.'}), 404
+
+        try:
             return jsonify({
-                'error': error_message,
-                'error_type': error_type
-            }), 500
+                'circuit_breakers': breaker_snapshots(),
+                'call_sites': call_site_snapshots(),
+                'caches': {
+                    'weakness': ai_service.weakness_cache.summary(),
+                    'performance_summary': adaptive_test_service.question_service.summary_cache.summary()
+                },
+                'question_generation': adaptive_test_service.question_service.generation_stats,
+                'question_index': (
+                    adaptive_test_service.question_service.index.snapshot()
+                    if adaptive_test_service.question_service.index is not None else None
+                ),
+                'adaptive_prefetch': adaptive_test_service.prefetch_stats,
+                'adaptive_sessions': getattr(adaptive_test_service.sessions, 'stats', None),
+                'adaptive_engine': (
+                    adaptive_test_service.engine.snapshot()
+                    if adaptive_test_service.engine is not None else None
+                ),
+                'question_pool': (
+                    adaptive_test_service.question_service.pool.snapshot()
+                    if adaptive_test_service.question_service.pool is not None else None
+                ),
+                'firestore': firestore_snapshot() if Config.FIRESTORE_METRICS_ENABLED else None
+            }), 200
+
+        except Exception as e:
+            logger.error(f"AI 계측 정보 조회 실패: {e}", exc_info=True)
+            return jsonify({'error': f'서버 오류: {str(e)}'}), 500
 
     # ==================== 게스트 사용자 API ====================
 
@@ -251,11 +598,18 @@ def create_api_routes(db, ai_client):
             result = adaptive_test_service.submit_answer(
                 session_id=session_id,
                 question_id=question_id,
-                answer=user_answer
+                answer=user_answer,
+                session_token=data.get('session_token')
             )
 
             return jsonify(result), 200
 
+        except InvalidSessionToken as e:
+            logger.warning(f"적응형 테스트 세션 토큰 검증 실패 - Session: {data.get('session_id')}: {e}")
+            return jsonify({'error': '유효하지 않거나 만료된 세션 토큰'}), 400
+        except StaleSessionError as e:
+            logger.warning(f"적응형 테스트 세션 상태 불일치 - Session: {data.get('session_id')}: {e}")
+            return jsonify({'error': '세션이 아직 이전 문제에 있습니다. 잠시 후 다시 시도해주세요.'}), 409
         except Exception as e:
             logger.error(f"적응형 테스트 답안 제출 실패: {e}", exc_info=True)
             return jsonify({'error': f'서버 오류: {str(e)}'}), 500
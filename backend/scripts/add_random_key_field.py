@@ -0,0 +1,116 @@
+"""
+문제 은행에 random_key 필드 추가 스크립트
+
+사용법:
+    python3 scripts/add_random_key_field.py [--dry-run]
+
+기능:
+    - questions 컬렉션의 모든 문서에 random_key (0 이상 1 미만 난수) 필드 추가
+    - QuestionService.get_question 의 균등 샘플링(random_key 범위 조회)에 사용
+    - 이미 random_key가 있는 문서는 건너뜀
+    - 500개 단위 WriteBatch로 일괄 업데이트
+
+필요한 Firestore 복합 인덱스 (questions 컬렉션):
+    - curriculum_system ASC, grade ASC, difficulty ASC, random_key ASC
+    - curriculum_system ASC, grade ASC, difficulty ASC, topic ASC, random_key ASC
+"""
+
+import sys
+import os
+import random
+
+# 프로젝트 루트를 Python path에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore
+from config import Config
+
+# Firestore WriteBatch 한 번에 담을 수 있는 최대 쓰기 수
+BATCH_SIZE = 500
+
+# Firebase 인증 설정
+if os.path.exists(Config.SERVICE_ACCOUNT_KEY):
+    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = Config.SERVICE_ACCOUNT_KEY
+    print(f"✓ 서비스 계정 키 파일 설정: {Config.SERVICE_ACCOUNT_KEY}")
+else:
+    print(f"⚠️  서비스 계정 키 파일을 찾을 수 없습니다: {Config.SERVICE_ACCOUNT_KEY}")
+    print("GOOGLE_APPLICATION_CREDENTIALS 환경 변수를 사용합니다.")
+
+def add_random_key_to_questions(dry_run=False):
+    """
+    기존 questions 컬렉션의 모든 문서에 random_key 필드 추가
+    """
+    print("=" * 80)
+    print("문제 은행 random_key 필드 추가 스크립트 시작" + (" (dry-run)" if dry_run else ""))
+    print("=" * 80)
+
+    # Firestore 클라이언트 초기화
+    db = firestore.Client(project=Config.PROJECT_ID)
+    questions_ref = db.collection('questions')
+
+    total_count = 0
+    updated_count = 0
+    skipped_count = 0
+    failed_count = 0
+
+    batch = db.batch()
+    batch_count = 0
+
+    def _commit(batch, batch_count):
+        try:
+            batch.commit()
+            print(f"  → 배치 커밋 완료 ({batch_count}개)")
+            return batch_count, 0
+        except Exception as e:
+            print(f"  → ⚠️  배치 커밋 실패 ({batch_count}개): {e}")
+            return 0, batch_count
+
+    # 전체 문서를 메모리에 올리지 않도록 스트리밍 (필요한 필드만 조회)
+    print("\n문제 조회 중...")
+    for doc in questions_ref.select(['random_key']).stream():
+        total_count += 1
+
+        if 'random_key' in (doc.to_dict() or {}):
+            skipped_count += 1
+            continue
+
+        if dry_run:
+            updated_count += 1
+            continue
+
+        batch.update(doc.reference, {'random_key': random.random()})
+        batch_count += 1
+
+        if batch_count >= BATCH_SIZE:
+            committed, failed = _commit(batch, batch_count)
+            updated_count += committed
+            failed_count += failed
+            batch = db.batch()
+            batch_count = 0
+
+    if batch_count:
+        committed, failed = _commit(batch, batch_count)
+        updated_count += committed
+        failed_count += failed
+
+    print("=" * 80)
+    print("스크립트 실행 완료")
+    print("=" * 80)
+    print(f"총 문제 수: {total_count}")
+    print(f"업데이트{' 예정' if dry_run else ''}: {updated_count}개")
+    print(f"건너뜀: {skipped_count}개")
+    print(f"실패: {failed_count}개")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        add_random_key_to_questions(dry_run='--dry-run' in sys.argv)
+    except KeyboardInterrupt:
+        print("\n\n사용자에 의해 중단되었습니다.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\n오류 발생: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,91 @@
+"""
+문항 IRT(2PL) 파라미터 오프라인 보정 스크립트
+
+사용법:
+    python3 scripts/calibrate_irt.py [--dry-run] [--min-responses N]
+
+기능:
+    - 레벨 테스트 답변 (users/*/test_sessions/*/answers 컬렉션 그룹) 과
+      적응형 테스트 세션 (test_sessions 문서의 answers 배열) 을 스트리밍으로 읽음
+    - NumPy 벡터 연산 EM(주변 최대우도)으로 문항별 변별도(irt_a)/난이도(irt_b) 추정
+    - 응답 수가 N개(기본 30) 미만인 문항은 건너뜀 (난이도 라벨 기본값 유지)
+    - problems / questions 문서에 irt_a, irt_b, irt_n, irt_calibrated_at 을 500개 단위 WriteBatch로 업데이트
+    - ADAPTIVE_ENGINE=irt 의 문항 선택과 능력 추정에 사용
+
+필요한 Firestore 인덱스:
+    - answers 컬렉션 그룹 단일 필드 인덱스 (collection group scope)
+"""
+
+import sys
+import os
+
+# 프로젝트 루트를 Python path에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore
+from config import Config
+from services.irt_calibration import IRTCalibrator, MIN_RESPONSES
+
+# Firebase 인증 설정
+if os.path.exists(Config.SERVICE_ACCOUNT_KEY):
+    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = Config.SERVICE_ACCOUNT_KEY
+    print(f"✓ 서비스 계정 키 파일 설정: {Config.SERVICE_ACCOUNT_KEY}")
+else:
+    print(f"⚠️  서비스 계정 키 파일을 찾을 수 없습니다: {Config.SERVICE_ACCOUNT_KEY}")
+    print("GOOGLE_APPLICATION_CREDENTIALS 환경 변수를 사용합니다.")
+
+
+def calibrate_items(dry_run=False, min_responses=MIN_RESPONSES):
+    """
+    답변 기록으로 문항 IRT 파라미터를 추정하고 문서에 반영
+    """
+    print("=" * 80)
+    print("문항 IRT 보정 스크립트 시작" + (" (dry-run)" if dry_run else ""))
+    print("=" * 80)
+
+    # Firestore 클라이언트 초기화
+    db = firestore.Client(project=Config.PROJECT_ID)
+    calibrator = IRTCalibrator(db, min_responses=min_responses)
+
+    print("\n답변 기록 조회 중...")
+    matrix = calibrator.load()
+    print(f"  → 답변 {len(matrix)}개, 세션 {len(matrix.person_ids)}개, 문항 {len(matrix.item_ids)}개")
+
+    print("\n2PL 파라미터 추정 중...")
+    params = calibrator.fit(matrix)
+
+    for (collection, item_id), values in sorted(params.items(), key=lambda kv: kv[1]['irt_b'])[:10]:
+        print(f"  {collection}/{item_id}: a={values['irt_a']:.2f}, b={values['irt_b']:.2f} (응답 {values['irt_n']}개)")
+    if len(params) > 10:
+        print(f"  ... 외 {len(params) - 10}개")
+
+    if not dry_run and params:
+        print("\n파라미터 저장 중...")
+        calibrator.write(params)
+
+    print("=" * 80)
+    print("스크립트 실행 완료")
+    print("=" * 80)
+    print(f"레벨 테스트 답변: {calibrator.stats['level_answers']}개")
+    print(f"적응형 테스트 답변: {calibrator.stats['adaptive_answers']}개")
+    print(f"보정{' 예정' if dry_run else ''}: {len(params)}개 문항")
+    print(f"응답 부족으로 건너뜀: {calibrator.stats['skipped_items']}개 문항")
+    if not dry_run:
+        print(f"저장: {calibrator.stats['written']}개 문서")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        min_responses = MIN_RESPONSES
+        if '--min-responses' in sys.argv:
+            min_responses = int(sys.argv[sys.argv.index('--min-responses') + 1])
+        calibrate_items(dry_run='--dry-run' in sys.argv, min_responses=min_responses)
+    except KeyboardInterrupt:
+        print("\n\n사용자에 의해 중단되었습니다.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\n오류 발생: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
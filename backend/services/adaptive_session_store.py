@@ -0,0 +1,292 @@
+import atexit
+import copy
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from google.cloud import firestore
+from config import Config
+from utils.logger import setup_logger
+from utils.response_cache import TTLCache
+from utils.session_token import InvalidSessionToken, SessionTokenSigner
+
+logger = setup_logger(__name__)
+
+# Session fields rewritten on every answer (answers are appended with ArrayUnion)
+_PROGRESS_FIELDS = ('current_question_index', 'current_difficulty', 'current_question', 'is_finished',
+                    'theta', 'theta_se')
+
+
+class StaleSessionError(Exception):
+    """The stored session is still on another question (another instance's write-behind has not landed)."""
+
+
+class FirestoreSessionStore:
+    """Adaptive sessions read from and written to `test_sessions` on every step."""
+
+    COLLECTION = 'test_sessions'
+
+    def __init__(self, db):
+        self.db = db
+
+    def create(self, session_data: Dict[str, Any]) -> str:
+        doc_ref = self.db.collection(self.COLLECTION).document()
+        doc_ref.set(session_data)
+        return doc_ref.id
+
+    def get(self, session_id: str, question_id: Optional[str] = None,
+            token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self.db.collection(self.COLLECTION).document(session_id).get().to_dict()
+
+    def save_answer(self, session_id: str, session: Dict[str, Any], answer_record: Dict[str, Any]):
+        self.db.collection(self.COLLECTION).document(session_id).set(session)
+
+    def issue_token(self, session_id: str, session: Dict[str, Any]) -> Optional[str]:
+        """Token the client must send back with its next answer (None when state is server-side)."""
+        return None
+
+    def flush(self, session_id: Optional[str] = None):
+        pass
+
+
+class MemorySessionStore(FirestoreSessionStore):
+    """
+    Active adaptive sessions kept in process memory with write-behind persistence.
+
+    Each answer changes the cached session and queues one small update: the answer
+    is appended with ArrayUnion and the progress fields are replaced. Queued updates
+    are flushed every ADAPTIVE_SESSION_FLUSH_INTERVAL seconds. Updates for the same
+    session are merged into one write. The flush is synchronous when a test finishes.
+
+    `get` hands out a copy of the cached session, so a step that fails before
+    `save_answer` (e.g. while fetching the next question) leaves the cached
+    session unchanged and a retry of the same answer is not recorded twice.
+
+    Opt-in (ADAPTIVE_SESSION_MODE='memory'); requires sticky routing (e.g. Cloud Run
+    session affinity). A session that is not in memory is loaded from Firestore. A
+    cached session whose current question differs from the submitted one was
+    advanced by another instance, so it is reloaded too. A loaded session that is
+    still on another question may be missing that instance's queued write; it is
+    re-read for up to `stale_wait` seconds and then rejected with StaleSessionError.
+    """
+
+    STALE_LOAD_ATTEMPTS = 3
+
+    def __init__(self, db, flush_interval: float = None, stale_wait: float = None):
+        super().__init__(db)
+        self.flush_interval = flush_interval if flush_interval is not None else Config.ADAPTIVE_SESSION_FLUSH_INTERVAL
+        self.stale_wait = stale_wait if stale_wait is not None else Config.ADAPTIVE_SESSION_FLUSH_INTERVAL
+        self._sessions = TTLCache(Config.ADAPTIVE_SESSION_CACHE_SIZE, Config.ADAPTIVE_SESSION_TTL)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {'memory_hits': 0, 'loads': 0, 'stale_reloads': 0, 'stale_rejects': 0,
+                      'writes': 0, 'merged': 0}
+
+        self._flusher = threading.Thread(target=self._flush_loop, name='adaptive-session-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def create(self, session_data: Dict[str, Any]) -> str:
+        session_id = super().create(session_data)
+        self._sessions.set(session_id, copy.deepcopy(session_data))
+        return session_id
+
+    def get(self, session_id: str, question_id: Optional[str] = None,
+            token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            if self._serves(session, question_id):
+                self._count('memory_hits')
+                return copy.deepcopy(session)
+            self._count('stale_reloads')
+            # Push our own queued writes first so the reload sees them
+            self.flush(session_id)
+
+        for attempt in range(self.STALE_LOAD_ATTEMPTS):
+            if attempt:
+                time.sleep(self.stale_wait / (self.STALE_LOAD_ATTEMPTS - 1))
+            self._count('loads')
+            session = super().get(session_id)
+            if session is None or self._serves(session, question_id, strict=False):
+                break
+        else:
+            self._count('stale_rejects')
+            raise StaleSessionError(f"Session {session_id} is not on question {question_id}")
+
+        if session is not None:
+            self._sessions.set(session_id, copy.deepcopy(session))
+        return session
+
+    @staticmethod
+    def _serves(session: Dict[str, Any], question_id: Optional[str], strict: bool = True) -> bool:
+        """Whether `question_id` is the session's current question (non-strict: or it has none stored)."""
+        if question_id is None:
+            return True
+        current = (session.get('current_question') or {}).get('id')
+        return current == question_id or (not strict and current is None)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def save_answer(self, session_id: str, session: Dict[str, Any], answer_record: Dict[str, Any]):
+        self._sessions.set(session_id, copy.deepcopy(session))
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending is None:
+                pending = self._pending[session_id] = {'answers': [], 'fields': {}}
+            else:
+                self.stats['merged'] += 1
+            pending['answers'].append(answer_record)
+            pending['fields'].update({f: session[f] for f in _PROGRESS_FIELDS if f in session})
+
+        if session.get('is_finished'):
+            self.flush(session_id)
+
+    def flush(self, session_id: Optional[str] = None):
+        """Writes queued updates (one session or all)."""
+        with self._lock:
+            if session_id is None:
+                batch, self._pending = self._pending, {}
+            else:
+                pending = self._pending.pop(session_id, None)
+                batch = {session_id: pending} if pending else {}
+
+        for sid, pending in batch.items():
+            update = dict(pending['fields'])
+            if pending['answers']:
+                update['answers'] = firestore.ArrayUnion(pending['answers'])
+            try:
+                self.db.collection(self.COLLECTION).document(sid).update(update)
+                self._count('writes')
+            except Exception as e:
+                logger.error(f"Adaptive session write-behind failed - Session: {sid}: {e}", exc_info=True)
+                # Re-queue so the next flush retries (newer updates win on merge)
+                with self._lock:
+                    newer = self._pending.get(sid)
+                    if newer is not None:
+                        pending['answers'].extend(newer['answers'])
+                        pending['fields'].update(newer['fields'])
+                    self._pending[sid] = pending
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+class TokenSessionStore(FirestoreSessionStore):
+    """
+    Stateless adaptive sessions: progress travels in an HMAC-signed token.
+
+    The token carries the user context, question index, current difficulty, the
+    question being served and every answer so far (id, choice, correctness,
+    difficulty, topic and IRT item parameters). It never carries correct answers, so grading still reads
+    the one question being answered. Mid-test answers cause no session reads or
+    writes, and any instance holding SESSION_TOKEN_SECRET can serve any step.
+    Only the finished session is written to `test_sessions`.
+
+    Replay is not detected: a client that resends an older token answers that
+    step again. Use a server-side mode where that matters.
+    """
+
+    def __init__(self, db, signer: SessionTokenSigner = None):
+        super().__init__(db)
+        self.signer = signer or SessionTokenSigner()
+        self.stats = {'issued': 0, 'verified': 0, 'rejected': 0, 'writes': 0}
+
+    def create(self, session_data: Dict[str, Any]) -> str:
+        session_data['started_at'] = int(time.time())
+        return uuid.uuid4().hex
+
+    def issue_token(self, session_id: str, session: Dict[str, Any]) -> Optional[str]:
+        current = session.get('current_question') or {}
+        payload = {
+            'sid': session_id,
+            'u': session['user_context'],
+            'i': session['current_question_index'],
+            'd': session['current_difficulty'],
+            'q': current.get('id'),
+            'a': [
+                [a['question_id'], a['user_answer'], int(a['is_correct']), a.get('difficulty'), a.get('topic')]
+                + ([a['irt_a'], a['irt_b']] if 'irt_a' in a else [])
+                for a in session.get('answers', [])
+            ],
+            't': session.get('started_at')
+        }
+        self.stats['issued'] += 1
+        return self.signer.sign(payload)
+
+    def get(self, session_id: str, question_id: Optional[str] = None,
+            token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rebuilds the session from a verified token.
+
+        Raises:
+            InvalidSessionToken: Missing, forged or expired token, or one issued for
+                another session or question.
+        """
+        try:
+            payload = self.signer.verify(token)
+            if payload.get('sid') != session_id:
+                raise InvalidSessionToken("Session token was issued for another session")
+            if question_id is not None and payload.get('q') != question_id:
+                raise InvalidSessionToken("Session token was issued for another question")
+        except InvalidSessionToken:
+            self.stats['rejected'] += 1
+            raise
+
+        self.stats['verified'] += 1
+        return {
+            'user_context': payload['u'],
+            'current_question_index': payload['i'],
+            'current_difficulty': payload['d'],
+            'current_question': {'id': payload['q']},
+            'answers': [self._answer_from_token(entry) for entry in payload['a']],
+            'started_at': payload.get('t'),
+            'is_finished': False
+        }
+
+    @staticmethod
+    def _answer_from_token(entry: List[Any]) -> Dict[str, Any]:
+        qid, answer, correct, difficulty, topic = entry[:5]
+        record = {'question_id': qid, 'user_answer': answer, 'is_correct': bool(correct),
+                  'difficulty': difficulty, 'topic': topic}
+        if len(entry) >= 7:
+            record['irt_a'], record['irt_b'] = entry[5], entry[6]
+        return record
+
+    def save_answer(self, session_id: str, session: Dict[str, Any], answer_record: Dict[str, Any]):
+        if not session.get('is_finished'):
+            return
+        record = {k: v for k, v in session.items() if k != 'started_at'}
+        started_at = session.get('started_at')
+        record['created_at'] = (
+            datetime.fromtimestamp(started_at, tz=timezone.utc) if started_at else firestore.SERVER_TIMESTAMP
+        )
+        record['finished_at'] = firestore.SERVER_TIMESTAMP
+        record['session_mode'] = 'token'
+        self.db.collection(self.COLLECTION).document(session_id).set(record)
+        self.stats['writes'] += 1
+
+
+def build_session_store(db):
+    """
+    Session store selected by ADAPTIVE_SESSION_MODE ('memory' | 'firestore' | 'token').
+
+    Raises:
+        ValueError: Token mode without SESSION_TOKEN_SECRET (refused at startup rather
+            than signing with a per-process key that other instances cannot verify).
+    """
+    if Config.ADAPTIVE_SESSION_MODE == 'memory':
+        return MemorySessionStore(db)
+    if Config.ADAPTIVE_SESSION_MODE == 'token':
+        if not Config.SESSION_TOKEN_SECRET:
+            raise ValueError("ADAPTIVE_SESSION_MODE='token' requires SESSION_TOKEN_SECRET")
+        return TokenSessionStore(db)
+    return FirestoreSessionStore(db)
@@ -1,60 +1,105 @@
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional
 from firebase_admin import firestore
+from config import Config
+from .adaptive_session_store import build_session_store
+from .irt_engine import IRTEngine, item_params
 from .question_service import QuestionService
+from utils.circuit_breaker import FallbackText
+from utils.logger import setup_logger
+from utils.response_cache import TTLCache
+from utils.unit_of_work import UnitOfWork
+
+logger = setup_logger(__name__)
 
 class AdaptiveTestService:
     def __init__(self, db):
         self.db = db
         self.question_service = QuestionService(db)
         self.TOTAL_QUESTIONS = 3
+        # Session persistence (ADAPTIVE_SESSION_MODE): in-memory write-behind, Firestore per step or signed token
+        self.sessions = build_session_store(db)
+        # Speculative next-question lookups per session: {session_id: {difficulty: Future}}
+        self._prefetched = TTLCache(Config.ADAPTIVE_PREFETCH_CACHE_SIZE, Config.ADAPTIVE_PREFETCH_TTL)
+        self._prefetch_executor = ThreadPoolExecutor(
+            max_workers=Config.ADAPTIVE_PREFETCH_WORKERS,
+            thread_name_prefix='adaptive-prefetch'
+        )
+        self.prefetch_stats = {'started': 0, 'hits': 0, 'misses': 0}
+        # IRT computerized adaptive testing (ADAPTIVE_ENGINE=irt): variable length up to the max item count
+        self.engine = None
+        if Config.ADAPTIVE_ENGINE == 'irt':
+            self.engine = IRTEngine(self.question_service.index)
+            self.TOTAL_QUESTIONS = Config.ADAPTIVE_IRT_MAX_ITEMS
 
     def start_test(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Initializes a new test session.
         """
+        # Stock every difficulty this student may reach while they answer
+        if self.question_service.pool is not None:
+            self.question_service.pool.prewarm(user_context['system'], user_context['grade'])
+        
+        # Get first question (IRT: most informative item at the prior mean ability)
+        first_question = None
+        if self.engine is not None:
+            first_question = self.engine.select(user_context['system'], user_context['grade'], 0.0)
+        if first_question is None:
+            first_question = self.question_service.get_question(
+                curriculum_system=user_context['system'],
+                grade=user_context['grade'],
+                difficulty='Medium'
+            )
+
         session_data = {
             'user_context': user_context,
             'current_question_index': 0,
             'answers': [],
             'current_difficulty': 'Medium',
+            'current_question': self._question_key(first_question),
             'created_at': firestore.SERVER_TIMESTAMP,
             'is_finished': False
         }
         
         # Create session in DB
-        doc_ref = self.db.collection('test_sessions').document()
-        doc_ref.set(session_data)
-        
-        # Get first question
-        first_question = self.question_service.get_question(
-            curriculum_system=user_context['system'],
-            grade=user_context['grade'],
-            difficulty='Medium'
-        )
+        session_id = self.sessions.create(session_data)
+
+        # Look up both possible second questions while the student answers the first
+        # (IRT selection is an in-memory lookup, so there is nothing to prefetch)
+        if self.TOTAL_QUESTIONS > 1 and self.engine is None:
+            self._start_prefetch(session_id, user_context, 'Medium', [first_question['id']])
         
-        return {
-            'session_id': doc_ref.id,
+        result = {
+            'session_id': session_id,
             'total_questions': self.TOTAL_QUESTIONS,
             'first_question': self._sanitize_question(first_question)
         }
+        session_token = self.sessions.issue_token(session_id, session_data)
+        if session_token:
+            result['session_token'] = session_token
+        return result
 
-    def submit_answer(self, session_id: str, question_id: str, answer: str) -> Dict[str, Any]:
+    def submit_answer(self, session_id: str, question_id: str, answer: str,
+                      session_token: Optional[str] = None) -> Dict[str, Any]:
         """
         Processes an answer and determines the next step.
+
+        In token mode the session comes from `session_token`, and the response carries
+        the token for the next answer.
         """
-        session_ref = self.db.collection('test_sessions').document(session_id)
-        session = session_ref.get().to_dict()
+        session = self.sessions.get(session_id, question_id, token=session_token)
         
         if not session:
             raise ValueError("Session not found")
             
-        # Verify answer (In a real app, fetch question from DB to check correct_answer)
-        # For prototype, we assume we can get the question details or they were stored in session
-        # Optimization: Store current question ID and correct answer in session during 'get_question'
-        
-        # 1. Fetch question to check answer
-        question_doc = self.db.collection('questions').document(question_id).get()
-        question_data = question_doc.to_dict()
+        # 1. Check the answer against the question served to this session,
+        #    reading the question document only for sessions created before it was stored
+        current_question = session.get('current_question') or {}
+        if current_question.get('id') == question_id and 'correct_answer' in current_question:
+            question_data = current_question
+        else:
+            question_doc = self.db.collection('questions').document(question_id).get()
+            question_data = question_doc.to_dict()
         is_correct = (question_data['correct_answer'] == answer)
         
         # 2. Update Session
@@ -65,39 +110,138 @@ class AdaptiveTestService:
             'difficulty': question_data['difficulty'],
             'topic': question_data.get('topic')
         }
+        if self.engine is not None:
+            new_answer_record['irt_a'], new_answer_record['irt_b'] = item_params(question_data)
         
         session['answers'].append(new_answer_record)
         session['current_question_index'] += 1
         
-        # 3. Check if finished
-        if session['current_question_index'] >= self.TOTAL_QUESTIONS:
+        # 3. Check if finished (IRT: also once the ability estimate is precise enough)
+        if self.engine is not None:
+            theta, theta_se = self.engine.estimate_answers(session['answers'])
+            session['theta'], session['theta_se'] = theta, theta_se
+            finished = self.engine.is_done(session['current_question_index'], theta_se, self.TOTAL_QUESTIONS)
+        else:
+            finished = session['current_question_index'] >= self.TOTAL_QUESTIONS
+
+        if finished:
             session['is_finished'] = True
-            session_ref.set(session)
+            session['current_question'] = None
+            self.sessions.save_answer(session_id, session, new_answer_record)
             return {
                 'is_finished': True,
                 'results': self._calculate_results(session)
             }
             
         # 4. Adaptive Logic: Determine next difficulty
-        next_difficulty = self._calculate_next_difficulty(session['current_difficulty'], is_correct)
+        if self.engine is not None:
+            next_difficulty = self.engine.difficulty_for(theta)
+        else:
+            next_difficulty = self._calculate_next_difficulty(session['current_difficulty'], is_correct)
         session['current_difficulty'] = next_difficulty
-        session_ref.set(session)
         
-        # 5. Get Next Question
+        # 5. Get Next Question (IRT: most informative item at the new estimate;
+        #    label: prefetched while the student was answering, if available)
         answered_ids = [a['question_id'] for a in session.get('answers', [])]
         
-        next_question = self.question_service.get_question(
-            curriculum_system=session['user_context']['system'],
-            grade=session['user_context']['grade'],
-            difficulty=next_difficulty,
-            exclude_ids=answered_ids
-            # Logic for topic progression can be added here
-        )
+        if self.engine is not None:
+            next_question = self.engine.select(
+                session['user_context']['system'], session['user_context']['grade'], theta, answered_ids
+            )
+        else:
+            next_question = self._take_prefetched(session_id, next_difficulty, answered_ids)
+        if next_question is None:
+            next_question = self.question_service.get_question(
+                curriculum_system=session['user_context']['system'],
+                grade=session['user_context']['grade'],
+                difficulty=next_difficulty,
+                exclude_ids=answered_ids
+                # Logic for topic progression can be added here
+            )
+
+        # One session write per answer: the answer plus the question now being served
+        session['current_question'] = self._question_key(next_question)
+        self.sessions.save_answer(session_id, session, new_answer_record)
+
+        # Start on the question after this one, unless this is the last question
+        # (IRT sessions select from memory and never prefetch)
+        if self.engine is None:
+            if session['current_question_index'] + 1 < self.TOTAL_QUESTIONS:
+                self._start_prefetch(
+                    session_id, session['user_context'], next_difficulty,
+                    answered_ids + [next_question['id']]
+                )
+            else:
+                self._prefetched.pop(session_id)
         
-        return {
+        result = {
             'is_finished': False,
             'next_question': self._sanitize_question(next_question)
         }
+        session_token = self.sessions.issue_token(session_id, session)
+        if session_token:
+            result['session_token'] = session_token
+        return result
+
+    @staticmethod
+    def _question_key(question: Dict[str, Any]) -> Dict[str, Any]:
+        """What submit_answer needs to grade the served question without reading it again."""
+        key = {
+            'id': question['id'],
+            'correct_answer': question.get('correct_answer'),
+            'difficulty': question.get('difficulty'),
+            'topic': question.get('topic')
+        }
+        if 'irt_a' in question and 'irt_b' in question:
+            key['irt_a'], key['irt_b'] = question['irt_a'], question['irt_b']
+        return key
+
+    def _start_prefetch(self, session_id: str, user_context: Dict[str, Any], current_difficulty: str, exclude_ids: List[str]):
+        """
+        Starts looking up the next question for both possible outcomes of the current one.
+        Only two next difficulties exist, so both branches are fetched (or generated) in the background.
+        """
+        if not Config.ADAPTIVE_PREFETCH_ENABLED:
+            return
+
+        futures = {}
+        for is_correct in (True, False):
+            difficulty = self._calculate_next_difficulty(current_difficulty, is_correct)
+            if difficulty in futures:
+                continue
+            futures[difficulty] = self._prefetch_executor.submit(
+                self.question_service.get_question,
+                curriculum_system=user_context['system'],
+                grade=user_context['grade'],
+                difficulty=difficulty,
+                exclude_ids=list(exclude_ids)
+            )
+        self._prefetched.set(session_id, futures)
+        self.prefetch_stats['started'] += len(futures)
+
+    def _take_prefetched(self, session_id: str, difficulty: str, exclude_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Returns the prefetched question for this branch, or None to fall back to a direct lookup."""
+        futures = self._prefetched.get(session_id)
+        future = futures.get(difficulty) if futures else None
+        if future is None:
+            self.prefetch_stats['misses'] += 1
+            return None
+
+        try:
+            # A lookup still in flight has already done part of the work, so wait for it
+            question = future.result(timeout=Config.ADAPTIVE_PREFETCH_WAIT)
+        except FutureTimeoutError:
+            question = None
+        except Exception as e:
+            logger.error(f"Prefetched question lookup failed - Session: {session_id}: {e}", exc_info=True)
+            question = None
+
+        if not question or question.get('id') in exclude_ids:
+            self.prefetch_stats['misses'] += 1
+            return None
+
+        self.prefetch_stats['hits'] += 1
+        return question
 
     def _calculate_next_difficulty(self, current_difficulty: str, is_correct: bool) -> str:
         levels = ['Easy', 'Medium', 'Hard']
@@ -113,8 +257,11 @@ class AdaptiveTestService:
 
     def _calculate_results(self, session: Dict[str, Any]) -> Dict[str, Any]:
         # Simple result logic for prototype
-        correct_count = sum(1 for a in session['answers'] if a['is_correct'])
-        score_percent = (correct_count / self.TOTAL_QUESTIONS) * 100
+        answers = session['answers']
+        # IRT tests may stop before TOTAL_QUESTIONS
+        total = len(answers) or self.TOTAL_QUESTIONS
+        correct_count = sum(1 for a in answers if a['is_correct'])
+        score_percent = (correct_count / total) * 100
         
         rec_text = "You have a solid foundation."
         if score_percent < 50:
@@ -122,37 +269,9 @@ class AdaptiveTestService:
         elif score_percent > 80:
             rec_text = "You are ready for advanced challenges!"
             
-        # Detailed Analysis
-        answer_history = []
+        # Topic Stats
         topic_stats = {}
-        
-        for ans in session['answers']:
-            # Fetch full question data to get explanation
-            q_doc = self.db.collection('questions').document(ans['question_id']).get()
-            q_data = q_doc.to_dict() if q_doc.exists else {}
-            
-            explanation = q_data.get('explanation')
-            
-            # If incorrect and explanation missing, generate it
-            if not ans['is_correct'] and not explanation and q_data:
-                explanation = self.question_service.generate_explanation(
-                    q_data.get('text_latex', ''),
-                    q_data.get('correct_answer', ''),
-                    q_data.get('choices', [])
-                )
-                # Save back to DB
-                self.db.collection('questions').document(ans['question_id']).update({'explanation': explanation})
-            
-            answer_history.append({
-                'question_id': ans['question_id'],
-                'is_correct': ans['is_correct'],
-                'difficulty': ans.get('difficulty', 'Medium'),
-                'topic': ans.get('topic', 'General'),
-                'explanation': explanation, # Add explanation
-                'text_latex': q_data.get('text_latex', 'Question text unavailable') # Add text for context
-            })
-            
-            # Topic Stats
+        for ans in answers:
             topic = ans.get('topic', 'General')
             if topic not in topic_stats:
                 topic_stats[topic] = {'total': 0, 'correct': 0}
@@ -170,19 +289,39 @@ class AdaptiveTestService:
                 'total': stats['total']
             })
 
-        # Generate AI Performance Summary
+        # Generate AI Performance Summary (only needs the stats, so it runs while explanations are built)
         summary_stats = {
             'grade': session['user_context']['grade'],
             'score': correct_count,
-            'total': self.TOTAL_QUESTIONS,
+            'total': total,
             'topic_analysis': topic_analysis,
             'final_difficulty': session.get('current_difficulty', 'Medium')
         }
-        ai_recommendation = self.question_service.generate_performance_summary(summary_stats)
+        summary_future = self._prefetch_executor.submit(
+            self.question_service.generate_performance_summary, summary_stats
+        )
 
-        return {
+        # Detailed Analysis: one batched read for every answered question
+        questions = self._load_questions([a['question_id'] for a in answers])
+        explanations = self._generate_missing_explanations(answers, questions)
+
+        answer_history = []
+        for ans in answers:
+            q_data = questions.get(ans['question_id'], {})
+            answer_history.append({
+                'question_id': ans['question_id'],
+                'is_correct': ans['is_correct'],
+                'difficulty': ans.get('difficulty', 'Medium'),
+                'topic': ans.get('topic', 'General'),
+                'explanation': explanations.get(ans['question_id'], q_data.get('explanation')), # Add explanation
+                'text_latex': q_data.get('text_latex', 'Question text unavailable') # Add text for context
+            })
+
+        ai_recommendation = summary_future.result()
+
+        results = {
             'score': correct_count,
-            'total': self.TOTAL_QUESTIONS,
+            'total': total,
             'score_percent': int(score_percent),
             'recommendation_text': ai_recommendation, # Use AI summary
             'recommended_course': f"{session['user_context']['system']} Math",
@@ -190,6 +329,61 @@ class AdaptiveTestService:
             'answer_history': answer_history,
             'topic_analysis': topic_analysis
         }
+        if 'theta' in session:
+            results['ability'] = {'theta': round(session['theta'], 3), 'se': round(session['theta_se'], 3)}
+        return results
+
+    def _load_questions(self, question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Reads all answered questions in one get_all call: {question_id: question_data}."""
+        if not question_ids:
+            return {}
+        refs = [self.db.collection('questions').document(qid) for qid in dict.fromkeys(question_ids)]
+        questions = {}
+        for doc in self.db.get_all(refs):
+            if doc.exists:
+                questions[doc.id] = doc.to_dict() or {}
+        return questions
+
+    def _generate_missing_explanations(self, answers: List[Dict[str, Any]],
+                                       questions: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Generates explanations for wrong answers whose question has none, concurrently
+        and within ADAPTIVE_EXPLANATION_DEADLINE. New explanations are written back in
+        one batch; fallback text is shown but never persisted.
+        """
+        missing = {
+            a['question_id']: questions[a['question_id']]
+            for a in answers
+            if not a['is_correct'] and questions.get(a['question_id'])
+            and not questions[a['question_id']].get('explanation')
+        }
+        if not missing:
+            return {}
+
+        try:
+            generated, timed_out = self.question_service.generate_explanations(
+                missing, timeout=Config.ADAPTIVE_EXPLANATION_DEADLINE
+            )
+        except Exception as e:
+            logger.error(f"Explanation generation failed for {len(missing)} questions: {e}", exc_info=True)
+            generated, timed_out = {}, list(missing)
+        if timed_out:
+            logger.warning(
+                f"Explanations missed the {Config.ADAPTIVE_EXPLANATION_DEADLINE}s deadline - questions: {timed_out}"
+            )
+
+        explanations = {}
+        uow = UnitOfWork(self.db, name='adaptive-results')
+        for question_id in missing:
+            explanation = generated.get(question_id)
+            if not explanation:
+                explanations[question_id] = FallbackText("Explanation currently unavailable.")
+                continue
+            explanations[question_id] = explanation
+            if not isinstance(explanation, FallbackText):
+                uow.update(self.db.collection('questions').document(question_id), {'explanation': explanation})
+        uow.commit()
+        return explanations
 
     def _sanitize_question(self, question: Dict[str, Any]) -> Dict[str, Any]:
         """Removes the correct answer before sending to frontend."""
@@ -1,152 +1,332 @@
+import asyncio
 import json
 import re  # ⭐ 이 줄 추가!
+from concurrent.futures import ThreadPoolExecutor, wait
 from config import Config
 from utils.logger import setup_logger
-from utils.ai_client import call_ai_with_retry
+from utils.ai_client import call_ai_with_retry, call_ai_async, fan_out, run_ai_coroutine
+from utils.circuit_breaker import FallbackText
+from utils.response_cache import ResponseCache
+from utils.single_flight import SingleFlight
 
 logger = setup_logger(__name__)
 
 class AIService:
     """AI 해설 및 분석 서비스"""
-    
-    def __init__(self, ai_client):
+
+    def __init__(self, ai_client, single_flight=None, db=None):
         self.ai_client = ai_client
-    
-    def generate_solution(self, problem_id, problem_text, correct_answer, db_solution=None):
-        """문제 해설 생성 (일반 해설, user_answer 불필요)"""
-        try:
-            if db_solution:
-                solution_guide = (
-                    f"아래 '모범 풀이'를 기반으로 하되, 단순히 복사하지 말고, "
-                    f"각 단계가 **'왜(Why)'** 그렇게 되는지 논리적인 이유를 덧붙여 단계별로 설명해주세요.\n\n"
-                    f"**[참고용 모범 풀이]:** {db_solution}\n\n"
-                )
-            else:
-                solution_guide = (
-                    "모범 풀이가 제공되지 않았습니다. 문제를 직접 풀고, "
-                    "학생이 이해할 수 있도록 **해당 공식이나 정리**가 왜 적용되었는지 설명하며 "
-                    "단계별로 풀이 과정을 생성해주세요.\n\n"
-                )
+        # 약점 분석 응답 캐시 (db가 주어지고 영구 캐시가 켜져 있으면 Firestore 2차 캐시 사용)
+        self.weakness_cache = ResponseCache(
+            'weakness',
+            maxsize=Config.WEAKNESS_CACHE_SIZE,
+            ttl=Config.WEAKNESS_CACHE_TTL,
+            db=db if Config.WEAKNESS_CACHE_PERSIST else None
+        )
+        # 같은 문제 해설을 동시에 여러 번 생성하지 않도록 합침
+        self.single_flight = single_flight or SingleFlight()
+        # 해설 생성 전용 워커 풀 (요청 간 공유, 동시 Vertex 호출 수 제한)
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.AI_SOLUTION_WORKERS,
+            thread_name_prefix='ai-solution'
+        )
 
-            user_prompt = (
-                f"다음 문제의 정답은 {correct_answer}입니다. 이 답이 나오는 과정을 단계별로 설명해주세요.\n\n"
-                f"**문제:** {problem_text}\n\n"
-                f"**정답:** {correct_answer}\n\n"
-                f"{solution_guide}"
-                "**LaTeX 사용 규칙 (매우 중요!):**\n"
-                "1. LaTeX는 숫자와 영문자만: $2x + 5 = 10$, $\\frac{{a}}{{b}}$\n"
-                "2. 한글은 절대 LaTeX 안에 넣지 마세요!\n"
-                "   - 잘못된 예: $시간당대여료$\n"
-                "   - 올바른 예: 시간당 대여료는 $10t$입니다\n"
-                "3. 수식만 LaTeX로, 설명은 일반 텍스트로\n"
-                "4. HTML 태그 사용 금지: <br>, <strong> 등\n"
-                "5. 마크다운 볼드는 가능: **굵게**\n\n"
-                "**출력 형식:**\n"
-                "- 불필요한 서론 없이 바로 풀이 시작\n\n"
-                "지금 바로 풀이하세요:"
+    def submit_solutions(self, tasks, on_complete=None, cache=None, fetch_cached=None):
+        """
+        해설 생성 작업을 워커 풀에 제출
+
+        Args:
+            tasks: generate_solution 인자 dict 리스트
+                   (problem_id, problem_text, correct_answer, db_solution, 선택적으로 deadline)
+            on_complete: 해설 완료 시 호출되는 콜백 (problem_id, solution)
+                         마감 시간 이후에 끝난 작업에도 호출됨
+            cache: 생성된 해설 저장 함수 (problem_id, solution)
+                   동시 요청 중 실제로 생성한 한 곳에서만 호출됨
+                   반환 전에 저장이 끝나야 함 (UnitOfWork에 모으면 리스 해제 후
+                   다른 인스턴스가 fetch_cached로 찾지 못하고 다시 생성함)
+            fetch_cached: 저장된 해설 조회 함수 (problem_id) - 다른 인스턴스가 생성 중일 때 사용
+
+        Returns:
+            dict: {problem_id: Future}
+        """
+        futures = {}
+        for task in tasks:
+            futures[task['problem_id']] = self.executor.submit(
+                self._solve_task, task, on_complete, cache, fetch_cached
             )
-            
+
+        return futures
+
+    def _solve_task(self, task, on_complete=None, cache=None, fetch_cached=None):
+        """
+        워커 스레드에서 해설 생성(single-flight) 후 콜백 호출
+
+        콜백을 Future 완료 전에 실행하므로, 대기 중인 쪽은 해설이
+        완료로 보이는 시점에 콜백 처리도 끝났음을 보장받음
+        """
+        problem_id = task['problem_id']
+
+        def _generate():
+            solution = self.generate_solution(**task)
+            # 대체 문구(AI 장애/오류)는 캐싱하지 않음
+            if cache and not isinstance(solution, FallbackText):
+                cache(problem_id, solution)
+            return solution
+
+        fetch = (lambda: fetch_cached(problem_id)) if fetch_cached else None
+        key = f"solution:{problem_id}:{Config.SOLUTION_PROMPT_VERSION}"
+        solution, generated = self.single_flight.do(key, _generate, fetch=fetch)
+
+        if not generated:
+            logger.info(f"진행 중인 해설 생성 결과 공유 - 문제 ID: {problem_id}")
+
+        if on_complete:
+            try:
+                on_complete(problem_id, solution)
+            except Exception as e:
+                logger.error(f"해설 완료 콜백 실패 - 문제 ID: {problem_id}, 오류: {e}", exc_info=True)
+
+        return solution
+
+    def generate_solutions(self, tasks, timeout=None, on_complete=None, cache=None,
+                           fetch_cached=None):
+        """
+        여러 문제의 해설을 병렬 생성 (마감 시간 적용)
+
+        Args:
+            tasks: generate_solution 인자 dict 리스트
+            timeout: 마감 시간 (초), None이면 모두 끝날 때까지 대기
+            on_complete: 해설 완료 시 호출되는 콜백 (problem_id, solution)
+            cache: 생성된 해설 저장 함수 (submit_solutions 참고)
+            fetch_cached: 저장된 해설 조회 함수 (submit_solutions 참고)
+
+        Returns:
+            tuple: ({problem_id: solution}, [마감 시간 내 끝나지 않은 problem_id])
+        """
+        if not tasks:
+            return {}, []
+
+        logger.info(f"AI 해설 병렬 생성 시작 - {len(tasks)}개 문제, 마감: {timeout}초")
+
+        futures = self.submit_solutions(
+            tasks, on_complete=on_complete, cache=cache, fetch_cached=fetch_cached
+        )
+        done, _ = wait(futures.values(), timeout=timeout)
+
+        solutions = {}
+        pending = []
+        for problem_id, future in futures.items():
+            if future in done:
+                solutions[problem_id] = future.result()
+            else:
+                pending.append(problem_id)
+
+        if pending:
+            logger.warning(f"마감 시간 초과 - 해설 대기 중: {pending}")
+
+        logger.info(f"AI 해설 병렬 생성 완료 - 완료: {len(solutions)}, 대기: {len(pending)}")
+        return solutions, pending
+
+    def generate_solution(self, problem_id, problem_text, correct_answer, db_solution=None,
+                          deadline=None):
+        """문제 해설 생성 (일반 해설, user_answer 불필요, deadline 안에서만 재시도)"""
+        try:
+            full_prompt = self._build_solution_prompt(problem_text, correct_answer, db_solution)
+
             logger.info(f"AI 해설 생성 요청 - 문제 ID: {problem_id}")
 
             # 재시도 로직 포함 AI 호출
-            full_prompt = f"{Config.SOLUTION_SYSTEM_PROMPT}\n\n{user_prompt}"
             response = call_ai_with_retry(
                 model=self.ai_client,
                 contents=full_prompt,
-                max_retries=3
+                max_retries=3,
+                deadline=deadline,
+                call_site='generate_solution'
             )
-            
-            if response and hasattr(response, 'text') and response.text:
-                # ⭐ 줄바꿈을 <br>로 변환하지 않고 그대로 반환
-                solution = response.text
-                # ⭐⭐⭐ AI 원본 응답 로깅 (중요!) ⭐⭐⭐
-                logger.info("=" * 80)
-                logger.info(f"[AI RAW RESPONSE START] 문제 ID: {problem_id}")
-                logger.info("=" * 80)
-                logger.info(solution)
-                logger.info("=" * 80)
-                logger.info(f"[AI RAW RESPONSE END] 문제 ID: {problem_id}")
-                logger.info("=" * 80)
-                
-                # ⭐ 앞뒤 공백 제거
-                solution = solution.strip()
-
-                # HTML 태그 제거
-                solution = re.sub(r'<br\s*/?>', '\n', solution)
-                solution = re.sub(r'<[^>]+>', '', solution)
-
-                # ⭐ 연속된 줄바꿈을 2개로 제한
-                solution = re.sub(r'\n{3,}', '\n\n', solution)
-                
-                # 정제된 응답 로깅
-                logger.info("-" * 80)
-                logger.info(f"[AI CLEANED RESPONSE START] 문제 ID: {problem_id}")
-                logger.info("-" * 80)
-                logger.info(solution)
-                logger.info("-" * 80)
-                logger.info(f"[AI CLEANED RESPONSE END] 문제 ID: {problem_id}")
-                logger.info("-" * 80)
-                
-                # <br> 태그 개수 확인
-                br_count = len(re.findall(r'<br\s*/?>', solution))
-                if br_count > 0:
-                    logger.warning(f"⚠️  <br> 태그 {br_count}개 발견됨!")
-                
-                logger.info(f"AI 해설 생성 완료 - 문제 ID: {problem_id}")
-                return solution
 
-            else:
-                logger.warning(f"AI 응답 형식 오류 - 문제 ID: {problem_id}")
-                return "AI 해설 생성 중 문제가 발생했습니다."
-                
+            if response is None:
+                return self._fallback_solution(problem_id, db_solution)
+
+            return self._parse_solution_response(problem_id, response)
+
         except Exception as e:
             logger.error(f"AI 해설 생성 실패 - 문제 ID: {problem_id}, 오류: {e}", exc_info=True)
-            return f"AI 해설 생성 중 오류가 발생했습니다: {str(e)}"
-    
-    def analyze_weakness(self, wrong_categories, time_info=None):
-        """약점 분석 (시간 정보 포함)"""
+            return FallbackText(f"AI 해설 생성 중 오류가 발생했습니다: {str(e)}")
+
+    async def generate_solution_async(self, problem_id, problem_text, correct_answer, db_solution=None,
+                                      deadline=None):
+        """문제 해설 생성 (asyncio 버전, 스레드를 점유하지 않음)"""
+        try:
+            full_prompt = self._build_solution_prompt(problem_text, correct_answer, db_solution)
+
+            logger.info(f"AI 해설 비동기 생성 요청 - 문제 ID: {problem_id}")
+
+            response = await call_ai_async(
+                model=self.ai_client,
+                contents=full_prompt,
+                max_retries=3,
+                deadline=deadline,
+                call_site='generate_solution'
+            )
+
+            if response is None:
+                return self._fallback_solution(problem_id, db_solution)
+
+            return self._parse_solution_response(problem_id, response)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AI 해설 생성 실패 - 문제 ID: {problem_id}, 오류: {e}", exc_info=True)
+            return FallbackText(f"AI 해설 생성 중 오류가 발생했습니다: {str(e)}")
+
+    def generate_solutions_async(self, tasks, timeout=None):
+        """
+        여러 문제의 해설을 공유 AI 이벤트 루프에서 동시에 생성 (프롬프트당 스레드 없음)
+
+        Args:
+            tasks: generate_solution 인자 dict 리스트
+            timeout: 마감 시간 (초), 지나면 남은 호출은 취소
+
+        Returns:
+            tuple: ({problem_id: solution}, [마감 시간 내 끝나지 않은 problem_id])
+        """
+        if not tasks:
+            return {}, []
+
+        coros = {task['problem_id']: self.generate_solution_async(**task) for task in tasks}
+        return run_ai_coroutine(fan_out(coros, timeout=timeout))
+
+    @staticmethod
+    def _build_solution_prompt(problem_text, correct_answer, db_solution=None):
+        """해설 생성 프롬프트 (시스템 프롬프트 포함)"""
+        if db_solution:
+            solution_guide = (
+                f"아래 '모범 풀이'를 기반으로 하되, 단순히 복사하지 말고, "
+                f"각 단계가 **'왜(Why)'** 그렇게 되는지 논리적인 이유를 덧붙여 단계별로 설명해주세요.\n\n"
+                f"**[참고용 모범 풀이]:** {db_solution}\n\n"
+            )
+        else:
+            solution_guide = (
+                "모범 풀이가 제공되지 않았습니다. 문제를 직접 풀고, "
+                "학생이 이해할 수 있도록 **해당 공식이나 정리**가 왜 적용되었는지 설명하며 "
+                "단계별로 풀이 과정을 생성해주세요.\n\n"
+            )
+
+        user_prompt = (
+            f"다음 문제의 정답은 {correct_answer}입니다. 이 답이 나오는 과정을 단계별로 설명해주세요.\n\n"
+            f"**문제:** {problem_text}\n\n"
+            f"**정답:** {correct_answer}\n\n"
+            f"{solution_guide}"
+            "**LaTeX 사용 규칙 (매우 중요!):**\n"
+            "1. LaTeX는 숫자와 영문자만: $2x + 5 = 10$, $\\frac{{a}}{{b}}$\n"
+            "2. 한글은 절대 LaTeX 안에 넣지 마세요!\n"
+            "   - 잘못된 예: $시간당대여료$\n"
+            "   - 올바른 예: 시간당 대여료는 $10t$입니다\n"
+            "3. 수식만 LaTeX로, 설명은 일반 텍스트로\n"
+            "4. HTML 태그 사용 금지: <br>, <strong> 등\n"
+            "5. 마크다운 볼드는 가능: **굵게**\n\n"
+            "**출력 형식:**\n"
+            "- 불필요한 서론 없이 바로 풀이 시작\n\n"
+            "지금 바로 풀이하세요:"
+        )
+
+        return f"{Config.SOLUTION_SYSTEM_PROMPT}\n\n{user_prompt}"
+
+    @staticmethod
+    def _fallback_solution(problem_id, db_solution=None):
+        """AI 호출 실패/서킷 open 시 대체 해설 (모범 풀이가 있으면 그대로 사용)"""
+        logger.warning(f"AI 해설 대체 문구 사용 - 문제 ID: {problem_id}")
+        if db_solution:
+            return FallbackText(db_solution)
+        return FallbackText(Config.AI_FALLBACK_SOLUTION)
+
+    @staticmethod
+    def _parse_solution_response(problem_id, response):
+        """AI 응답에서 해설 추출 및 정제"""
+        if response and hasattr(response, 'text') and response.text:
+            # ⭐ 줄바꿈을 <br>로 변환하지 않고 그대로 반환
+            solution = response.text
+            # ⭐⭐⭐ AI 원본 응답 로깅 (중요!) ⭐⭐⭐
+            logger.info("=" * 80)
+            logger.info(f"[AI RAW RESPONSE START] 문제 ID: {problem_id}")
+            logger.info("=" * 80)
+            logger.info(solution)
+            logger.info("=" * 80)
+            logger.info(f"[AI RAW RESPONSE END] 문제 ID: {problem_id}")
+            logger.info("=" * 80)
+
+            # ⭐ 앞뒤 공백 제거
+            solution = solution.strip()
+
+            # HTML 태그 제거
+            solution = re.sub(r'<br\s*/?>', '\n', solution)
+            solution = re.sub(r'<[^>]+>', '', solution)
+
+            # ⭐ 연속된 줄바꿈을 2개로 제한
+            solution = re.sub(r'\n{3,}', '\n\n', solution)
+
+            # 정제된 응답 로깅
+            logger.info("-" * 80)
+            logger.info(f"[AI CLEANED RESPONSE START] 문제 ID: {problem_id}")
+            logger.info("-" * 80)
+            logger.info(solution)
+            logger.info("-" * 80)
+            logger.info(f"[AI CLEANED RESPONSE END] 문제 ID: {problem_id}")
+            logger.info("-" * 80)
+
+            # <br> 태그 개수 확인
+            br_count = len(re.findall(r'<br\s*/?>', solution))
+            if br_count > 0:
+                logger.warning(f"⚠️  <br> 태그 {br_count}개 발견됨!")
+
+            logger.info(f"AI 해설 생성 완료 - 문제 ID: {problem_id}")
+            return solution
+
+        else:
+            logger.warning(f"AI 응답 형식 오류 - 문제 ID: {problem_id}")
+            return FallbackText("AI 해설 생성 중 문제가 발생했습니다.")
+
+    def analyze_weakness(self, wrong_categories, time_info=None, deadline=None):
+        """
+        약점 분석 (시간 정보 포함, 캐시 적용, deadline 안에서만 재시도)
+
+        프롬프트는 틀린 카테고리 멀티셋과 시간 초과 여부(버킷)로만 결정되므로,
+        같은 조합의 학생은 캐시된 분석을 재사용합니다.
+        """
         try:
             if not wrong_categories:
                 return "모든 문제를 맞추셨습니다! 훌륭해요!"
 
             logger.info(f"AI 약점 분석 요청 - {len(wrong_categories)}개 카테고리")
 
-            # 시간 정보 문자열 생성
+            # 카테고리 순서와 무관하게 같은 키/프롬프트가 되도록 정렬
+            sorted_categories = sorted(wrong_categories)
+            time_bucket = self._time_bucket(time_info)
+
+            cache_key = ResponseCache.make_key(
+                sorted_categories, time_bucket, Config.ANALYSIS_PROMPT_VERSION
+            )
+            cached_analysis = self.weakness_cache.get(cache_key)
+            if cached_analysis:
+                logger.info(f"AI 약점 분석 캐시 사용 (시간 버킷: {time_bucket})")
+                return cached_analysis
+
+            # 시간 정보 문자열 생성 (버킷 단위)
             time_context = ""
-            if time_info:
-                total_time = time_info.get('total_time_spent', 0)
-                time_limit = time_info.get('time_limit', 1800)
-                is_overtime = time_info.get('is_overtime', False)
-
-                minutes = total_time // 60
-                seconds = total_time % 60
-                limit_minutes = time_limit // 60
-
-                if is_overtime:
-                    overtime_seconds = total_time - time_limit
-                    overtime_minutes = overtime_seconds // 60
-                    overtime_secs = overtime_seconds % 60
-                    time_context = (
-                        f"\n\n**시간 분석:**\n"
-                        f"- 제한 시간: {limit_minutes}분\n"
-                        f"- 실제 소요 시간: {minutes}분 {seconds}초\n"
-                        f"- 초과 시간: {overtime_minutes}분 {overtime_secs}초\n"
-                        f"- 학생이 제한 시간을 초과하여 문제를 풀었습니다. 시간 관리에 대한 조언도 포함해주세요.\n"
-                    )
-                else:
-                    saved_seconds = time_limit - total_time
-                    saved_minutes = saved_seconds // 60
-                    saved_secs = saved_seconds % 60
-                    time_context = (
-                        f"\n\n**시간 분석:**\n"
-                        f"- 제한 시간: {limit_minutes}분\n"
-                        f"- 실제 소요 시간: {minutes}분 {seconds}초\n"
-                        f"- 남은 시간: {saved_minutes}분 {saved_secs}초\n"
-                        f"- 학생이 제한 시간보다 빠르게 문제를 풀었습니다. 이 점을 긍정적으로 언급해주세요.\n"
-                    )
+            if time_bucket == 'over':
+                time_context = (
+                    "\n\n**시간 분석:**\n"
+                    "- 학생이 제한 시간을 초과하여 문제를 풀었습니다. 시간 관리에 대한 조언도 포함해주세요.\n"
+                )
+            elif time_bucket == 'under':
+                time_context = (
+                    "\n\n**시간 분석:**\n"
+                    "- 학생이 제한 시간보다 빠르게 문제를 풀었습니다. 이 점을 긍정적으로 언급해주세요.\n"
+                )
 
             user_prompt = (
-                f"학생이 틀린 문제의 카테고리 리스트입니다: {json.dumps(wrong_categories, ensure_ascii=False)}\n"
+                f"학생이 틀린 문제의 카테고리 리스트입니다: {json.dumps(sorted_categories, ensure_ascii=False)}\n"
                 f"{time_context}\n"
                 "학생의 약점을 진단하고 다음 학습을 추천해주세요."
             )
@@ -156,18 +336,29 @@ class AIService:
             response = call_ai_with_retry(
                 model=self.ai_client,
                 contents=full_prompt,
-                max_retries=3
+                max_retries=3,
+                deadline=deadline,
+                call_site='analyze_weakness'
             )
 
             if response and hasattr(response, 'text') and response.text:
                 # ⭐ 줄바꿈을 <br>로 변환하지 않고 그대로 반환
                 analysis = response.text
+                # 정상 응답만 캐싱 (오류 문구는 캐싱하지 않음)
+                self.weakness_cache.set(cache_key, analysis)
                 logger.info("AI 약점 분석 완료")
                 return analysis
             else:
-                logger.warning("AI 약점 분석 응답 형식 오류")
-                return "AI 약점 분석 중 문제가 발생했습니다."
+                logger.warning("AI 약점 분석 응답 없음 - 대체 문구 사용")
+                return FallbackText(Config.AI_FALLBACK_ANALYSIS)
 
         except Exception as e:
             logger.error(f"AI 약점 분석 실패: {e}", exc_info=True)
-            return f"AI 약점 분석 중 오류가 발생했습니다: {str(e)}"
\ No newline at end of file
+            return FallbackText(f"AI 약점 분석 중 오류가 발생했습니다: {str(e)}")
+
+    @staticmethod
+    def _time_bucket(time_info):
+        """시간 정보를 캐시 키용 버킷으로 변환 ('over' | 'under' | None)"""
+        if not time_info:
+            return None
+        return 'over' if time_info.get('is_overtime', False) else 'under'
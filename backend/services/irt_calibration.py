@@ -0,0 +1,190 @@
+from array import array
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+from google.cloud import firestore
+from utils.logger import setup_logger
+from utils.unit_of_work import UnitOfWork
+
+logger = setup_logger(__name__)
+
+# Items with fewer responses keep their label prior
+MIN_RESPONSES = 30
+
+# Bounds that keep sparse or degenerate items from running off
+A_RANGE = (0.2, 4.0)
+B_RANGE = (-4.0, 4.0)
+
+# Weak normal priors on the slope (around 1) and intercept (around 0) for stability
+A_PRIOR_SD = 1.0
+C_PRIOR_SD = 3.0
+
+
+class ResponseMatrix:
+    """
+    Long-format 0/1 response data: one (person, item, correct) triple per answer.
+
+    Persons and items are interned to dense integer indices as responses are added,
+    and the triples are kept in compact typed arrays so millions of answers can be
+    streamed without holding the source documents.
+    """
+
+    def __init__(self):
+        self.person_ids: Dict[Hashable, int] = {}
+        self.item_ids: Dict[Hashable, int] = {}
+        self._persons = array('i')
+        self._items = array('i')
+        self._correct = array('b')
+
+    def add(self, person: Hashable, item: Hashable, correct: bool):
+        self._persons.append(self.person_ids.setdefault(person, len(self.person_ids)))
+        self._items.append(self.item_ids.setdefault(item, len(self.item_ids)))
+        self._correct.append(1 if correct else 0)
+
+    def __len__(self):
+        return len(self._correct)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (np.frombuffer(self._persons, dtype=np.int32).astype(np.intp),
+                np.frombuffer(self._items, dtype=np.int32).astype(np.intp),
+                np.frombuffer(self._correct, dtype=np.int8).astype(float))
+
+    def items(self):
+        """Item keys in index order."""
+        keys = [None] * len(self.item_ids)
+        for key, index in self.item_ids.items():
+            keys[index] = key
+        return keys
+
+
+def fit_2pl(persons: np.ndarray, items: np.ndarray, correct: np.ndarray, n_items: int,
+            grid_points: int = 41, max_iter: int = 200, tol: float = 1e-4) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Marginal maximum likelihood 2PL fit (Bock-Aitkin EM over a quadrature grid).
+
+    The E-step computes every person's posterior over the ability grid and the M-step
+    takes one Newton step per item on the expected complete-data likelihood, all as
+    array operations over the response list (no per-person or per-item loops).
+
+    Returns:
+        tuple: (discrimination a, difficulty b) arrays of length n_items
+    """
+    grid = np.linspace(-4.0, 4.0, grid_points)
+    log_weights = -0.5 * grid ** 2
+    log_weights -= np.log(np.exp(log_weights).sum())
+    n_persons = int(persons.max()) + 1 if len(persons) else 0
+
+    a = np.ones(n_items)
+    c = np.zeros(n_items)  # intercept, b = -c / a
+    u = correct[:, None]
+    person_cells = (persons[:, None] * grid_points + np.arange(grid_points)).ravel()
+    item_cells = (items[:, None] * grid_points + np.arange(grid_points)).ravel()
+
+    for iteration in range(max_iter):
+        # E-step: posterior over the grid per person
+        p = np.clip(1.0 / (1.0 + np.exp(-(a[items, None] * grid + c[items, None]))), 1e-9, 1 - 1e-9)
+        log_lik = u * np.log(p) + (1.0 - u) * np.log(1.0 - p)
+        person_ll = np.bincount(person_cells, weights=log_lik.ravel(),
+                                minlength=n_persons * grid_points).reshape(n_persons, grid_points)
+        log_post = person_ll + log_weights
+        post = np.exp(log_post - log_post.max(axis=1, keepdims=True))
+        post /= post.sum(axis=1, keepdims=True)
+
+        # Expected attempts (n) and correct answers (r) per item and grid point
+        weights = post[persons]
+        n = np.bincount(item_cells, weights=weights.ravel(), minlength=n_items * grid_points).reshape(n_items, grid_points)
+        r = np.bincount(item_cells, weights=(weights * u).ravel(), minlength=n_items * grid_points).reshape(n_items, grid_points)
+
+        # M-step: one penalized Newton step per item on (a, c)
+        p_grid = 1.0 / (1.0 + np.exp(-(a[:, None] * grid + c[:, None])))
+        residual = r - n * p_grid
+        w = n * p_grid * (1.0 - p_grid)
+        g_a = (residual * grid).sum(axis=1) - (a - 1.0) / A_PRIOR_SD ** 2
+        g_c = residual.sum(axis=1) - c / C_PRIOR_SD ** 2
+        h_aa = (w * grid ** 2).sum(axis=1) + 1.0 / A_PRIOR_SD ** 2
+        h_ac = (w * grid).sum(axis=1)
+        h_cc = w.sum(axis=1) + 1.0 / C_PRIOR_SD ** 2
+        det = h_aa * h_cc - h_ac ** 2
+        step_a = (h_cc * g_a - h_ac * g_c) / det
+        step_c = (h_aa * g_c - h_ac * g_a) / det
+
+        new_a = np.clip(a + step_a, *A_RANGE)
+        new_c = np.clip(c + step_c, -B_RANGE[1] * new_a, -B_RANGE[0] * new_a)
+        change = max(np.abs(new_a - a).max(initial=0.0), np.abs(new_c - c).max(initial=0.0))
+        a, c = new_a, new_c
+        if change < tol:
+            logger.info(f"2PL fit converged after {iteration + 1} iterations")
+            break
+
+    return a, -c / a
+
+
+class IRTCalibrator:
+    """
+    Offline 2PL calibration from stored answer history.
+
+    Reads level-test answers (`users/*/test_sessions/*/answers`, items in `problems`)
+    and adaptive sessions (`test_sessions`, items in `questions`), fits discrimination
+    and difficulty for every item with enough responses, and writes irt_a/irt_b back
+    in batched updates. Both sources are fitted on one ability scale.
+    """
+
+    def __init__(self, db, min_responses: int = MIN_RESPONSES):
+        self.db = db
+        self.min_responses = min_responses
+        self.stats = {'level_answers': 0, 'adaptive_answers': 0, 'skipped_items': 0, 'written': 0}
+
+    def load(self, matrix: Optional[ResponseMatrix] = None) -> ResponseMatrix:
+        matrix = matrix or ResponseMatrix()
+
+        # Level tests: each answers subcollection belongs to one session (one person)
+        for doc in self.db.collection_group('answers').select(['problem_id', 'is_correct']).stream():
+            data = doc.to_dict() or {}
+            problem_id = data.get('problem_id') or doc.id
+            if data.get('is_correct') is None:
+                continue
+            matrix.add(doc.reference.parent.parent.path, ('problems', problem_id), data['is_correct'])
+            self.stats['level_answers'] += 1
+
+        # Adaptive tests: answers are stored inline on the session document
+        for doc in self.db.collection('test_sessions').select(['answers']).stream():
+            for answer in (doc.to_dict() or {}).get('answers') or []:
+                if not isinstance(answer, dict) or answer.get('is_correct') is None:
+                    continue
+                matrix.add(f"test_sessions/{doc.id}", ('questions', answer.get('question_id')), answer['is_correct'])
+                self.stats['adaptive_answers'] += 1
+
+        logger.info(f"IRT calibration data: {len(matrix)} answers, {len(matrix.person_ids)} sessions, "
+                    f"{len(matrix.item_ids)} items")
+        return matrix
+
+    def fit(self, matrix: ResponseMatrix) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """{(collection, item_id): {'irt_a', 'irt_b', 'irt_n'}} for items with enough responses."""
+        if not len(matrix):
+            return {}
+        persons, items, correct = matrix.arrays()
+        a, b = fit_2pl(persons, items, correct, len(matrix.item_ids))
+        counts = np.bincount(items, minlength=len(matrix.item_ids))
+
+        params = {}
+        for index, key in enumerate(matrix.items()):
+            if counts[index] < self.min_responses or not key[1]:
+                self.stats['skipped_items'] += 1
+                continue
+            params[key] = {'irt_a': round(float(a[index]), 4), 'irt_b': round(float(b[index]), 4),
+                           'irt_n': int(counts[index])}
+        return params
+
+    def write(self, params: Dict[Tuple[str, str], Dict[str, Any]]) -> Dict[str, Any]:
+        uow = UnitOfWork(self.db, name='irt-calibration')
+        for (collection, item_id), values in params.items():
+            uow.update(self.db.collection(collection).document(item_id),
+                       dict(values, irt_calibrated_at=firestore.SERVER_TIMESTAMP))
+        summary = uow.commit()
+        self.stats['written'] = summary['writes']
+        return summary
+
+    def run(self, dry_run: bool = False) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        params = self.fit(self.load())
+        if not dry_run:
+            self.write(params)
+        return params
@@ -0,0 +1,168 @@
+import random
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+
+# 2PL parameters assumed for items that have not been calibrated yet (by difficulty label)
+PRIOR_B = {'Easy': -1.0, 'Medium': 0.0, 'Hard': 1.0}
+PRIOR_A = 1.0
+
+
+def item_params(question: Dict[str, Any]) -> Tuple[float, float]:
+    """(discrimination a, difficulty b) of a question: calibrated values or the label prior."""
+    a, b = question.get('irt_a'), question.get('irt_b')
+    if a is None or b is None:
+        return PRIOR_A, PRIOR_B.get(question.get('difficulty'), 0.0)
+    return float(a), float(b)
+
+
+def probability(a: np.ndarray, b: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """2PL probability of a correct answer, shape (items, thetas)."""
+    return 1.0 / (1.0 + np.exp(-a[:, None] * (theta[None, :] - b[:, None])))
+
+
+class ItemBank:
+    """
+    Items of one (curriculum_system, grade) with their information precomputed
+    on the quadrature grid: info[i, g] = a_i^2 * P_i(grid_g) * (1 - P_i(grid_g)).
+    """
+
+    def __init__(self, records: Sequence[Any], grid: np.ndarray):
+        self.records = list(records)
+        self.positions = {record.id: i for i, record in enumerate(self.records)}
+        params = np.array([
+            item_params({'irt_a': r.irt_a, 'irt_b': r.irt_b, 'difficulty': r.difficulty})
+            for r in self.records
+        ], dtype=float).reshape(-1, 2)
+        self.a, self.b = params[:, 0], params[:, 1]
+        self.grid = grid
+        p = probability(self.a, self.b, grid)
+        self.info = (self.a ** 2)[:, None] * p * (1.0 - p)
+
+    def __len__(self):
+        return len(self.records)
+
+    def select(self, theta: float, exclude_ids: Iterable[str] = (), randomesque: int = 1) -> Optional[Any]:
+        """
+        Maximum-information item at theta, drawn at random among the `randomesque`
+        most informative items so the same few items are not shown to everyone.
+        """
+        if not self.records:
+            return None
+        g = int(np.abs(self.grid - theta).argmin())
+        info = self.info[:, g].copy()
+        excluded = [self.positions[qid] for qid in exclude_ids if qid in self.positions]
+        info[excluded] = -np.inf
+
+        available = len(info) - len(set(excluded))
+        if available <= 0:
+            return None
+        k = max(1, min(randomesque, available))
+        top = np.argpartition(-info, k - 1)[:k]
+        return self.records[int(random.choice(top))]
+
+
+class IRTEngine:
+    """
+    Computerized adaptive testing with a 2PL IRT model.
+
+    - Ability is the EAP estimate over a fixed quadrature grid with a standard normal prior.
+    - The next item is the most informative one at the current estimate among the
+      grade's indexed questions, with randomesque exposure control.
+    - A test may stop early once the posterior SD drops below the SE target.
+
+    Item banks are built from the in-memory QuestionIndex and rebuilt when the index
+    changes. Without a ready index, callers fall back to label-based lookups using
+    `difficulty_for(theta)`.
+    """
+
+    def __init__(self, index=None, grid_points: int = None, randomesque: int = None,
+                 min_items: int = None, se_target: float = None):
+        self.index = index
+        self.grid = np.linspace(-4.0, 4.0, grid_points or Config.ADAPTIVE_IRT_GRID_POINTS)
+        self.log_prior = -0.5 * self.grid ** 2
+        self.randomesque = randomesque or Config.ADAPTIVE_IRT_RANDOMESQUE
+        self.min_items = min_items if min_items is not None else Config.ADAPTIVE_IRT_MIN_ITEMS
+        self.se_target = se_target if se_target is not None else Config.ADAPTIVE_IRT_SE_TARGET
+        self._banks: Dict[Tuple[str, str], Tuple[int, ItemBank]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'selections': 0, 'fallbacks': 0, 'bank_builds': 0}
+
+    def estimate(self, responses: Sequence[Tuple[float, float, bool]]) -> Tuple[float, float]:
+        """
+        EAP ability estimate.
+
+        Args:
+            responses: (a, b, is_correct) per answered item
+
+        Returns:
+            tuple: (theta, posterior standard deviation)
+        """
+        log_post = self.log_prior.copy()
+        if responses:
+            data = np.array(responses, dtype=float).reshape(-1, 3)
+            p = np.clip(probability(data[:, 0], data[:, 1], self.grid), 1e-9, 1 - 1e-9)
+            u = data[:, 2][:, None]
+            log_post += (u * np.log(p) + (1.0 - u) * np.log(1.0 - p)).sum(axis=0)
+
+        post = np.exp(log_post - log_post.max())
+        post /= post.sum()
+        theta = float(post @ self.grid)
+        se = float(np.sqrt(post @ (self.grid - theta) ** 2))
+        return theta, se
+
+    def estimate_answers(self, answers: List[Dict[str, Any]]) -> Tuple[float, float]:
+        """EAP estimate from session answer records (which carry irt_a/irt_b)."""
+        return self.estimate([
+            item_params(answer) + (bool(answer['is_correct']),) for answer in answers
+        ])
+
+    @staticmethod
+    def difficulty_for(theta: float) -> str:
+        """Difficulty label whose prior b is closest to theta."""
+        if theta < -0.5:
+            return 'Easy'
+        if theta > 0.5:
+            return 'Hard'
+        return 'Medium'
+
+    def is_done(self, answered: int, se: float, max_items: int) -> bool:
+        return answered >= max_items or (answered >= self.min_items and se <= self.se_target)
+
+    def bank(self, curriculum_system: str, grade: str) -> Optional[ItemBank]:
+        """Item bank for a grade, rebuilt when the index has changed since the last build."""
+        if self.index is None or not self.index.ready:
+            return None
+        key = (curriculum_system, grade)
+        version = self.index.version
+        cached = self._banks.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        bank = ItemBank(self.index.records(curriculum_system, grade, DIFFICULTIES), self.grid)
+        with self._lock:
+            self._banks[key] = (version, bank)
+            self.stats['bank_builds'] += 1
+        return bank
+
+    def select(self, curriculum_system: str, grade: str, theta: float,
+               exclude_ids: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Next question by maximum information, or None when the bank cannot serve one."""
+        bank = self.bank(curriculum_system, grade)
+        record = bank.select(theta, set(exclude_ids), self.randomesque) if bank is not None else None
+        if record is None:
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats['selections'] += 1
+        return record.to_question()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            banks = {f"{k[0]}/{k[1]}": len(bank) for k, (_, bank) in self._banks.items()}
+        return dict(self.stats, banks=banks)
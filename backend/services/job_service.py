@@ -0,0 +1,172 @@
+"""
+비동기 분석 작업 관리 서비스
+"""
+from concurrent.futures import ThreadPoolExecutor
+from google.cloud import firestore
+from config import Config
+from utils.logger import setup_logger
+import copy
+import threading
+import time
+import uuid
+
+logger = setup_logger(__name__)
+
+
+class JobService:
+    """submit_and_analyze 백그라운드 작업 관리 서비스"""
+
+    COLLECTION = 'analysis_jobs'
+
+    def __init__(self, db):
+        self.db = db
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.ANALYSIS_JOB_WORKERS,
+            thread_name_prefix='analysis-job'
+        )
+        # 같은 인스턴스의 폴링은 메모리에서 응답, 다른 인스턴스는 Firestore에서 조회
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, user_id, session_id, results):
+        """
+        새 분석 작업 생성
+
+        Args:
+            user_id: 사용자 ID
+            session_id: 테스트 세션 ID (게스트는 None)
+            results: 채점 결과 리스트 (해설 제외)
+
+        Returns:
+            str: job_id
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'session_id': session_id,
+            'status': 'running',
+            'test_results': copy.deepcopy(results),
+            'explanations': {},
+            'ai_analysis_report': None,
+            'pending_explanations': [],
+            'error': None,
+            'created_at': time.time()
+        }
+
+        with self._lock:
+            self._prune_expired()
+            self._jobs[job_id] = job
+
+        self._persist(job_id, {
+            'job_id': job_id,
+            'user_id': user_id,
+            'session_id': session_id,
+            'status': 'running',
+            'test_results': job['test_results'],
+            'explanations': {},
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+        logger.info(f"분석 작업 생성 - Job: {job_id}, User: {user_id}")
+        return job_id
+
+    def run(self, job_id, fn):
+        """작업 함수를 백그라운드 실행 (예외 발생 시 failed 처리)"""
+        def _wrapper():
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"분석 작업 실패 - Job: {job_id}, 오류: {e}", exc_info=True)
+                self._update(job_id, {'status': 'failed', 'error': str(e)})
+
+        return self.executor.submit(_wrapper)
+
+    def add_explanation(self, job_id, problem_id, solution):
+        """완료된 해설을 작업에 기록 (부분 결과)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job['explanations'][problem_id] = solution
+
+        # merge=True는 맵 필드를 병합하므로 다른 해설을 덮어쓰지 않음
+        self._persist(job_id, {
+            'explanations': {problem_id: solution},
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+    def complete_job(self, job_id, analysis_report, pending_ids):
+        """작업 완료 처리"""
+        self._update(job_id, {
+            'status': 'completed',
+            'ai_analysis_report': analysis_report,
+            'pending_explanations': pending_ids
+        })
+        logger.info(f"분석 작업 완료 - Job: {job_id}, 대기 해설: {len(pending_ids)}개")
+
+    def get_job(self, job_id):
+        """
+        작업 상태 및 부분/최종 결과 조회
+
+        Returns:
+            dict or None: 해설이 병합된 작업 결과
+        """
+        with self._lock:
+            job = copy.deepcopy(self._jobs.get(job_id))
+
+        if job is None:
+            try:
+                doc = self.db.collection(self.COLLECTION).document(job_id).get()
+            except Exception as e:
+                logger.error(f"분석 작업 조회 실패 - Job: {job_id}, 오류: {e}", exc_info=True)
+                return None
+            if not doc.exists:
+                return None
+            job = doc.to_dict()
+
+        explanations = job.get('explanations') or {}
+        pending_ids = set(job.get('pending_explanations') or [])
+        test_results = job.get('test_results') or []
+
+        for result in test_results:
+            problem_id = result.get('id')
+            if problem_id in explanations:
+                result['ai_solution'] = explanations[problem_id]
+                result['ai_solution_status'] = 'ready'
+            elif not result.get('is_correct') and 'ai_solution' not in result:
+                result['ai_solution'] = Config.AI_SOLUTION_PENDING_MESSAGE
+                result['ai_solution_status'] = 'pending'
+                pending_ids.add(problem_id)
+
+        return {
+            'job_id': job_id,
+            'user_id': job.get('user_id'),
+            'session_id': job.get('session_id'),
+            'status': job.get('status'),
+            'test_results': test_results,
+            'ai_analysis_report': job.get('ai_analysis_report'),
+            'pending_explanations': sorted(pending_ids),
+            'error': job.get('error')
+        }
+
+    def _update(self, job_id, fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+        self._persist(job_id, dict(fields, updated_at=firestore.SERVER_TIMESTAMP))
+
+    def _persist(self, job_id, data):
+        try:
+            self.db.collection(self.COLLECTION).document(job_id).set(data, merge=True)
+        except Exception as e:
+            logger.error(f"분석 작업 저장 실패 - Job: {job_id}, 오류: {e}", exc_info=True)
+
+    def _prune_expired(self):
+        """TTL이 지난 작업을 메모리에서 제거 (호출자가 lock 보유)"""
+        cutoff = time.time() - Config.ANALYSIS_JOB_TTL
+        expired = [job_id for job_id, job in self._jobs.items() if job['created_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
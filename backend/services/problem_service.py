@@ -1,5 +1,7 @@
 from google.cloud import firestore
+from config import Config
 from utils.logger import setup_logger
+from utils.unit_of_work import stage_update
 
 logger = setup_logger(__name__)
 
@@ -111,23 +113,25 @@ class ProblemService:
             logger.error(f"해설 조회 실패: {e}", exc_info=True)
             return None
 
-    def cache_explanation(self, problem_id, explanation):
+    def cache_explanation(self, problem_id, explanation, uow=None):
         """
         AI 생성 해설을 데이터베이스에 캐싱
 
         Args:
             problem_id: 문제 ID
             explanation: AI 생성 해설
+            uow: UnitOfWork (지정 시 쓰기를 모아 일괄 커밋)
 
         Returns:
             bool: 성공 여부
         """
         try:
             doc_ref = self.db.collection('problems').document(problem_id)
-            doc_ref.update({
+            stage_update(doc_ref, {
                 'explanation': explanation,
+                'explanation_prompt_version': Config.SOLUTION_PROMPT_VERSION,
                 'explanation_generated_at': firestore.SERVER_TIMESTAMP
-            })
+            }, uow=uow)
             logger.info(f"문제 {problem_id} 해설 캐싱 성공")
             return True
 
@@ -0,0 +1,281 @@
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Fields kept in memory per question (explanations stay in Firestore)
+INDEXED_FIELDS = [
+    'curriculum_system', 'grade', 'difficulty', 'topic', 'subtopic',
+    'text_latex', 'choices', 'correct_answer', 'created_at', 'irt_a', 'irt_b'
+]
+
+
+class QuestionRecord:
+    """Compact in-memory copy of a question document."""
+
+    __slots__ = ('id', 'curriculum_system', 'grade', 'difficulty', 'topic', 'subtopic',
+                 'text_latex', 'choices', 'correct_answer', 'irt_a', 'irt_b')
+
+    def __init__(self, question_id: str, data: Dict[str, Any]):
+        self.id = question_id
+        self.curriculum_system = data.get('curriculum_system')
+        self.grade = data.get('grade')
+        self.difficulty = data.get('difficulty')
+        self.topic = data.get('topic')
+        self.subtopic = data.get('subtopic')
+        self.text_latex = data.get('text_latex')
+        self.choices = tuple(
+            (c.get('id'), c.get('text')) for c in data.get('choices') or [] if isinstance(c, dict)
+        )
+        self.correct_answer = data.get('correct_answer')
+        # Calibrated 2PL parameters (None until scripts/calibrate_irt.py has run)
+        self.irt_a = data.get('irt_a')
+        self.irt_b = data.get('irt_b')
+
+    def cells(self) -> List[Tuple]:
+        base = (self.curriculum_system, self.grade, self.difficulty)
+        cells = [base + (None,)]
+        if self.topic:
+            cells.append(base + (self.topic,))
+        return cells
+
+    def to_question(self) -> Dict[str, Any]:
+        question = {
+            'id': self.id,
+            'curriculum_system': self.curriculum_system,
+            'grade': self.grade,
+            'difficulty': self.difficulty,
+            'topic': self.topic,
+            'subtopic': self.subtopic,
+            'text_latex': self.text_latex,
+            'choices': [{'id': cid, 'text': text} for cid, text in self.choices],
+            'correct_answer': self.correct_answer
+        }
+        if self.irt_a is not None and self.irt_b is not None:
+            question['irt_a'], question['irt_b'] = self.irt_a, self.irt_b
+        return question
+
+
+class _Cell:
+    """Question ids in one cell with O(1) add, remove and random pick."""
+
+    __slots__ = ('ids', 'positions')
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def add(self, question_id: str):
+        if question_id not in self.positions:
+            self.positions[question_id] = len(self.ids)
+            self.ids.append(question_id)
+
+    def remove(self, question_id: str):
+        index = self.positions.pop(question_id, None)
+        if index is None:
+            return
+        last = self.ids.pop()
+        if index < len(self.ids):
+            self.ids[index] = last
+            self.positions[last] = index
+
+    def pick(self, exclude_ids) -> Optional[str]:
+        if not self.ids:
+            return None
+        # A few random probes are enough while exclude_ids is small relative to the cell
+        for _ in range(8):
+            question_id = random.choice(self.ids)
+            if question_id not in exclude_ids:
+                return question_id
+        remaining = [qid for qid in self.ids if qid not in exclude_ids]
+        return random.choice(remaining) if remaining else None
+
+
+class QuestionIndex:
+    """
+    Process-wide in-memory index of the `questions` collection.
+
+    Questions are grouped by (curriculum_system, grade, difficulty, topic), and
+    every question is also listed under topic=None. The index is kept fresh by a
+    Firestore snapshot listener ('listener' mode) or by polling for documents
+    created since the last refresh with a periodic full reload ('poll' mode).
+    `ready` stays False until the initial load completes; callers should query
+    Firestore directly until then.
+    """
+
+    def __init__(self, db, mode: str = None):
+        self.db = db
+        self.mode = mode or Config.QUESTION_INDEX_MODE
+        self.ready = False
+        # Bumped on every change so derived structures (e.g. IRT item banks) know to rebuild
+        self.version = 0
+        self._records: Dict[str, QuestionRecord] = {}
+        self._cells: Dict[Tuple, _Cell] = {}
+        self._lock = threading.Lock()
+        self._watch = None
+        self._latest_created_at = None
+        self.stats = {'loads': 0, 'changes': 0, 'picks': 0}
+
+    def start(self):
+        """Starts keeping the index fresh in the background (the index stays unready on failure)."""
+        if self.db is None:
+            return
+        try:
+            if self.mode == 'listener':
+                self._watch = self.db.collection('questions').on_snapshot(self._on_snapshot)
+            elif self.mode == 'poll':
+                threading.Thread(target=self._poll_loop, name='question-index', daemon=True).start()
+        except Exception as e:
+            logger.warning(f"Question index not started, falling back to Firestore queries: {e}")
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    # ---- updates ----
+
+    def upsert(self, question_id: str, data: Dict[str, Any]):
+        """Adds or replaces a question (legacy ids without '_' are ignored)."""
+        if '_' not in question_id:
+            return
+        record = QuestionRecord(question_id, data)
+        with self._lock:
+            self._remove_locked(question_id)
+            self._insert(self._records, self._cells, record)
+            self._track_created_at(data)
+            self.version += 1
+
+    @staticmethod
+    def _insert(records: Dict[str, QuestionRecord], cells: Dict[Tuple, _Cell], record: QuestionRecord):
+        records[record.id] = record
+        for cell in record.cells():
+            cells.setdefault(cell, _Cell()).add(record.id)
+
+    def _track_created_at(self, data: Dict[str, Any]):
+        # Server timestamps written by this process are still sentinels here
+        created_at = data.get('created_at')
+        if isinstance(created_at, datetime):
+            if self._latest_created_at is None or created_at > self._latest_created_at:
+                self._latest_created_at = created_at
+
+    def remove(self, question_id: str):
+        with self._lock:
+            self._remove_locked(question_id)
+            self.version += 1
+
+    def _remove_locked(self, question_id: str):
+        record = self._records.pop(question_id, None)
+        if record is None:
+            return
+        for cell in record.cells():
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.remove(question_id)
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        try:
+            for change in changes:
+                if change.type.name == 'REMOVED':
+                    self.remove(change.document.id)
+                else:
+                    self.upsert(change.document.id, change.document.to_dict() or {})
+            self.stats['changes'] += len(changes)
+            if not self.ready:
+                self.ready = True
+                self.stats['loads'] += 1
+                logger.info(f"Question index ready: {len(self._records)} questions")
+        except Exception as e:
+            logger.error(f"Question index snapshot update failed: {e}", exc_info=True)
+
+    def _poll_loop(self):
+        last_full_load = 0.0
+        while True:
+            try:
+                if not self.ready or time.monotonic() - last_full_load >= Config.QUESTION_INDEX_FULL_RELOAD:
+                    self._full_load()
+                    last_full_load = time.monotonic()
+                else:
+                    self._load_new()
+            except Exception as e:
+                logger.error(f"Question index refresh failed: {e}", exc_info=True)
+            time.sleep(Config.QUESTION_INDEX_POLL_INTERVAL)
+
+    def _full_load(self):
+        # Built off to the side and swapped in, so readers never see a half-loaded index
+        records: Dict[str, QuestionRecord] = {}
+        cells: Dict[Tuple, _Cell] = {}
+        documents = []
+        for doc in self.db.collection('questions').select(INDEXED_FIELDS).stream():
+            if '_' not in doc.id:
+                continue
+            data = doc.to_dict() or {}
+            self._insert(records, cells, QuestionRecord(doc.id, data))
+            documents.append(data)
+
+        with self._lock:
+            self._records = records
+            self._cells = cells
+            for data in documents:
+                self._track_created_at(data)
+            self.version += 1
+
+        self.ready = True
+        self.stats['loads'] += 1
+        logger.info(f"Question index loaded: {len(self._records)} questions")
+
+    def _load_new(self):
+        """Delta refresh: documents created after the newest one already indexed."""
+        if self._latest_created_at is None:
+            return
+        query = self.db.collection('questions')\
+            .where('created_at', '>', self._latest_created_at)\
+            .select(INDEXED_FIELDS)
+        for doc in query.stream():
+            self.upsert(doc.id, doc.to_dict() or {})
+            self.stats['changes'] += 1
+
+    # ---- reads ----
+
+    def pick(self, curriculum_system: str, grade: str, difficulty: str, topic: Optional[str] = None,
+             exclude_ids=()) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Picks a random question from a cell, skipping exclude_ids.
+
+        Returns:
+            tuple: (questions stored in the cell, question dict or None)
+        """
+        exclude = set(exclude_ids or ())
+        with self._lock:
+            bucket = self._cells.get((curriculum_system, grade, difficulty, topic))
+            if bucket is None:
+                return 0, None
+            question_id = bucket.pick(exclude)
+            size = len(bucket.ids)
+            record = self._records.get(question_id) if question_id else None
+        self.stats['picks'] += 1
+        return size, record.to_question() if record else None
+
+    def records(self, curriculum_system: str, grade: str, difficulties) -> List[QuestionRecord]:
+        """All indexed questions for a grade across the given difficulty labels."""
+        with self._lock:
+            return [
+                self._records[qid]
+                for difficulty in difficulties
+                for qid in (self._cells.get((curriculum_system, grade, difficulty, None)) or _Cell()).ids
+            ]
+
+    def cell_size(self, curriculum_system: str, grade: str, difficulty: str, topic: Optional[str] = None) -> int:
+        with self._lock:
+            bucket = self._cells.get((curriculum_system, grade, difficulty, topic))
+            return len(bucket.ids) if bucket is not None else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, mode=self.mode, ready=self.ready,
+                        questions=len(self._records), cells=len(self._cells))
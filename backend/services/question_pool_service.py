@@ -0,0 +1,227 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from config import Config
+from utils.circuit_breaker import CircuitOpenError
+from utils.logger import setup_logger
+from utils.rate_limiter import TokenBucket
+from utils.single_flight import build_lease
+
+logger = setup_logger(__name__)
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+
+# (curriculum_system, grade, difficulty, topic)
+Cell = Tuple[str, str, str, Optional[str]]
+
+
+class QuestionPoolService:
+    """
+    Background warm pool of pre-generated adaptive questions.
+
+    Tracks approximate stored inventory per (curriculum_system, grade, difficulty, topic)
+    cell. When a cell falls below the low watermark, questions are generated through
+    QuestionService.generate_question on a bounded, rate-limited worker pool until the
+    cell reaches its target, so a student's test rarely has to wait on Vertex.
+
+    With a cross-instance lease (SINGLE_FLIGHT_BACKEND firestore/redis) only the
+    instance holding a cell's lease replenishes it. It recounts the cell after taking
+    the lease and keeps the lease until its generations finish. Without a lease every
+    instance replenishes on its own.
+    """
+
+    def __init__(self, question_service, low_watermark: int = None, target: int = None,
+                 workers: int = None, rate_per_minute: float = None, max_pending: int = None,
+                 lease=None):
+        self.question_service = question_service
+        self.lease = lease if lease is not None else build_lease(
+            getattr(question_service, 'db', None), Config.QUESTION_POOL_LEASE_TTL
+        )
+        self.low_watermark = low_watermark if low_watermark is not None else Config.QUESTION_POOL_LOW_WATERMARK
+        self.target = target if target is not None else Config.QUESTION_POOL_TARGET
+        self.max_pending = max_pending if max_pending is not None else Config.QUESTION_POOL_MAX_PENDING
+        rate = rate_per_minute if rate_per_minute is not None else Config.QUESTION_POOL_RATE_PER_MINUTE
+        self.rate_limiter = TokenBucket(rate / 60.0, capacity=1)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or Config.QUESTION_POOL_WORKERS,
+            thread_name_prefix='question-pool'
+        )
+
+        self._inventory: Dict[Cell, int] = {}
+        self._scheduled: Dict[Cell, int] = {}
+        self._checked_at: Dict[Cell, float] = {}
+        self._leases: Dict[Cell, str] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {'scheduled': 0, 'generated': 0, 'failed': 0, 'dropped': 0, 'deferred': 0}
+
+    def observe(self, cell: Cell, available: int, exact: bool = True) -> int:
+        """
+        Records the stock a query saw for a cell and replenishes it if it is low.
+
+        Args:
+            available: Stored questions seen for the cell.
+            exact: False when the query was truncated by its limit (stock is at least `available`).
+                A truncated count only raises the recorded stock and never schedules generations.
+
+        Returns:
+            Number of generations scheduled.
+        """
+        with self._lock:
+            if exact:
+                self._inventory[cell] = available
+                self._checked_at[cell] = time.monotonic()
+            else:
+                self._inventory[cell] = max(self._inventory.get(cell, 0), available)
+                return 0
+        return self.replenish(cell)
+
+    def prewarm(self, curriculum_system: str, grade: str, topic: Optional[str] = None):
+        """
+        Checks every difficulty cell for a grade in the background.
+        Called when a test starts so later steps find a stocked cell.
+        """
+        now = time.monotonic()
+        for difficulty in DIFFICULTIES:
+            cell = (curriculum_system, grade, difficulty, topic)
+            with self._lock:
+                checked_at = self._checked_at.get(cell)
+                if checked_at is not None and now - checked_at < Config.QUESTION_POOL_CHECK_INTERVAL:
+                    continue
+                self._checked_at[cell] = now
+            self.executor.submit(self._count_and_replenish, cell)
+
+    def replenish(self, cell: Cell) -> int:
+        """Schedules generations for a cell below the low watermark, up to the target."""
+        with self._lock:
+            stock = self._inventory.get(cell, 0) + self._scheduled.get(cell, 0)
+            if stock >= self.low_watermark:
+                return 0
+
+            needed = self.target - stock
+            count = max(0, min(needed, self.max_pending - self._pending))
+            if count < needed:
+                self.stats['dropped'] += needed - count
+            if count == 0:
+                return 0
+
+            self._scheduled[cell] = self._scheduled.get(cell, 0) + count
+            self._pending += count
+            self.stats['scheduled'] += count
+
+        logger.info(f"Question pool: scheduling {count} question(s) for {cell} (stock {stock})")
+        if self.lease is None:
+            self._submit_generations(cell, count)
+        else:
+            self.executor.submit(self._claim_and_generate, cell, count)
+        return count
+
+    def _submit_generations(self, cell: Cell, count: int):
+        for _ in range(count):
+            self.executor.submit(self._generate_one, cell)
+
+    @staticmethod
+    def _lease_key(cell: Cell) -> str:
+        curriculum_system, grade, difficulty, topic = cell
+        return f"question_pool:{curriculum_system}:{grade}:{difficulty}:{topic or '*'}"
+
+    def _claim_and_generate(self, cell: Cell, count: int):
+        """Takes the cell's lease, recounts the stored stock and generates only what is still missing."""
+        with self._lock:
+            held = cell in self._leases
+        if not held:
+            token = self.lease.acquire(self._lease_key(cell))
+            if not token:
+                logger.info(f"Question pool: {cell} is being replenished by another instance")
+                self._unschedule(cell, count, deferred=True)
+                return
+            with self._lock:
+                self._leases[cell] = token
+
+            # Another instance may have just finished this cell
+            stored = self._count(cell)
+            if stored is not None:
+                with self._lock:
+                    self._inventory[cell] = stored
+                surplus = count - max(0, self.target - stored)
+                if surplus > 0:
+                    self._unschedule(cell, surplus, deferred=True)
+                    count -= surplus
+
+        self._submit_generations(cell, count)
+        if count == 0:
+            self._release_if_idle(cell)
+
+    def _unschedule(self, cell: Cell, count: int, deferred: bool = False):
+        with self._lock:
+            self._scheduled[cell] -= count
+            self._pending -= count
+            self.stats['scheduled'] -= count
+            if deferred:
+                self.stats['deferred'] += count
+
+    def _release_if_idle(self, cell: Cell):
+        """Releases the cell's lease once none of its generations are left."""
+        with self._lock:
+            if self._scheduled.get(cell, 0) > 0:
+                return
+            token = self._leases.pop(cell, None)
+        if token:
+            self.lease.release(self._lease_key(cell), token)
+
+    def _count(self, cell: Cell) -> Optional[int]:
+        """Stored questions in a cell (index when ready, else a Firestore count), None on failure."""
+        curriculum_system, grade, difficulty, topic = cell
+        index = getattr(self.question_service, 'index', None)
+        if index is not None and index.ready:
+            return index.cell_size(curriculum_system, grade, difficulty, topic)
+        try:
+            query = self.question_service.db.collection('questions')\
+                .where('curriculum_system', '==', curriculum_system)\
+                .where('grade', '==', grade)\
+                .where('difficulty', '==', difficulty)
+            if topic:
+                query = query.where('topic', '==', topic)
+            # Aggregation query: one read per 1000 matched documents
+            return int(query.count().get()[0][0].value)
+        except Exception as e:
+            logger.warning(f"Question pool: inventory count failed for {cell}: {e}")
+            return None
+
+    def _count_and_replenish(self, cell: Cell):
+        count = self._count(cell)
+        if count is not None:
+            self.observe(cell, count)
+
+    def _generate_one(self, cell: Cell):
+        curriculum_system, grade, difficulty, topic = cell
+        try:
+            self.rate_limiter.acquire()
+            self.question_service.generate_question(curriculum_system, grade, topic, difficulty)
+            with self._lock:
+                self._inventory[cell] = self._inventory.get(cell, 0) + 1
+                self.stats['generated'] += 1
+        except CircuitOpenError:
+            with self._lock:
+                self.stats['failed'] += 1
+        except Exception as e:
+            logger.warning(f"Question pool: generation failed for {cell}: {e}")
+            with self._lock:
+                self.stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._scheduled[cell] -= 1
+                self._pending -= 1
+            if self.lease is not None:
+                self._release_if_idle(cell)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Pool counters and cells currently below the low watermark."""
+        with self._lock:
+            low_cells = [
+                {'cell': list(cell), 'stock': stock, 'scheduled': self._scheduled.get(cell, 0)}
+                for cell, stock in self._inventory.items()
+                if stock < self.low_watermark
+            ]
+            return dict(self.stats, pending=self._pending, cells=len(self._inventory), low_cells=low_cells)
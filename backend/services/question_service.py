@@ -1,26 +1,111 @@
 import json
-import time
+import random
+import re
+import uuid
 from typing import List, Optional, Dict, Any
 from firebase_admin import firestore
 from google.cloud import aiplatform
 import vertexai
-from vertexai.generative_models import GenerativeModel, Part
+from vertexai.generative_models import GenerationConfig, Part
 import vertexai.preview.generative_models as generative_models
 from config import Config
+from utils.ai_client import call_ai_async, fan_out, guarded_generate, run_ai_coroutine
+from utils.model_provider import create_model
+from utils.circuit_breaker import CircuitOpenError, FallbackText
+from utils.response_cache import ResponseCache
+from .question_index import QuestionIndex
+from .question_pool_service import QuestionPoolService
+
+CHOICE_IDS = ['A', 'B', 'C', 'D']
+
+# Response schema for generate_question (Vertex AI JSON response mode)
+QUESTION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'text_latex': {'type': 'string', 'description': 'Question text with LaTeX math wrapped in $...$'},
+        'choices': {
+            'type': 'array',
+            'minItems': 4,
+            'maxItems': 4,
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'string', 'enum': CHOICE_IDS},
+                    'text': {'type': 'string'}
+                },
+                'required': ['id', 'text']
+            }
+        },
+        'correct_answer': {'type': 'string', 'enum': CHOICE_IDS},
+        'explanation': {'type': 'string', 'description': 'Explanation of the solution'},
+        'topic': {'type': 'string', 'description': 'Specific Topic Name'},
+        'subtopic': {'type': 'string', 'description': 'Specific Subtopic Name'}
+    },
+    'required': ['text_latex', 'choices', 'correct_answer', 'explanation', 'topic', 'subtopic']
+}
+
+_JSON_ESCAPE = re.compile(r'\\(.)', re.S)
+
+
+def _repair_json(text: str) -> str:
+    """
+    Best-effort local repair of a model JSON reply:
+    strips markdown fences and surrounding prose, doubles backslashes that are
+    not valid JSON escapes (LaTeX such as \\sqrt) and drops trailing commas.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split('\n', 1)[1] if '\n' in text else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+
+    start, end = text.find('{'), text.rfind('}')
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+
+    text = _JSON_ESCAPE.sub(
+        lambda m: m.group(0) if m.group(1) in '"\\/bfnrtu' else '\\\\' + m.group(1),
+        text
+    )
+    return re.sub(r',\s*([}\]])', r'\1', text)
+
 
 class QuestionService:
     def __init__(self, db):
         self.db = db
-        self.model = GenerativeModel(Config.MODEL_FLASH)
+        self.model = create_model(Config.MODEL_FLASH)
+        # In-memory question bank; get_question queries Firestore until it is ready
+        self.index = None
+        if Config.QUESTION_INDEX_MODE != 'off':
+            self.index = QuestionIndex(db)
+            self.index.start()
+        # Background generation keeps question cells stocked (see QuestionPoolService)
+        self.pool = QuestionPoolService(self) if Config.QUESTION_POOL_ENABLED else None
+        # Outcome counters for structured question generation
+        self.generation_stats = {'generated': 0, 'repaired': 0, 'field_retries': 0, 'full_retries': 0}
+        # End-of-test summaries keyed by bucketed stats (see generate_performance_summary)
+        self.summary_cache = ResponseCache(
+            'performance_summary',
+            maxsize=Config.SUMMARY_CACHE_SIZE,
+            ttl=Config.SUMMARY_CACHE_TTL,
+            db=db if Config.SUMMARY_CACHE_PERSIST else None
+        )
 
     def get_question(self, curriculum_system: str, grade: str, topic: Optional[str] = None, difficulty: str = "Medium", exclude_ids: List[str] = []) -> Dict[str, Any]:
         """
         Retrieves a question from Firestore or generates one if not found.
         Avoids returning questions in exclude_ids.
         """
-        import random
+        # 1a. Pick from the in-memory index (no Firestore read)
+        if self.index is not None and self.index.ready:
+            stored, question = self.index.pick(curriculum_system, grade, difficulty, topic, exclude_ids)
+            if self.pool is not None:
+                self.pool.observe((curriculum_system, grade, difficulty, topic), stored)
+            if question:
+                return question
+            return self._generate_or_fallback(curriculum_system, grade, topic, difficulty, exclude_ids)
 
-        # 1. Try to find an existing question in DB
+        # 1b. Try to find an existing question in DB
         questions_ref = self.db.collection('questions')
         query = questions_ref.where('curriculum_system', '==', curriculum_system)\
                              .where('grade', '==', grade)\
@@ -29,99 +114,274 @@ class QuestionService:
         if topic:
             query = query.where('topic', '==', topic)
             
-        # Get a batch of questions to pick randomly
-        # Limit increased to allow filtering
-        docs = query.limit(20).get()
-        
-        valid_questions = []
+        # Uniform sampling: start at a random point of the random_key order and
+        # wrap around to the beginning if the tail of the cell is too short.
+        # Each read has a fixed size; excluded questions are filtered here and a
+        # fully excluded sample is retried from a new random point.
+        limit = Config.QUESTION_SAMPLE_SIZE
+        exclude = set(exclude_ids)
+        selected = None
+        for attempt in range(Config.QUESTION_SAMPLE_ATTEMPTS):
+            pivot = random.random()
+            docs = list(query.where('random_key', '>=', pivot).order_by('random_key').limit(limit).get())
+            exact = False
+            if len(docs) < limit:
+                wrapped = list(query.where('random_key', '<', pivot).order_by('random_key').limit(limit).get())
+                docs.extend(wrapped)
+                exact = len(wrapped) < limit
+                if not docs:
+                    # Documents not yet backfilled by scripts/add_random_key_field.py
+                    docs = list(query.limit(20).get())
+                    exact = len(docs) < 20
+
+            # Skip legacy ID formats and questions the student has already seen
+            stored = [doc for doc in docs if '_' in doc.id]
+            for doc in stored:
+                if doc.id not in exclude:
+                    selected = doc.to_dict()
+                    selected['id'] = doc.id
+                    break
+
+            if exact:
+                # The whole cell was read: report its real stock so the warm pool
+                # can top it up. A truncated page says nothing about the total and
+                # is left to the pool's own count() check.
+                if self.pool is not None:
+                    self.pool.observe((curriculum_system, grade, difficulty, topic), len(stored))
+                break
+            if selected is not None:
+                break
+
+        if selected is not None:
+            return selected
+            
+        # 2. If not found (or all excluded), generate using AI
+        return self._generate_or_fallback(curriculum_system, grade, topic, difficulty, exclude_ids)
+
+    def _generate_or_fallback(self, curriculum_system: str, grade: str, topic: Optional[str], difficulty: str, exclude_ids: List[str]) -> Dict[str, Any]:
+        try:
+            return self.generate_question(curriculum_system, grade, topic, difficulty)
+        except CircuitOpenError:
+            # Model is unavailable: fall back to any stored question for this grade/difficulty
+            fallback = self._find_fallback_question(curriculum_system, grade, difficulty, exclude_ids)
+            if fallback is None:
+                raise
+            return fallback
+
+    def _find_fallback_question(self, curriculum_system: str, grade: str, difficulty: str, exclude_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Stored question ignoring the topic filter, used while the AI circuit is open."""
+        if self.index is not None and self.index.ready:
+            return self.index.pick(curriculum_system, grade, difficulty, None, exclude_ids)[1]
+
+        docs = self.db.collection('questions')\
+                      .where('curriculum_system', '==', curriculum_system)\
+                      .where('grade', '==', grade)\
+                      .where('difficulty', '==', difficulty)\
+                      .limit(20).get()
+
+        candidates = []
         for doc in docs:
-            # Check legacy ID format
-            if '_' not in doc.id:
-                continue
-                
-            # Check if excluded
-            if doc.id in exclude_ids:
+            if '_' not in doc.id or doc.id in exclude_ids:
                 continue
-                
             q_data = doc.to_dict()
             q_data['id'] = doc.id
-            valid_questions.append(q_data)
-            
-        if valid_questions:
-            # Return a random question from valid candidates
-            return random.choice(valid_questions)
-            
-        # 2. If not found (or all excluded), generate using AI
-        return self.generate_question(curriculum_system, grade, topic, difficulty)
+            candidates.append(q_data)
+
+        return random.choice(candidates) if candidates else None
 
     def generate_question(self, curriculum_system: str, grade: str, topic: Optional[str], difficulty: str) -> Dict[str, Any]:
         """
-        Generates a math question using Vertex AI.
+        Generates a math question using Vertex AI in JSON response mode.
+
+        The reply is constrained by QUESTION_SCHEMA. A reply that still fails to
+        parse is repaired locally; fields that are missing or invalid after that
+        are regenerated on their own instead of restarting the whole question.
         """
         prompt = f"""
         Generate a {difficulty} difficulty math question for {grade} grade {curriculum_system} curriculum.
         Topic: {topic if topic else "General Math for this grade"}
         Difficulty: {difficulty}
-        
-        Output JSON format ONLY.
-        IMPORTANT: 
-        1. For LaTeX math, use double backslashes (e.g., \\frac{1}{2} instead of \frac{1}{2}) so it is valid JSON.
+
+        IMPORTANT:
+        1. Wrap LaTeX math in $...$ inside text_latex, choices and explanation.
         2. Do NOT escape % symbols in normal text (e.g., write '25%', not '25\%'). Only use \% if inside $...$.
         3. Do NOT use LaTeX text formatting commands like \\textit, \\textbf, \\text. Use standard text.
-        
-        {{
-            "text_latex": "Question text with LaTeX math wrapped in $...$",
-            "choices": [
-                {{"id": "A", "text": "Option A"}},
-                {{"id": "B", "text": "Option B"}},
-                {{"id": "C", "text": "Option C"}},
-                {{"id": "D", "text": "Option D"}}
-            ],
-            "correct_answer": "A",
-            "explanation": "Explanation of the solution",
-            "topic": "Specific Topic Name",
-            "subtopic": "Specific Subtopic Name"
-        }}
+        4. Provide exactly four choices with ids A, B, C and D.
         """
-        
+
         try:
-            response = self.model.generate_content(prompt)
-            # Clean up markdown code blocks if present
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-                
-            question_data = json.loads(text)
-            
+            response = guarded_generate(
+                self.model, prompt, generation_config=self._json_config(QUESTION_SCHEMA)
+            )
+            question_data = self._parse_json_reply(response.text)
+            self.generation_stats['generated'] += 1
+
+            if question_data is None or not question_data.get('text_latex'):
+                # Nothing usable came back: one full regeneration
+                self.generation_stats['full_retries'] += 1
+                response = guarded_generate(
+                    self.model, prompt, generation_config=self._json_config(QUESTION_SCHEMA)
+                )
+                question_data = self._parse_json_reply(response.text)
+                if question_data is None:
+                    raise ValueError("Model reply is not valid question JSON")
+
+            invalid = self._invalid_question_fields(question_data)
+            if invalid:
+                question_data.update(self._regenerate_fields(question_data, invalid, prompt))
+                invalid = self._invalid_question_fields(question_data)
+
+            # Labels can be filled in locally without another model call
+            if 'topic' in invalid:
+                question_data['topic'] = topic or 'General'
+            if 'subtopic' in invalid:
+                question_data['subtopic'] = question_data['topic']
+            invalid = [f for f in invalid if f not in ('topic', 'subtopic')]
+            if invalid:
+                raise ValueError(f"Generated question is missing fields: {invalid}")
+
             # Add metadata
             question_data['curriculum_system'] = curriculum_system
             question_data['grade'] = grade
             question_data['difficulty'] = difficulty
+            question_data['random_key'] = random.random()
             question_data['created_at'] = firestore.SERVER_TIMESTAMP
-            
+
             # Generate readable Document ID
-            # Format: {System}_{Grade}_{Topic}_{Timestamp}
+            # Format: {System}_{Grade}_{Topic}_{uuid} (unique across concurrent generators and instances)
             # Sanitize topic to be safe for ID (remove spaces, special chars)
             safe_topic = "".join(c for c in question_data.get('topic', 'General') if c.isalnum())
-            timestamp = int(time.time())
-            doc_id = f"{curriculum_system}_{grade}_{safe_topic}_{timestamp}"
-            
+            doc_id = f"{curriculum_system}_{grade}_{safe_topic}_{uuid.uuid4().hex}"
+
             # Save to DB with custom ID
             self.db.collection('questions').document(doc_id).set(question_data)
             question_data['id'] = doc_id
-            
+            if self.index is not None:
+                self.index.upsert(doc_id, question_data)
+
             return question_data
-            
+
         except Exception as e:
             print(f"Error generating question: {e}")
             # Fallback or re-raise
             raise e
 
+    @staticmethod
+    def _json_config(schema: Dict[str, Any]) -> GenerationConfig:
+        return GenerationConfig(response_mime_type='application/json', response_schema=schema)
+
+    def _parse_json_reply(self, text: str) -> Optional[Dict[str, Any]]:
+        """Parses a JSON reply, repairing common defects locally. Returns None if unrecoverable."""
+        try:
+            data = json.loads(text)
+            return data if isinstance(data, dict) else None
+        except (TypeError, ValueError):
+            pass
+
+        repaired = _repair_json(text or '')
+        try:
+            data = json.loads(repaired, strict=False)
+        except ValueError as e:
+            print(f"Unrepairable question JSON: {e}")
+            return None
+
+        self.generation_stats['repaired'] += 1
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def _invalid_question_fields(data: Dict[str, Any]) -> List[str]:
+        """Fields of a generated question that are missing or malformed."""
+        invalid = []
+        for field in ('text_latex', 'explanation', 'topic', 'subtopic'):
+            if not isinstance(data.get(field), str) or not data[field].strip():
+                invalid.append(field)
+
+        choices = data.get('choices')
+        choice_ids = []
+        if isinstance(choices, list):
+            choice_ids = [c.get('id') for c in choices if isinstance(c, dict) and str(c.get('text', '')).strip()]
+        if sorted(choice_ids) != CHOICE_IDS:
+            invalid.append('choices')
+            invalid.append('correct_answer')
+        elif data.get('correct_answer') not in CHOICE_IDS:
+            invalid.append('correct_answer')
+
+        return invalid
+
+    def _regenerate_fields(self, data: Dict[str, Any], fields: List[str], original_prompt: str) -> Dict[str, Any]:
+        """Asks the model for only the given fields of an otherwise complete question."""
+        fields = [f for f in fields if f not in ('topic', 'subtopic') and f in QUESTION_SCHEMA['properties']]
+        if not fields:
+            return {}
+
+        self.generation_stats['field_retries'] += 1
+        known = {k: v for k, v in data.items() if k in QUESTION_SCHEMA['properties'] and k not in fields}
+        schema = {
+            'type': 'object',
+            'properties': {f: QUESTION_SCHEMA['properties'][f] for f in fields},
+            'required': fields
+        }
+        prompt = f"""
+        {original_prompt}
+
+        The question has already been partly written:
+        {json.dumps(known, ensure_ascii=False)}
+
+        Provide ONLY these missing fields, consistent with the question above: {", ".join(fields)}
+        """
+        try:
+            response = guarded_generate(self.model, prompt, generation_config=self._json_config(schema))
+            patch = self._parse_json_reply(response.text) or {}
+        except Exception as e:
+            print(f"Error regenerating question fields {fields}: {e}")
+            return {}
+        return {f: patch[f] for f in fields if f in patch}
+
     def generate_explanation(self, question_text: str, correct_answer: str, choices: List[Dict]) -> str:
         """Generates an explanation for a question if missing."""
-        prompt = f"""
+        prompt = self._build_explanation_prompt(question_text, correct_answer, choices)
+        try:
+            response = guarded_generate(self.model, prompt)
+            return response.text.strip()
+        except Exception as e:
+            print(f"Error generating explanation: {e}")
+            return FallbackText("Explanation currently unavailable.")
+
+    async def generate_explanation_async(self, question_text: str, correct_answer: str, choices: List[Dict]) -> str:
+        """Async variant of generate_explanation, run on the shared AI event loop."""
+        prompt = self._build_explanation_prompt(question_text, correct_answer, choices)
+        response = await call_ai_async(self.model, prompt, max_retries=2, call_site='generate_explanation')
+        if response is None:
+            return FallbackText("Explanation currently unavailable.")
+        return response.text.strip()
+
+    def generate_explanations(self, questions: Dict[str, Dict[str, Any]], timeout: Optional[float] = None):
+        """
+        Generates explanations for many questions concurrently without a thread per prompt.
+
+        Args:
+            questions: {question_id: question_data} with text_latex/correct_answer/choices
+            timeout: Deadline in seconds; calls still running are cancelled.
+
+        Returns:
+            tuple: ({question_id: explanation}, [question_ids that missed the deadline])
+        """
+        if not questions:
+            return {}, []
+
+        coros = {
+            qid: self.generate_explanation_async(
+                q.get('text_latex', ''),
+                q.get('correct_answer', ''),
+                q.get('choices', [])
+            )
+            for qid, q in questions.items()
+        }
+        return run_ai_coroutine(fan_out(coros, timeout=timeout))
+
+    @staticmethod
+    def _build_explanation_prompt(question_text: str, correct_answer: str, choices: List[Dict]) -> str:
+        return f"""
         Explain the solution for the following math problem step-by-step.
         Question: {question_text}
         Choices: {choices}
@@ -130,33 +390,78 @@ class QuestionService:
         Keep the explanation concise and easy to understand for a student.
         Use plain text or standard LaTeX for math.
         """
+
+    def generate_performance_summary(self, stats: Dict[str, Any]) -> str:
+        """
+        Generates a personalized performance summary.
+
+        Stats are normalized into a canonical form first (exact score and total,
+        bucketed topic accuracy). The cache key and the prompt are both built from
+        that form only, so a cached summary never states numbers that differ from
+        another student's stats with the same key. Fallback text and empty
+        replies are not cached.
+        """
+        canonical = self._canonical_summary_stats(stats)
+        cache_key = ResponseCache.make_key(canonical, Config.SUMMARY_PROMPT_VERSION)
+
+        cached = self.summary_cache.get(cache_key)
+        if cached:
+            return cached
+
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            response = guarded_generate(self.model, self._summary_prompt(canonical))
+            summary = (response.text or '').strip()
         except Exception as e:
-            print(f"Error generating explanation: {e}")
-            return "Explanation currently unavailable."
+            print(f"Error generating summary: {e}")
+            summary = ''
+        if not summary:
+            return FallbackText("You have a solid foundation. Keep practicing to improve further!")
 
-    def generate_performance_summary(self, stats: Dict[str, Any]) -> str:
-        """Generates a personalized performance summary."""
-        prompt = f"""
+        self.summary_cache.set(cache_key, summary)
+        return summary
+
+    @staticmethod
+    def _summary_prompt(canonical: Dict[str, Any]) -> str:
+        """Summary prompt built only from canonical stats (see generate_performance_summary)."""
+        topic_accuracy = [
+            {'topic': topic, 'accuracy': accuracy, 'total': total}
+            for topic, accuracy, total in canonical['topics']
+        ]
+        return f"""
         Analyze the following student math test performance and write a short, encouraging summary (2-3 sentences).
         Explain WHY the specific level/module is recommended based on their accuracy and difficulty level.
         
         Stats:
-        - Grade: {stats.get('grade')}
-        - Score: {stats.get('score')}/{stats.get('total')}
-        - Topic Accuracy: {stats.get('topic_analysis')}
-        - Final Difficulty Reached: {stats.get('final_difficulty')}
+        - Grade: {canonical['grade']}
+        - Score: {canonical['score']}/{canonical['total']}
+        - Topic Accuracy: {topic_accuracy}
+        - Final Difficulty Reached: {canonical['final_difficulty']}
         
         Output plain text only.
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            print(f"Error generating summary: {e}")
-            return "You have a solid foundation. Keep practicing to improve further!"
+
+    @staticmethod
+    def _canonical_summary_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalizes summary stats into a canonical, order-independent form.
+        Topic accuracy is bucketed to SUMMARY_ACCURACY_BUCKET percent steps.
+        """
+        bucket = Config.SUMMARY_ACCURACY_BUCKET
+        topics = sorted(
+            (
+                str(t.get('topic', 'General')),
+                int(round(t.get('accuracy', 0) / bucket) * bucket),
+                int(t.get('total', 0))
+            )
+            for t in stats.get('topic_analysis') or []
+        )
+        return {
+            'grade': str(stats.get('grade')),
+            'score': int(stats.get('score', 0)),
+            'total': int(stats.get('total', 0)),
+            'topics': topics,
+            'final_difficulty': stats.get('final_difficulty', 'Medium')
+        }
 
     def submit_answer(self, session_id: str, question_id: str, answer: str) -> Dict[str, Any]:
         """
@@ -4,6 +4,7 @@
 from google.cloud import firestore
 from firebase_admin import auth
 from utils.logger import setup_logger
+from utils.unit_of_work import stage_set, stage_update
 import uuid
 
 logger = setup_logger(__name__)
@@ -237,7 +238,7 @@ class UserService:
             logger.error(f"프로필 저장 실패 - User ID: {user_id}, 오류: {e}", exc_info=True)
             return False
 
-    def save_test_result(self, user_id, results, analysis_report, time_info):
+    def save_test_result(self, user_id, results, analysis_report, time_info, uow=None):
         """
         테스트 결과 저장
 
@@ -246,6 +247,7 @@ class UserService:
             results: 문제별 채점 결과
             analysis_report: AI 분석 리포트
             time_info: 시간 정보
+            uow: UnitOfWork (지정 시 쓰기를 모아 일괄 커밋)
 
         Returns:
             str: test_session_id
@@ -275,7 +277,7 @@ class UserService:
                 .collection('test_history')\
                 .document(test_session_id)
 
-            test_history_ref.set({
+            stage_set(test_history_ref, {
                 'test_date': firestore.SERVER_TIMESTAMP,
                 'time_spent': time_info.get('total_time_spent', 0),
                 'is_overtime': time_info.get('is_overtime', False),
@@ -286,7 +288,7 @@ class UserService:
                 'weak_categories': weak_categories,
                 'strong_categories': strong_categories,
                 'ai_analysis': analysis_report
-            })
+            }, uow=uow)
 
             logger.info(f"✓ 테스트 결과 저장 완료 - User: {user_id}, Session: {test_session_id}")
 
@@ -298,7 +300,7 @@ class UserService:
 
     def create_test_session(self, user_id, test_type='level_test', grade=None,
                            curriculum_category=None, target_difficulty='Medium',
-                           time_limit=600, num_problems=10):
+                           time_limit=600, num_problems=10, uow=None):
         """
         새로운 테스트 세션 생성 (계층적 구조)
 
@@ -309,6 +311,7 @@ class UserService:
             curriculum_category: 커리큘럼 카테고리
             target_difficulty: 목표 난이도
             time_limit: 제한 시간 (초)
+            uow: UnitOfWork (지정 시 쓰기를 모아 일괄 커밋)
 
         Returns:
             str: session_id
@@ -344,7 +347,7 @@ class UserService:
                 .collection('test_sessions')\
                 .document(session_id)
 
-            session_ref.set(session_data)
+            stage_set(session_ref, session_data, uow=uow)
 
             logger.info(f"✓ 테스트 세션 생성 완료 - User: {user_id}, Session: {session_id}")
 
@@ -355,7 +358,7 @@ class UserService:
             return None
 
     def save_answer(self, user_id, session_id, problem_id, user_answer,
-                   correct_answer, is_correct, problem_data, time_spent=0):
+                   correct_answer, is_correct, problem_data, time_spent=0, uow=None):
         """
         문제별 답변 저장
 
@@ -368,6 +371,7 @@ class UserService:
             is_correct: 정답 여부
             problem_data: 문제 메타데이터 (category, difficulty 등)
             time_spent: 소요 시간 (초)
+            uow: UnitOfWork (지정 시 쓰기를 모아 일괄 커밋)
 
         Returns:
             bool: 성공 여부
@@ -395,7 +399,7 @@ class UserService:
                 .collection('answers')\
                 .document(problem_id)
 
-            answer_ref.set(answer_data)
+            stage_set(answer_ref, answer_data, uow=uow)
 
             return True
 
@@ -403,7 +407,8 @@ class UserService:
             logger.error(f"답변 저장 실패 - Session: {session_id}, Problem: {problem_id}, 오류: {e}", exc_info=True)
             return False
 
-    def complete_test_session(self, user_id, session_id, results, analysis_report, time_info):
+    def complete_test_session(self, user_id, session_id, results, analysis_report, time_info,
+                              uow=None):
         """
         테스트 세션 완료 및 AI 분석 결과 저장
 
@@ -413,6 +418,7 @@ class UserService:
             results: 문제별 채점 결과 리스트
             analysis_report: AI 분석 리포트
             time_info: 시간 정보
+            uow: UnitOfWork (지정 시 쓰기를 모아 일괄 커밋)
 
         Returns:
             bool: 성공 여부
@@ -451,7 +457,7 @@ class UserService:
             total_problems = len(results)
             score = (correct_count / total_problems * 100) if total_problems > 0 else 0
 
-            session_ref.update({
+            stage_update(session_ref, {
                 'total_problems': total_problems,
                 'correct_count': correct_count,
                 'score': score,
@@ -463,12 +469,12 @@ class UserService:
                 'is_completed': True,
                 'is_analyzed': True,
                 'updated_at': firestore.SERVER_TIMESTAMP
-            })
+            }, uow=uow)
 
             logger.info(f"✓ 테스트 세션 완료 - User: {user_id}, Session: {session_id}, Score: {score:.1f}%")
 
             # 사용자 통계 업데이트
-            self.update_user_stats(user_id, results, score)
+            self.update_user_stats(user_id, results, score, uow=uow)
 
             return True
 
@@ -476,7 +482,7 @@ class UserService:
             logger.error(f"테스트 세션 완료 실패 - Session: {session_id}, 오류: {e}", exc_info=True)
             return False
 
-    def update_user_stats(self, user_id, results, new_score):
+    def update_user_stats(self, user_id, results, new_score, uow=None):
         """
         사용자 전체 통계 업데이트
 
@@ -484,82 +490,91 @@ class UserService:
             user_id: Firebase UID
             results: 문제별 채점 결과
             new_score: 새로운 점수
+            uow: 사용하지 않음 (통계는 기존 값을 읽어 갱신하므로 uow에 모으지 않고
+                 트랜잭션 안에서 읽기와 쓰기를 함께 커밋, 동시 제출 시 갱신 유실 방지)
 
         Returns:
             bool: 성공 여부
         """
         try:
             user_ref = self.db.collection('users').document(user_id)
-            user_doc = user_ref.get()
 
-            if not user_doc.exists:
-                logger.warning(f"사용자 문서 없음: {user_id}")
-                return False
+            @firestore.transactional
+            def _update(transaction):
+                user_doc = user_ref.get(transaction=transaction)
 
-            user_data = user_doc.to_dict()
-            stats = user_data.get('stats', {})
+                if not user_doc.exists:
+                    logger.warning(f"사용자 문서 없음: {user_id}")
+                    return False
 
-            # 전체 통계 업데이트
-            total_tests = stats.get('total_tests', 0) + 1
-            total_problems = stats.get('total_problems_solved', 0) + len(results)
-            total_correct = stats.get('total_correct', 0) + sum(1 for r in results if r['is_correct'])
+                user_data = user_doc.to_dict()
+                stats = user_data.get('stats', {})
 
-            # 카테고리별 통계
-            category_stats = stats.get('category_stats', {})
-            difficulty_stats = stats.get('difficulty_stats', {})
+                # 전체 통계 업데이트
+                total_tests = stats.get('total_tests', 0) + 1
+                total_problems = stats.get('total_problems_solved', 0) + len(results)
+                total_correct = stats.get('total_correct', 0) + sum(1 for r in results if r['is_correct'])
 
-            for result in results:
-                category = result.get('category', 'Unknown')
-                difficulty = result.get('difficulty', 'Medium')
-
-                # 카테고리별
-                if category not in category_stats:
-                    category_stats[category] = {'total': 0, 'correct': 0, 'accuracy': 0.0}
-                category_stats[category]['total'] += 1
-                if result['is_correct']:
-                    category_stats[category]['correct'] += 1
-                category_stats[category]['accuracy'] = (
-                    category_stats[category]['correct'] / category_stats[category]['total']
-                )
+                # 카테고리별 통계
+                category_stats = stats.get('category_stats', {})
+                difficulty_stats = stats.get('difficulty_stats', {})
+
+                for result in results:
+                    category = result.get('category', 'Unknown')
+                    difficulty = result.get('difficulty', 'Medium')
+
+                    # 카테고리별
+                    if category not in category_stats:
+                        category_stats[category] = {'total': 0, 'correct': 0, 'accuracy': 0.0}
+                    category_stats[category]['total'] += 1
+                    if result['is_correct']:
+                        category_stats[category]['correct'] += 1
+                    category_stats[category]['accuracy'] = (
+                        category_stats[category]['correct'] / category_stats[category]['total']
+                    )
 
-                # 난이도별
-                if difficulty not in difficulty_stats:
-                    difficulty_stats[difficulty] = {'total': 0, 'correct': 0, 'accuracy': 0.0}
-                difficulty_stats[difficulty]['total'] += 1
-                if result['is_correct']:
-                    difficulty_stats[difficulty]['correct'] += 1
-                difficulty_stats[difficulty]['accuracy'] = (
-                    difficulty_stats[difficulty]['correct'] / difficulty_stats[difficulty]['total']
-                )
+                    # 난이도별
+                    if difficulty not in difficulty_stats:
+                        difficulty_stats[difficulty] = {'total': 0, 'correct': 0, 'accuracy': 0.0}
+                    difficulty_stats[difficulty]['total'] += 1
+                    if result['is_correct']:
+                        difficulty_stats[difficulty]['correct'] += 1
+                    difficulty_stats[difficulty]['accuracy'] = (
+                        difficulty_stats[difficulty]['correct'] / difficulty_stats[difficulty]['total']
+                    )
 
-            # 최근 점수 추이
-            recent_scores = stats.get('recent_scores', [])
-            recent_scores.append(new_score)
-            if len(recent_scores) > 5:
-                recent_scores = recent_scores[-5:]  # 최근 5개만 유지
-
-            avg_score = sum(recent_scores) / len(recent_scores) if recent_scores else 0
-
-            # 약점/강점 분류 (정확도 기준)
-            weak_categories = [cat for cat, data in category_stats.items() if data['accuracy'] < 0.7]
-            strong_categories = [cat for cat, data in category_stats.items() if data['accuracy'] >= 0.8]
-
-            # 업데이트
-            user_ref.update({
-                'stats': {
-                    'total_tests': total_tests,
-                    'total_problems_solved': total_problems,
-                    'total_correct': total_correct,
-                    'overall_accuracy': total_correct / total_problems if total_problems > 0 else 0,
-                    'category_stats': category_stats,
-                    'difficulty_stats': difficulty_stats,
-                    'recent_scores': recent_scores,
-                    'avg_score_last_5': avg_score,
-                    'weak_categories': weak_categories,
-                    'strong_categories': strong_categories,
-                    'last_updated': firestore.SERVER_TIMESTAMP
-                }
-            })
+                # 최근 점수 추이
+                recent_scores = stats.get('recent_scores', [])
+                recent_scores.append(new_score)
+                if len(recent_scores) > 5:
+                    recent_scores = recent_scores[-5:]  # 최근 5개만 유지
+
+                avg_score = sum(recent_scores) / len(recent_scores) if recent_scores else 0
+
+                # 약점/강점 분류 (정확도 기준)
+                weak_categories = [cat for cat, data in category_stats.items() if data['accuracy'] < 0.7]
+                strong_categories = [cat for cat, data in category_stats.items() if data['accuracy'] >= 0.8]
+
+                # 업데이트
+                transaction.update(user_ref, {
+                    'stats': {
+                        'total_tests': total_tests,
+                        'total_problems_solved': total_problems,
+                        'total_correct': total_correct,
+                        'overall_accuracy': total_correct / total_problems if total_problems > 0 else 0,
+                        'category_stats': category_stats,
+                        'difficulty_stats': difficulty_stats,
+                        'recent_scores': recent_scores,
+                        'avg_score_last_5': avg_score,
+                        'weak_categories': weak_categories,
+                        'strong_categories': strong_categories,
+                        'last_updated': firestore.SERVER_TIMESTAMP
+                    }
+                })
+                return True
+
+            if not _update(self.db.transaction()):
+                return False
 
             logger.info(f"✓ 사용자 통계 업데이트 완료 - User: {user_id}")
 
@@ -0,0 +1,566 @@
+"""
+In-memory Firestore client for tests and offline benchmarks.
+
+Covers what the services use: collection/document paths and subcollections,
+where/order_by/limit/select queries with stream/get, count() aggregations,
+collection groups, get_all, set (with merge), update (dotted paths, transforms),
+delete, SERVER_TIMESTAMP/DELETE_FIELD/ArrayUnion/ArrayRemove/Increment, write
+batches, transactions (including the @firestore.transactional decorator) and
+collection snapshot listeners.
+
+Every call is counted per operation along with billed document reads and
+writes, and read/write latency can be injected.
+
+    db = FakeFirestore(read_latency=0.005)
+    db.collection('questions').document('q_1').set({'grade': '8'})
+    db.snapshot()  # {'reads': 0, 'writes': 1, 'ops': {'set': 1}}
+"""
+
+import copy
+import itertools
+import math
+import random
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from google.api_core import exceptions
+from google.cloud import firestore
+from google.cloud.firestore_v1.transforms import ArrayRemove, ArrayUnion, Increment
+
+Latency = Union[float, Callable[[], float], None]
+
+_OPS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+    'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+    'array_contains_any': lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+_MISSING = object()
+
+
+def _auto_id() -> str:
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=20))
+
+
+def _get_path(data: Dict[str, Any], field: str):
+    value = data
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _resolve(value, current=_MISSING):
+    """Applies server-side transforms and copies plain values."""
+    if value is firestore.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, ArrayUnion):
+        existing = list(current) if isinstance(current, list) else []
+        return existing + [v for v in value.values if v not in existing]
+    if isinstance(value, ArrayRemove):
+        return [v for v in current if v not in value.values] if isinstance(current, list) else []
+    if isinstance(value, Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        return {k: _resolve(v, base.get(k, _MISSING)) for k, v in value.items()}
+    return copy.deepcopy(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]):
+    """set(merge=True): nested maps are merged field by field."""
+    for key, value in data.items():
+        if value is firestore.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(value, target.get(key, _MISSING))
+
+
+def _update(target: Dict[str, Any], data: Dict[str, Any]):
+    """update(): dotted keys address nested fields, maps are replaced."""
+    for key, value in data.items():
+        *parents, leaf = key.split('.')
+        node = target
+        for parent in parents:
+            if not isinstance(node.get(parent), dict):
+                node[parent] = {}
+            node = node[parent]
+        if value is firestore.DELETE_FIELD:
+            node.pop(leaf, None)
+        else:
+            node[leaf] = _resolve(value, node.get(leaf, _MISSING))
+
+
+def _size(value) -> int:
+    """Approximate stored size of a value (Firestore storage size rules, simplified)."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(k.encode('utf-8')) + 1 + _size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(v) for v in value)
+    return 8
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]],
+                 fields: Optional[List[str]] = None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        if data is not None and fields is not None:
+            data = {f: data[f] for f in fields if f in data}
+        self._data = copy.deepcopy(data)
+        self.read_time = datetime.now(timezone.utc)
+        self.update_time = reference._db._update_times.get(reference.path) if data is not None else None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str):
+        if self._data is None:
+            return None
+        value = _get_path(self._data, field)
+        return None if value is _MISSING else copy.deepcopy(value)
+
+
+class FakeDocumentReference:
+    def __init__(self, db: 'FakeFirestore', path: str):
+        self._db = db
+        self.path = path
+        self._collection_path, self.id = path.rsplit('/', 1)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    @property
+    def parent(self) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._db, self._collection_path)
+
+    def collection(self, name: str) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None, **kwargs) -> FakeDocumentSnapshot:
+        self._db._read_delay()
+        with self._db._lock:
+            self._db._count('get', reads=1)
+            return FakeDocumentSnapshot(self, self._db._docs(self._collection_path).get(self.id), field_paths)
+
+    def create(self, data: Dict[str, Any]):
+        self._db._apply([('create', self, data, {})], op='create')
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._db._apply([('set', self, data, {'merge': merge})], op='set')
+
+    def update(self, data: Dict[str, Any]):
+        self._db._apply([('update', self, data, {})], op='update')
+
+    def delete(self, option=None):
+        self._db._apply([('delete', self, None, {'option': option})], op='delete')
+
+
+class FakeQuery:
+    def __init__(self, db: 'FakeFirestore', collection_path: str, filters=(), orders=(), limit=None,
+                 offset=0, fields=None, all_descendants=False):
+        self._db = db
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._fields = fields
+        self._all_descendants = all_descendants
+
+    def _copy(self, **changes) -> 'FakeQuery':
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit, offset=self._offset,
+                     fields=self._fields, all_descendants=self._all_descendants)
+        state.update(changes)
+        return FakeQuery(self._db, self._collection_path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None) -> 'FakeQuery':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPS:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = 'ASCENDING') -> 'FakeQuery':
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count)
+
+    def offset(self, count: int) -> 'FakeQuery':
+        return self._copy(offset=count)
+
+    def select(self, field_paths) -> 'FakeQuery':
+        return self._copy(fields=list(field_paths))
+
+    def _collections(self) -> List[str]:
+        if not self._all_descendants:
+            return [self._collection_path]
+        return [path for path in self._db._collections
+                if path.rsplit('/', 1)[-1] == self._collection_path]
+
+    def _matches(self) -> List[FakeDocumentReference]:
+        matched = []
+        with self._db._lock:
+            for collection_path in self._collections():
+                for doc_id, data in self._db._docs(collection_path).items():
+                    ok = all(
+                        (value := _get_path(data, field)) is not _MISSING and _OPS[op](value, expected)
+                        for field, op, expected in self._filters
+                    ) and all(_get_path(data, field) is not _MISSING for field, _ in self._orders)
+                    if ok:
+                        matched.append((FakeDocumentReference(self._db, f"{collection_path}/{doc_id}"), data))
+        for field, direction in reversed(self._orders):
+            matched.sort(key=lambda item: _get_path(item[1], field), reverse=direction == 'DESCENDING')
+        matched = matched[self._offset:]
+        return matched[:self._limit] if self._limit is not None else matched
+
+    def stream(self, transaction=None):
+        self._db._read_delay()
+        matched = self._matches()
+        # Firestore bills one read for a query that returns nothing
+        self._db._count('query', reads=max(1, len(matched)))
+        return iter([FakeDocumentSnapshot(ref, data, self._fields) for ref, data in matched])
+
+    def get(self, transaction=None) -> List[FakeDocumentSnapshot]:
+        return list(self.stream())
+
+    def count(self, alias=None) -> '_FakeAggregation':
+        return _FakeAggregation(self, alias)
+
+
+class _FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class _FakeAggregation:
+    def __init__(self, query: FakeQuery, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None):
+        self._query._db._read_delay()
+        matched = len(self._query._matches())
+        # One read per batch of up to 1000 index entries
+        self._query._db._count('aggregate', reads=max(1, math.ceil(matched / 1000)))
+        return [[_FakeAggregationResult(self._alias, matched)]]
+
+
+class _FakeChange:
+    class _Type:
+        def __init__(self, name):
+            self.name = name
+
+    def __init__(self, kind: str, document: FakeDocumentSnapshot):
+        self.type = self._Type(kind)
+        self.document = document
+
+
+class _FakeWatch:
+    def __init__(self, db: 'FakeFirestore', collection_path: str, callback):
+        self._db = db
+        self.collection_path = collection_path
+        self.callback = callback
+
+    def unsubscribe(self):
+        with self._db._lock:
+            if self in self._db._listeners:
+                self._db._listeners.remove(self)
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db: 'FakeFirestore', path: str):
+        super().__init__(db, path)
+        self.id = path.rsplit('/', 1)[-1]
+        self.path = path
+
+    @property
+    def parent(self) -> Optional[FakeDocumentReference]:
+        if '/' not in self.path:
+            return None
+        return FakeDocumentReference(self._db, self.path.rsplit('/', 1)[0])
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._db, f"{self.path}/{document_id or _auto_id()}")
+
+    def add(self, data: Dict[str, Any], document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self):
+        with self._db._lock:
+            return [self.document(doc_id) for doc_id in list(self._db._docs(self.path))]
+
+    def on_snapshot(self, callback) -> _FakeWatch:
+        """Listener: called once with every document ADDED, then synchronously after each write."""
+        watch = _FakeWatch(self._db, self.path, callback)
+        with self._db._lock:
+            self._db._listeners.append(watch)
+            docs = [FakeDocumentSnapshot(self.document(doc_id), data)
+                    for doc_id, data in self._db._docs(self.path).items()]
+            self._db._count('listen', reads=max(1, len(docs)))
+        callback(docs, [_FakeChange('ADDED', doc) for doc in docs], datetime.now(timezone.utc))
+        return watch
+
+
+class FakeWriteBatch:
+    def __init__(self, db: 'FakeFirestore'):
+        self._db = db
+        self._writes = []
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, document_data, {}))
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, document_data, {'merge': merge}))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates, {}))
+
+    def delete(self, reference, option=None):
+        self._writes.append(('delete', reference, None, {'option': option}))
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._db._apply(writes, op='batch_commit')
+        return [None] * len(writes)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Transaction compatible with @firestore.transactional.
+
+    Transactions are serialized on the client lock from begin to commit, so reads
+    inside a transaction always see a consistent snapshot.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, db: 'FakeFirestore', max_attempts: int = 5, read_only: bool = False):
+        super().__init__(db)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._held = False
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._db._lock.acquire()
+        self._held = True
+        self._id = next(self._ids)
+
+    def _release(self):
+        if self._held:
+            self._held = False
+            self._db._lock.release()
+
+    def _commit(self):
+        try:
+            writes, self._writes = self._writes, []
+            self._db._apply(writes, op='transaction_commit')
+            return [None] * len(writes)
+        finally:
+            self._id = None
+            self._release()
+
+    def _rollback(self):
+        self._clean_up()
+        self._release()
+
+    def commit(self):
+        return self._commit()
+
+
+class FakeFirestore:
+    """In-memory Firestore client with per-operation counts and injectable latency."""
+
+    def __init__(self, read_latency: Latency = None, write_latency: Latency = None):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._listeners: List[_FakeWatch] = []
+        self._update_times: Dict[str, datetime] = {}
+        self._lock = threading.RLock()
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.reads = 0
+        self.writes = 0
+        self.ops: Counter = Counter()
+
+    # ---- client API ----
+
+    def collection(self, *path: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, '/'.join(path))
+
+    def document(self, *path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, '/'.join(path))
+
+    def collection_group(self, collection_id: str) -> FakeQuery:
+        return FakeQuery(self, collection_id, all_descendants=True)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        self._read_delay()
+        with self._lock:
+            snapshots = [
+                FakeDocumentSnapshot(ref, self._docs(ref._collection_path).get(ref.id), field_paths)
+                for ref in references
+            ]
+            self._count('get_all', reads=len(snapshots))
+        return iter(snapshots)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> FakeTransaction:
+        return FakeTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    @staticmethod
+    def write_option(last_update_time=None, exists=None) -> Dict[str, Any]:
+        return {'last_update_time': last_update_time, 'exists': exists}
+
+    def collections(self):
+        with self._lock:
+            return [FakeCollectionReference(self, path) for path in self._collections if '/' not in path]
+
+    # ---- accounting ----
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'reads': self.reads, 'writes': self.writes, 'ops': dict(self.ops)}
+
+    def reset_counts(self):
+        with self._lock:
+            self.reads = self.writes = 0
+            self.ops.clear()
+
+    def peek(self, path: str) -> Optional[Dict[str, Any]]:
+        """Stored document data without counting a read (test and benchmark bookkeeping)."""
+        collection_path, doc_id = path.rsplit('/', 1)
+        with self._lock:
+            return copy.deepcopy(self._collections.get(collection_path, {}).get(doc_id))
+
+    def load(self, collection_path: str, documents: Dict[str, Dict[str, Any]]):
+        """Seeds documents without counting writes or notifying listeners."""
+        with self._lock:
+            self._docs(collection_path).update({k: copy.deepcopy(v) for k, v in documents.items()})
+
+    def document_size(self, path: str) -> int:
+        """Approximate stored size in bytes of a document (name plus fields)."""
+        data = self.peek(path)
+        return len(path.encode('utf-8')) + 16 + (_size(data) if data else 0)
+
+    # ---- internals ----
+
+    def _docs(self, collection_path: str) -> Dict[str, Dict[str, Any]]:
+        docs = self._collections.get(collection_path)
+        if docs is None:
+            docs = self._collections[collection_path] = {}
+        return docs
+
+    def _count(self, op: str, reads: int = 0, writes: int = 0):
+        with self._lock:
+            self.ops[op] += 1
+            self.reads += reads
+            self.writes += writes
+
+    @staticmethod
+    def _delay(latency: Latency):
+        seconds = latency() if callable(latency) else latency
+        if seconds:
+            time.sleep(seconds)
+
+    def _read_delay(self):
+        self._delay(self.read_latency)
+
+    def _apply(self, writes, op: str):
+        """Applies writes atomically (all or nothing) and notifies listeners."""
+        self._delay(self.write_latency)
+        changes = []
+        with self._lock:
+            staged: Dict[str, Optional[Dict[str, Any]]] = {}
+            for kind, ref, data, options in writes:
+                docs = self._docs(ref._collection_path)
+                current = staged[ref.path] if ref.path in staged else docs.get(ref.id)
+                option = options.get('option') or {}
+                if option.get('last_update_time') is not None and \
+                        option['last_update_time'] != self._update_times.get(ref.path):
+                    raise exceptions.FailedPrecondition(f"Document changed since it was read: {ref.path}")
+                if option.get('exists') is not None and option['exists'] != (current is not None):
+                    raise exceptions.FailedPrecondition(f"Existence precondition failed: {ref.path}")
+                if kind == 'create' and current is not None:
+                    raise exceptions.AlreadyExists(f"Document already exists: {ref.path}")
+                if kind == 'update' and current is None:
+                    raise exceptions.NotFound(f"No document to update: {ref.path}")
+                if kind == 'delete':
+                    staged[ref.path] = None
+                    continue
+                new = copy.deepcopy(current) if (kind == 'update' or options.get('merge')) and current else {}
+                if kind == 'update':
+                    _update(new, data)
+                else:
+                    _merge(new, data)
+                staged[ref.path] = new
+
+            for kind, ref, data, options in writes:
+                if ref.path not in staged:
+                    continue
+                new = staged.pop(ref.path)
+                docs = self._docs(ref._collection_path)
+                existed = ref.id in docs
+                if new is None:
+                    docs.pop(ref.id, None)
+                    self._update_times.pop(ref.path, None)
+                    if existed:
+                        changes.append((ref, 'REMOVED', None))
+                else:
+                    docs[ref.id] = new
+                    self._update_times[ref.path] = datetime.now(timezone.utc)
+                    changes.append((ref, 'MODIFIED' if existed else 'ADDED', new))
+
+            self._count(op, writes=len(writes))
+            listeners = list(self._listeners)
+
+        for watch in listeners:
+            relevant = [
+                _FakeChange(kind, FakeDocumentSnapshot(ref, data))
+                for ref, kind, data in changes if ref._collection_path == watch.collection_path
+            ]
+            if relevant:
+                watch.callback([c.document for c in relevant], relevant, datetime.now(timezone.utc))
@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app
+from testing.fake_firestore import FakeFirestore
 
 @pytest.fixture
 def app():
@@ -35,3 +36,25 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+@pytest.fixture
+def fake_db():
+    """In-memory Firestore with real query semantics and read/write counts."""
+    return FakeFirestore()
+
+@pytest.fixture
+def fake_app(fake_db):
+    # Same as `app`, but backed by the in-memory Firestore (background question generation off)
+    with patch('app.initialize_firebase', return_value=fake_db), \
+         patch('app.initialize_ai_client', return_value=MagicMock()), \
+         patch('config.Config.QUESTION_POOL_ENABLED', False):
+        app = create_app()
+        app.config.update({
+            "TESTING": True,
+        })
+
+        yield app
+
+@pytest.fixture
+def fake_client(fake_app):
+    return fake_app.test_client()
@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock
+
+from services.adaptive_test_service import AdaptiveTestService
+
+
+def _question(question_id, difficulty):
+    return {'id': question_id, 'difficulty': difficulty, 'correct_answer': 'A', 'topic': 'Algebra'}
+
+
+def test_submit_answer_serves_prefetched_branch():
+    """Both next difficulties are fetched after start_test and submit uses the matching one."""
+    db = MagicMock()
+    service = AdaptiveTestService(db)
+    service.TOTAL_QUESTIONS = 2
+    service.question_service.pool = None
+    get_question = MagicMock(side_effect=lambda **kw: _question(f"q_{kw['difficulty']}", kw['difficulty']))
+    service.question_service.get_question = get_question
+
+    db.collection.return_value.document.return_value.id = 'session_1'
+    first = service.start_test({'system': 'US', 'grade': '8'})
+    for future in service._prefetched.get('session_1').values():
+        future.result(timeout=5)
+    prefetched = {c.kwargs['difficulty'] for c in get_question.call_args_list[1:]}
+    assert prefetched == {'Hard', 'Easy'}
+
+    session = {
+        'user_context': {'system': 'US', 'grade': '8'}, 'current_question_index': 0,
+        'answers': [], 'current_difficulty': 'Medium'
+    }
+    db.collection.return_value.document.return_value.get.return_value.to_dict.side_effect = [
+        session, _question(first['first_question']['id'], 'Medium')
+    ]
+    calls_before = get_question.call_count
+
+    result = service.submit_answer('session_1', 'q_Medium', 'A')
+
+    assert result['next_question']['id'] == 'q_Hard'
+    assert get_question.call_count == calls_before
+    assert service.prefetch_stats['hits'] == 1
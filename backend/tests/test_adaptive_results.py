@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock
+
+from services.adaptive_test_service import AdaptiveTestService
+from utils.circuit_breaker import FallbackText
+
+
+def _doc(question_id, data):
+    doc = MagicMock()
+    doc.id, doc.exists = question_id, True
+    doc.to_dict.return_value = data
+    return doc
+
+
+def test_results_read_questions_once_and_batch_explanation_writes():
+    """Results use one get_all read, one concurrent explanation pass and one batched write."""
+    db = MagicMock()
+    service = AdaptiveTestService(db)
+    service.question_service.pool = None
+    service.question_service.generate_performance_summary = MagicMock(return_value='Summary')
+    service.question_service.generate_explanations = MagicMock(return_value=(
+        {'q_2': 'Generated', 'q_3': FallbackText('Explanation currently unavailable.')}, []
+    ))
+    db.get_all.return_value = [
+        _doc('q_1', {'text_latex': 'x', 'explanation': 'Stored'}),
+        _doc('q_2', {'text_latex': 'y'}),
+        _doc('q_3', {'text_latex': 'z'}),
+    ]
+    session = {
+        'user_context': {'system': 'US', 'grade': '8'},
+        'current_difficulty': 'Easy',
+        'answers': [
+            {'question_id': 'q_1', 'is_correct': False, 'difficulty': 'Medium', 'topic': 'Algebra'},
+            {'question_id': 'q_2', 'is_correct': False, 'difficulty': 'Easy', 'topic': 'Algebra'},
+            {'question_id': 'q_3', 'is_correct': False, 'difficulty': 'Easy', 'topic': 'Geometry'},
+        ]
+    }
+
+    results = service._calculate_results(session)
+
+    db.get_all.assert_called_once()
+    db.collection.return_value.document.return_value.get.assert_not_called()
+    assert set(service.question_service.generate_explanations.call_args.args[0]) == {'q_2', 'q_3'}
+    assert [a['explanation'] for a in results['answer_history']] == [
+        'Stored', 'Generated', 'Explanation currently unavailable.'
+    ]
+    batch = db.batch.return_value
+    batch.update.assert_called_once()
+    assert batch.update.call_args.args[1] == {'explanation': 'Generated'}
+    batch.commit.assert_called_once()
+    assert results['recommendation_text'] == 'Summary'
@@ -0,0 +1,173 @@
+import secrets
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from config import Config
+from services.adaptive_session_store import (
+    MemorySessionStore, StaleSessionError, TokenSessionStore, build_session_store
+)
+from services.adaptive_test_service import AdaptiveTestService
+from utils.session_token import InvalidSessionToken, SessionTokenSigner
+
+
+def test_memory_store_answers_without_reads_and_one_write_behind_update():
+    """Mid-test answers are graded from memory and persisted as one merged update."""
+    db = MagicMock()
+    service = AdaptiveTestService(db)
+    service.question_service.pool = None
+    service.sessions = MemorySessionStore(db, flush_interval=3600)
+    service._start_prefetch = MagicMock()
+    service.question_service.get_question = MagicMock(side_effect=lambda **kw: {
+        'id': f"q_{kw['difficulty']}", 'difficulty': kw['difficulty'], 'correct_answer': 'A', 'topic': 'Algebra'
+    })
+    session_ref = db.collection.return_value.document.return_value
+    session_ref.id = 'session_1'
+
+    service.start_test({'system': 'US', 'grade': '8'})
+    db.collection.reset_mock()
+
+    result = service.submit_answer('session_1', 'q_Medium', 'A')
+
+    assert result['next_question']['id'] == 'q_Hard'
+    session_ref.get.assert_not_called()
+    session_ref.update.assert_not_called()
+
+    service.sessions.flush()
+
+    session_ref.update.assert_called_once()
+    update = session_ref.update.call_args.args[0]
+    assert update['current_question']['id'] == 'q_Hard'
+    assert update['current_question_index'] == 1
+    assert update['answers'].values[0]['is_correct'] is True
+
+
+def test_memory_store_reloads_session_advanced_elsewhere():
+    """A cached session whose current question does not match the submission is reloaded."""
+    db = MagicMock()
+    store = MemorySessionStore(db, flush_interval=3600)
+    db.collection.return_value.document.return_value.id = 'session_1'
+    store.create({'answers': [], 'current_question': {'id': 'q1'}})
+    fresh = {'answers': [{'question_id': 'q1'}], 'current_question': {'id': 'q2'}}
+    db.collection.return_value.document.return_value.get.return_value.to_dict.return_value = fresh
+
+    assert store.get('session_1', 'q2') == fresh
+    assert store.stats['stale_reloads'] == 1
+
+
+def test_memory_store_rejects_a_loaded_session_that_is_behind():
+    """A session loaded on a new instance before the previous one flushed is re-read, then refused."""
+    db = MagicMock()
+    store = MemorySessionStore(db, flush_interval=3600, stale_wait=0)
+    behind = {'answers': [], 'current_question': {'id': 'q1'}}
+    session_doc = db.collection.return_value.document.return_value.get.return_value
+    session_doc.to_dict.return_value = behind
+
+    with pytest.raises(StaleSessionError):
+        store.get('session_1', 'q2')
+    assert store.stats['loads'] == MemorySessionStore.STALE_LOAD_ATTEMPTS
+    assert store.stats['stale_rejects'] == 1
+
+    caught_up = {'answers': [{'question_id': 'q1'}], 'current_question': {'id': 'q2'}}
+    session_doc.to_dict.side_effect = [behind, caught_up]
+    assert store.get('session_1', 'q2') == caught_up
+    assert store.get('session_1', 'q2') == caught_up
+    assert store.stats['memory_hits'] == 1
+
+
+def test_memory_store_retry_after_failed_step_records_the_answer_once():
+    """A step that fails before save_answer leaves the cached session untouched."""
+    db = MagicMock()
+    service = AdaptiveTestService(db)
+    service.question_service.pool = None
+    service.sessions = MemorySessionStore(db, flush_interval=3600)
+    service._start_prefetch = MagicMock()
+    service._take_prefetched = MagicMock(return_value=None)
+    replies = [RuntimeError("question lookup failed")]
+
+    def get_question(**kw):
+        if replies:
+            raise replies.pop()
+        return {'id': f"q_{kw['difficulty']}", 'difficulty': kw['difficulty'], 'correct_answer': 'A'}
+
+    service.question_service.get_question = MagicMock(side_effect=lambda **kw: {
+        'id': 'q_Medium', 'difficulty': 'Medium', 'correct_answer': 'A'
+    })
+    db.collection.return_value.document.return_value.id = 'session_1'
+    service.start_test({'system': 'US', 'grade': '8'})
+    service.question_service.get_question.side_effect = get_question
+
+    with pytest.raises(RuntimeError):
+        service.submit_answer('session_1', 'q_Medium', 'A')
+    result = service.submit_answer('session_1', 'q_Medium', 'A')
+
+    assert result['next_question']['id'] == 'q_Hard'
+    session = service.sessions.get('session_1')
+    assert [a['question_id'] for a in session['answers']] == ['q_Medium']
+    assert session['current_question_index'] == 1
+
+
+def _token_service(db):
+    service = AdaptiveTestService(db)
+    service.question_service.pool = None
+    service.sessions = TokenSessionStore(db, SessionTokenSigner(secrets.token_hex(16)))
+    service._start_prefetch = MagicMock()
+    service.question_service.get_question = MagicMock(side_effect=lambda **kw: {
+        'id': f"q_{kw['difficulty']}_{len(kw.get('exclude_ids') or [])}", 'difficulty': kw['difficulty'],
+        'correct_answer': 'A', 'topic': 'Algebra'
+    })
+    question_doc = db.collection.return_value.document.return_value.get.return_value
+    question_doc.to_dict.return_value = {'correct_answer': 'A', 'difficulty': 'Medium', 'topic': 'Algebra'}
+    return service
+
+
+def test_token_mode_keeps_progress_in_signed_token_and_persists_only_results():
+    """Token sessions read only the answered question mid-test and write once at the end."""
+    db = MagicMock()
+    service = _token_service(db)
+    service._calculate_results = MagicMock(return_value={'score': 3})
+    session_ref = db.collection.return_value.document.return_value
+
+    started = service.start_test({'system': 'US', 'grade': '8'})
+    session_ref.set.assert_not_called()
+
+    token, question = started['session_token'], started['first_question']
+    for _ in range(service.TOTAL_QUESTIONS - 1):
+        result = service.submit_answer(started['session_id'], question['id'], 'A', session_token=token)
+        token, question = result['session_token'], result['next_question']
+    session_ref.set.assert_not_called()
+    session_ref.update.assert_not_called()
+
+    result = service.submit_answer(started['session_id'], question['id'], 'A', session_token=token)
+
+    assert result['is_finished'] is True
+    session_ref.set.assert_called_once()
+    saved = session_ref.set.call_args.args[0]
+    assert [a['is_correct'] for a in saved['answers']] == [True] * service.TOTAL_QUESTIONS
+    assert saved['is_finished'] is True
+
+
+def test_token_mode_rejects_tampered_or_mismatched_tokens():
+    """Forged tokens and tokens for another question are refused."""
+    db = MagicMock()
+    service = _token_service(db)
+    started = service.start_test({'system': 'US', 'grade': '8'})
+    token = started['session_token']
+    body, signature = token.split('.')
+
+    with pytest.raises(InvalidSessionToken):
+        service.submit_answer(started['session_id'], started['first_question']['id'], 'A',
+                              session_token=body[:-2] + 'xx.' + signature)
+    with pytest.raises(InvalidSessionToken):
+        service.submit_answer(started['session_id'], 'other_question', 'A', session_token=token)
+    with pytest.raises(InvalidSessionToken):
+        service.submit_answer(started['session_id'], started['first_question']['id'], 'A', session_token=None)
+
+
+def test_token_mode_requires_a_shared_secret():
+    """Without SESSION_TOKEN_SECRET token mode is refused at startup instead of using a per-process key."""
+    with patch.multiple(Config, ADAPTIVE_SESSION_MODE='token', SESSION_TOKEN_SECRET=''):
+        with pytest.raises(ValueError):
+            build_session_store(MagicMock())
+    with patch.multiple(Config, ADAPTIVE_SESSION_MODE='token', SESSION_TOKEN_SECRET='shared'):
+        assert isinstance(build_session_store(MagicMock()), TokenSessionStore)
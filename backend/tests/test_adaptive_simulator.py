@@ -0,0 +1,21 @@
+from unittest.mock import patch
+
+from benchmarks.adaptive_simulator import Simulator, parse_args
+from config import Config
+
+
+def test_simulator_report_counts_every_student():
+    """A small offline run completes every simulated test and reports per-test costs."""
+    args = parse_args(['--students', '6', '--concurrency', '3', '--model-latency-ms', '0',
+                       '--questions-per-cell', '5', '--index', 'off'])
+    with patch.multiple(Config, ADAPTIVE_ENGINE='label', ADAPTIVE_SESSION_MODE='token',
+                        QUESTION_INDEX_MODE='off', QUESTION_POOL_ENABLED=False, SUMMARY_CACHE_PERSIST=False,
+                        SESSION_TOKEN_SECRET='test', AI_PROVIDER='stub', AI_STUB_LATENCY_MS=0.0):
+        args.session_mode = 'token'
+        report = Simulator(args).run()
+
+    assert report['completed_tests'] == 6 and report['errors'] == 0
+    assert report['per_test']['questions'] == 3
+    assert report['per_test']['firestore_writes'] >= 1
+    assert report['latency_ms']['submit_answer']['count'] == 18
+    assert report['model']['calls'] >= 1
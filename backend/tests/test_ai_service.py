@@ -0,0 +1,75 @@
+import threading
+from unittest.mock import MagicMock
+
+from services.ai_service import AIService
+
+
+def test_generate_solutions_marks_late_problems_pending():
+    """Explanations that miss the deadline are pending but still reach the callback."""
+    release = threading.Event()
+    service = AIService(MagicMock())
+
+    def fake_generate(problem_id, problem_text, correct_answer, db_solution=None):
+        if problem_id == 'slow':
+            release.wait(5)
+        return f"solution-{problem_id}"
+
+    service.generate_solution = fake_generate
+
+    cached = {}
+    finished = threading.Event()
+
+    def on_complete(problem_id, solution):
+        cached[problem_id] = solution
+        if problem_id == 'slow':
+            finished.set()
+
+    tasks = [
+        {'problem_id': pid, 'problem_text': '', 'correct_answer': 'A', 'db_solution': None}
+        for pid in ('fast', 'slow')
+    ]
+    solutions, pending = service.generate_solutions(tasks, timeout=0.2, on_complete=on_complete)
+
+    assert solutions == {'fast': 'solution-fast'}
+    assert pending == ['slow']
+
+    release.set()
+    assert finished.wait(5)
+    assert cached == {'fast': 'solution-fast', 'slow': 'solution-slow'}
+
+
+def test_analyze_weakness_reuses_cached_report_for_same_category_multiset():
+    """Reordered categories with the same time bucket hit the cache instead of the model."""
+    model = MagicMock()
+    model.generate_content.return_value.text = 'report'
+    service = AIService(model)
+
+    first = service.analyze_weakness(['Algebra', 'Geometry', 'Algebra'], {'is_overtime': False})
+    second = service.analyze_weakness(['Geometry', 'Algebra', 'Algebra'], {'is_overtime': False})
+    service.analyze_weakness(['Geometry', 'Algebra', 'Algebra'], {'is_overtime': True})
+
+    assert first == second == 'report'
+    assert model.generate_content.call_count == 2
+
+
+def test_generate_solutions_async_fans_out_on_shared_loop():
+    """Async fan-out returns finished solutions and cancels calls that miss the deadline."""
+    import asyncio
+
+    service = AIService(MagicMock())
+
+    async def fake_generate(problem_id, problem_text, correct_answer, db_solution=None):
+        if problem_id == 'slow':
+            await asyncio.sleep(5)
+        return f"solution-{problem_id}"
+
+    service.generate_solution_async = fake_generate
+
+    tasks = [
+        {'problem_id': pid, 'problem_text': '', 'correct_answer': 'A', 'db_solution': None}
+        for pid in ('a', 'b', 'slow')
+    ]
+    solutions, pending = service.generate_solutions_async(tasks, timeout=0.2)
+
+    assert solutions == {'a': 'solution-a', 'b': 'solution-b'}
+    assert pending == ['slow']
@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock, patch
+
+from google.api_core import exceptions as google_exceptions
+
+from config import Config
+from utils.ai_client import call_ai_with_retry
+from utils.circuit_breaker import CircuitBreaker
+
+
+def test_breaker_opens_on_error_rate_and_fails_fast(monkeypatch):
+    """Once the rolling error rate trips the breaker, calls return without touching the model."""
+    monkeypatch.setattr('utils.ai_client.time.sleep', lambda s: None)
+    breaker = CircuitBreaker('test', min_calls=2, error_rate=0.5, open_duration=60)
+    model = MagicMock()
+    model.generate_content.side_effect = google_exceptions.ServiceUnavailable('down')
+
+    assert call_ai_with_retry(model, 'prompt', max_retries=2, breaker=breaker) is None
+    assert breaker.state == CircuitBreaker.OPEN
+
+    calls = model.generate_content.call_count
+    assert call_ai_with_retry(model, 'prompt', breaker=breaker) is None
+    assert model.generate_content.call_count == calls
+    assert breaker.snapshot()['stats']['rejected'] == 1
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    """After the open period a single probe is allowed and a success closes the circuit."""
+    breaker = CircuitBreaker('test', min_calls=1, error_rate=0.5, open_duration=0)
+    assert breaker.allow()
+    breaker.record(0.1, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    probe = breaker.allow()
+    assert probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(0.1, False, probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert [t['to'] for t in breaker.snapshot()['transitions']] == ['open', 'half_open', 'closed']
+
+
+def _open_then_probe(breaker):
+    breaker.record(0.1, True, breaker.allow())
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker.allow()
+
+
+def test_breaker_half_open_neutral_probe_result_does_not_close():
+    """A client error from the probe frees the probe slot but leaves the breaker half open."""
+    breaker = CircuitBreaker('test', min_calls=1, error_rate=0.5, open_duration=0)
+    probe = _open_then_probe(breaker)
+
+    breaker.record(0.1, None, probe)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    next_probe = breaker.allow()
+    assert next_probe
+    breaker.record(0.1, False, next_probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_ignores_results_from_before_the_state_changed():
+    """A call that started while closed cannot close a half-open breaker or take its probe slot."""
+    breaker = CircuitBreaker('test', min_calls=1, error_rate=0.5, open_duration=0)
+    stale = breaker.allow()
+    probe = _open_then_probe(breaker)
+
+    breaker.record(0.1, False, stale)
+    breaker.release(stale)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(0.1, True, probe)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_ai_metrics_endpoint_is_hidden_by_default(client):
+    with patch.object(Config, 'DEBUG_METRICS_ENABLED', False):
+        assert client.get('/debug/ai_metrics').status_code == 404
+
+
+def test_ai_metrics_endpoint_reports_breakers(client):
+    """The instrumentation endpoint exposes breaker state and cache stats."""
+    with patch.object(Config, 'DEBUG_METRICS_ENABLED', True):
+        response = client.get('/debug/ai_metrics')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 'circuit_breakers' in data
+    assert 'weakness' in data['caches']
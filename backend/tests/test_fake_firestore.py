@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+import pytest
+from google.api_core import exceptions
+from google.cloud import firestore
+
+from services.question_index import QuestionIndex
+from utils.single_flight import FirestoreLease
+
+
+def test_queries_follow_firestore_semantics_and_count_reads(fake_db):
+    """where/order_by/limit/select, count() and collection groups match Firestore and bill reads."""
+    for n in range(5):
+        fake_db.collection('questions').document(f'q_{n}').set({'grade': '8', 'random_key': n / 10, 'text': 'x'})
+    fake_db.collection('questions').document('q_0').update({'grade': '9'})
+    fake_db.collection('users').document('u1').collection('answers').document('a1').set({'is_correct': True})
+    fake_db.reset_counts()
+
+    docs = fake_db.collection('questions').where('grade', '==', '8').where('random_key', '>=', 0.2)\
+        .order_by('random_key').limit(2).select(['random_key']).get()
+    count = fake_db.collection('questions').where('grade', '==', '8').count().get()[0][0].value
+    answers = list(fake_db.collection_group('answers').stream())
+    empty = fake_db.collection('questions').where('grade', '==', '12').get()
+
+    assert [d.id for d in docs] == ['q_2', 'q_3']
+    assert docs[0].to_dict() == {'random_key': 0.2}
+    assert count == 4
+    assert answers[0].reference.parent.parent.path == 'users/u1'
+    assert empty == []
+    assert fake_db.snapshot() == {'reads': 2 + 1 + 1 + 1, 'writes': 0,
+                                  'ops': {'query': 3, 'aggregate': 1}}
+
+
+def test_writes_apply_transforms_and_batches_are_atomic(fake_db):
+    """merge/update/transforms behave like Firestore and a failing batch applies nothing."""
+    ref = fake_db.collection('users').document('u1')
+    ref.set({'stats': {'total': 1, 'correct': 1}, 'tags': ['a'], 'created_at': firestore.SERVER_TIMESTAMP})
+    ref.set({'stats': {'total': 2}}, merge=True)
+    ref.update({'stats.correct': firestore.Increment(1), 'tags': firestore.ArrayUnion(['a', 'b'])})
+
+    data = fake_db.peek('users/u1')
+    assert data['stats'] == {'total': 2, 'correct': 2}
+    assert data['tags'] == ['a', 'b']
+    assert data['created_at'] is not firestore.SERVER_TIMESTAMP
+
+    batch = fake_db.batch()
+    batch.set(fake_db.collection('users').document('u2'), {'name': 'new'})
+    batch.update(fake_db.collection('users').document('missing'), {'name': 'x'})
+    with pytest.raises(exceptions.NotFound):
+        batch.commit()
+    assert fake_db.peek('users/u2') is None
+
+
+def test_transactions_support_the_transactional_decorator(fake_db):
+    """FirestoreLease runs its @firestore.transactional acquire and conditional delete on the fake."""
+    lease = FirestoreLease(fake_db, ttl=60)
+
+    token = lease.acquire('problem/1')
+    assert token is not None
+    assert lease.acquire('problem/1') is None
+
+    lease.release('problem/1', token)
+    assert fake_db.peek('single_flight_leases/problem_1') is None
+    assert fake_db.ops['transaction_commit'] == 2
+
+
+def test_snapshot_listener_keeps_question_index_fresh(fake_db):
+    """Collection listeners deliver the initial load and later writes to the question index."""
+    fake_db.collection('questions').document('US_8_1').set({'curriculum_system': 'US', 'grade': '8',
+                                                             'difficulty': 'Easy', 'correct_answer': 'A'})
+    index = QuestionIndex(fake_db, mode='listener')
+    index.start()
+    assert index.ready and index.cell_size('US', '8', 'Easy') == 1
+
+    fake_db.collection('questions').document('US_8_2').set({'curriculum_system': 'US', 'grade': '8',
+                                                             'difficulty': 'Easy', 'correct_answer': 'B'})
+    fake_db.collection('questions').document('US_8_1').delete()
+    assert index.cell_size('US', '8', 'Easy') == 1
+    assert index.pick('US', '8', 'Easy')[1]['id'] == 'US_8_2'
+
+
+@pytest.fixture
+def memory_sessions():
+    with patch('config.Config.ADAPTIVE_SESSION_MODE', 'memory'):
+        yield
+
+
+def test_adaptive_test_routes_answer_from_memory(memory_sessions, fake_client, fake_db):
+    """Through the HTTP routes, starting a test and answering mid-test read no Firestore documents."""
+    for n, difficulty in enumerate(['Easy', 'Medium', 'Medium', 'Hard'] * 2):
+        fake_db.collection('questions').document(f'US_8_{n}').set({
+            'curriculum_system': 'US', 'grade': '8', 'difficulty': difficulty, 'topic': 'Algebra',
+            'text_latex': 'x', 'choices': [{'id': 'A', 'text': '1'}], 'correct_answer': 'A', 'random_key': n / 10
+        })
+    fake_db.reset_counts()
+
+    started = fake_client.post('/api/adaptive-test/start', json={
+        'user_id': 'guest', 'grade': '8', 'curriculum_category': 'Common Core'
+    }).get_json()
+    answered = fake_client.post('/api/adaptive-test/submit', json={
+        'user_id': 'guest', 'session_id': started['session_id'],
+        'question_id': started['first_question']['id'], 'answer': 'A',
+        'session_token': started.get('session_token')
+    }).get_json()
+
+    assert answered['is_finished'] is False
+    assert answered['next_question']['difficulty'] == 'Hard'
+    assert fake_db.reads == 0
@@ -0,0 +1,100 @@
+import logging
+from unittest.mock import patch
+
+from config import Config
+from utils.firestore_metrics import FirestoreMetrics, InstrumentedFirestore, collection_pattern
+from utils.single_flight import FirestoreLease
+from utils.unit_of_work import UnitOfWork
+
+
+def _load_questions(db):
+    for n in range(4):
+        db.collection('questions').document(f'q{n}').set({'grade': '8', 'text_latex': 'x' * 10, 'random_key': n})
+
+
+def test_reads_and_writes_are_attributed_to_the_calling_method(fake_db):
+    """Every read/write path is counted once, with bytes, under the method that issued it."""
+    metrics = FirestoreMetrics()
+    db = InstrumentedFirestore(fake_db, metrics)
+    _load_questions(db)
+
+    docs = list(db.get_all([db.collection('questions').document(f'q{n}') for n in range(3)]))
+    assert docs[0].reference.path == 'questions/q0' and docs[0].to_dict()['grade'] == '8'
+    assert db.collection('questions').where('grade', '==', '12').get() == []
+    assert db.collection('questions').count().get()[0][0].value == 4
+
+    uow = UnitOfWork(db, name='test')
+    for n in range(3):
+        uow.update(db.collection('questions').document(f'q{n}'), {'seen': True})
+    uow.commit()
+
+    methods = metrics.snapshot()['methods']
+    assert methods['test_firestore_metrics._load_questions']['writes'] == 4
+    site = methods['test_firestore_metrics.test_reads_and_writes_are_attributed_to_the_calling_method']
+    assert site['reads'] == 3 + 1 + 1
+    assert site['writes'] == 3
+    assert site['bytes_read'] > 0 and site['bytes_written'] > 0
+    assert fake_db.reads == 5 and fake_db.writes == 7
+
+
+def test_transactions_pass_through_the_wrapper(fake_db):
+    """@firestore.transactional receives the wrapped transaction and writes are still counted."""
+    metrics = FirestoreMetrics()
+    lease = FirestoreLease(InstrumentedFirestore(fake_db, metrics), ttl=60)
+
+    token = lease.acquire('problem/1')
+    assert token is not None and lease.acquire('problem/1') is None
+    lease.release('problem/1', token)
+
+    assert fake_db.peek('single_flight_leases/problem_1') is None
+    totals = metrics.snapshot()['methods']
+    assert sum(t['writes'] for t in totals.values()) == 2
+    assert sum(t['reads'] for t in totals.values()) == 3
+
+
+def test_repeated_single_gets_in_a_request_warn_as_n_plus_one(fake_db, caplog):
+    metrics = FirestoreMetrics()
+    db = InstrumentedFirestore(fake_db, metrics)
+    _load_questions(db)
+    db.collection('users').document('u1').collection('test_sessions').document('s1').set({'score': 1})
+
+    handle = metrics.begin_request('api.submit')
+    with caplog.at_level(logging.WARNING, logger='utils.firestore_metrics'):
+        for n in range(4):
+            db.collection('questions').document(f'q{n}').get()
+        db.document('users/u1/test_sessions/s1').get()
+        request = metrics.end_request(handle)
+
+    assert request.reads == 5 and request.writes == 0
+    assert request.n_plus_one(threshold=3) == {'questions': 4}
+    assert 'questions' in caplog.text and 'test_repeated_single_gets' in caplog.text
+    assert request.headers()['X-Firestore-N-Plus-One'] == 'questions=4'
+    snapshot = metrics.snapshot()
+    assert snapshot['endpoints']['api.submit']['reads_per_request'] == 5
+    assert snapshot['n_plus_one'] == {'api.submit questions': 1}
+
+    # Outside a request only the per-method totals move
+    db.collection('questions').document('q0').get()
+    assert snapshot['endpoints']['api.submit']['calls'] == metrics.snapshot()['endpoints']['api.submit']['calls']
+    assert collection_pattern('users/u1/test_sessions/s1/answers/a1') == 'users/*/test_sessions/*/answers'
+
+
+def test_debug_headers_and_metrics_endpoint(fake_client, fake_db):
+    for n, difficulty in enumerate(['Easy', 'Medium', 'Hard']):
+        fake_db.collection('questions').document(f'US_8_{n}').set({
+            'curriculum_system': 'US', 'grade': '8', 'difficulty': difficulty, 'topic': 'Algebra',
+            'text_latex': 'x', 'choices': [{'id': 'A', 'text': '1'}], 'correct_answer': 'A', 'random_key': n / 10
+        })
+    fake_db.reset_counts()
+
+    with patch.object(Config, 'FIRESTORE_METRICS_HEADERS', True):
+        response = fake_client.post('/api/adaptive-test/start', json={
+            'user_id': 'guest', 'grade': '8', 'curriculum_category': 'Common Core'
+        })
+    assert response.headers['X-Firestore-Reads'] == str(fake_db.reads)
+    assert 'X-Firestore-Time-Ms' in response.headers
+
+    with patch.object(Config, 'DEBUG_METRICS_ENABLED', True):
+        metrics = fake_client.get('/debug/ai_metrics').get_json()['firestore']
+    assert metrics['endpoints']['api.start_adaptive_test']['calls'] >= 1
+    assert 'X-Firestore-Reads' not in fake_client.get('/health').headers
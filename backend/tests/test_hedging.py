@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+from types import SimpleNamespace
+
+from utils.hedging import CallSite, hedged_call, hedged_call_async
+
+
+def _warm_site(latency=0.01, samples=20, budget=1.0):
+    site = CallSite('test', percentile=95, min_samples=samples, min_delay=0.05, budget=budget)
+    for _ in range(samples):
+        site.record_latency(latency)
+        site.hedge_delay()
+    return site
+
+
+def test_hedged_call_sends_duplicate_when_primary_is_slow():
+    """A primary slower than the percentile threshold is raced by a hedge, and the hedge wins."""
+    site = _warm_site()
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        time.sleep(1.0 if index == 0 else 0.01)
+        return index
+
+    started = time.monotonic()
+    assert hedged_call(fn, site) == 1
+    assert time.monotonic() - started < 0.5
+    stats = site.snapshot()
+    assert stats['hedged'] == 1 and stats['hedge_wins'] == 1
+
+
+def test_hedged_call_respects_budget():
+    """Without hedge budget the caller simply waits for the primary."""
+    site = _warm_site(budget=0.0)
+    assert hedged_call(lambda: (time.sleep(0.1), 'primary')[1], site) == 'primary'
+    assert site.snapshot()['hedged'] == 0
+    assert site.snapshot()['budget_exhausted'] == 1
+
+
+def test_hedged_call_async_cancels_loser():
+    """In async mode the losing request is cancelled once the hedge returns."""
+    site = _warm_site()
+    started = []
+    cancelled = []
+
+    async def call():
+        index = len(started)
+        started.append(index)
+        try:
+            await asyncio.sleep(1.0 if index == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    async def run():
+        result = await hedged_call_async(call, site)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert cancelled == [0]
+
+
+def test_hedged_call_keeps_waiting_when_the_hedge_returns_an_empty_response():
+    """A fast empty reply is not a win; the slower primary with text is returned."""
+    site = _warm_site()
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        if index == 0:
+            time.sleep(0.3)
+            return SimpleNamespace(text='primary')
+        return SimpleNamespace(text='')
+
+    assert hedged_call(fn, site).text == 'primary'
+    stats = site.snapshot()
+    assert stats['hedge_wins'] == 0 and stats['primary_wins'] == 1
+
+
+def test_hedged_call_returns_the_empty_response_when_both_copies_are_empty():
+    site = _warm_site()
+    result = hedged_call(lambda: (time.sleep(0.1), SimpleNamespace(text=''))[1], site)
+
+    assert result.text == ''
+    stats = site.snapshot()
+    assert stats['hedged'] == 1 and stats['hedge_wins'] == stats['primary_wins'] == 0
+
+
+def test_hedged_call_async_keeps_waiting_when_the_hedge_returns_an_empty_response():
+    site = _warm_site()
+    started = []
+
+    async def call():
+        index = len(started)
+        started.append(index)
+        if index == 0:
+            await asyncio.sleep(0.3)
+            return SimpleNamespace(text='primary')
+        return SimpleNamespace(text='')
+
+    assert asyncio.run(hedged_call_async(call, site)).text == 'primary'
+    stats = site.snapshot()
+    assert stats['hedge_wins'] == 0 and stats['primary_wins'] == 1
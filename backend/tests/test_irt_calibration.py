@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from services.irt_calibration import IRTCalibrator, fit_2pl
+
+
+def test_fit_2pl_recovers_simulated_item_parameters():
+    """The EM fit recovers difficulty and discrimination from simulated sparse responses."""
+    rng = np.random.default_rng(0)
+    n_persons, n_items = 2000, 10
+    theta = rng.normal(size=n_persons)
+    a, b = rng.uniform(0.7, 2.0, n_items), rng.uniform(-1.5, 1.5, n_items)
+    persons, items = np.repeat(np.arange(n_persons), n_items), np.tile(np.arange(n_items), n_persons)
+    keep = rng.random(len(persons)) < 0.6
+    persons, items = persons[keep], items[keep]
+    p = 1.0 / (1.0 + np.exp(-a[items] * (theta[persons] - b[items])))
+    correct = (rng.random(len(p)) < p).astype(float)
+
+    a_hat, b_hat = fit_2pl(persons, items, correct, n_items)
+
+    assert np.abs(b_hat - b).max() < 0.3
+    assert np.corrcoef(a_hat, a)[0, 1] > 0.75
+
+
+def _doc(doc_id, data, parent_path=None):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    doc.reference.parent.parent.path = parent_path
+    return doc
+
+
+def test_calibrator_reads_both_sources_and_batches_write_back():
+    """Level-test answers and adaptive sessions are fitted together and written in one batch."""
+    db = MagicMock()
+    rng = np.random.default_rng(1)
+    level, adaptive = [], []
+    for s in range(60):
+        ability = rng.normal()
+        level.append(_doc('p_1', {'problem_id': 'p_1', 'is_correct': bool(ability > -0.5)}, f'users/u/test_sessions/{s}'))
+        adaptive.append(_doc(f's{s}', {'answers': [
+            {'question_id': 'q_1', 'is_correct': bool(ability > 0.5)},
+            {'question_id': 'q_rare', 'is_correct': True} if s < 5 else {'question_id': 'q_1', 'is_correct': None}
+        ]}))
+    db.collection_group.return_value.select.return_value.stream.return_value = level
+    db.collection.return_value.select.return_value.stream.return_value = adaptive
+    db.collection.return_value.document.side_effect = lambda item_id: MagicMock(path=f'items/{item_id}')
+
+    calibrator = IRTCalibrator(db, min_responses=30)
+    params = calibrator.run()
+
+    assert set(params) == {('problems', 'p_1'), ('questions', 'q_1')}
+    assert params[('questions', 'q_1')]['irt_b'] > params[('problems', 'p_1')]['irt_b']
+    assert calibrator.stats['skipped_items'] == 1
+    db.batch.return_value.commit.assert_called_once()
+    assert db.batch.return_value.update.call_count == 2
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from services.adaptive_test_service import AdaptiveTestService
+from services.irt_engine import IRTEngine, ItemBank
+from services.question_index import QuestionIndex, QuestionRecord
+
+
+def _record(question_id, difficulty, b=None):
+    data = {'curriculum_system': 'US', 'grade': '8', 'difficulty': difficulty, 'correct_answer': 'A',
+            'choices': [{'id': 'A', 'text': '1'}]}
+    if b is not None:
+        data.update(irt_a=1.5, irt_b=b)
+    return QuestionRecord(question_id, data)
+
+
+def test_eap_estimate_moves_with_responses_and_narrows():
+    """Correct answers raise the EAP estimate and more answers shrink its standard error."""
+    engine = IRTEngine(grid_points=81, min_items=1, se_target=0.5)
+
+    prior_theta, prior_se = engine.estimate([])
+    up, _ = engine.estimate([(1.0, 0.0, True), (1.0, 1.0, True)])
+    down, _ = engine.estimate([(1.0, 0.0, False), (1.0, -1.0, False)])
+    _, narrow_se = engine.estimate([(1.5, 0.0, True), (1.5, 0.5, False)] * 5)
+
+    assert abs(prior_theta) < 1e-9 and abs(prior_se - 1.0) < 0.02
+    assert down < 0 < up
+    assert narrow_se < prior_se
+
+
+def test_item_bank_selects_most_informative_unanswered_item():
+    """Maximum-information selection prefers items with b near theta and skips answered ones."""
+    records = [_record('q_easy', 'Easy', -2.0), _record('q_mid', 'Medium', 0.1), _record('q_hard', 'Hard', 2.0)]
+    bank = ItemBank(records, np.linspace(-4, 4, 81))
+
+    assert bank.select(0.0, randomesque=1).id == 'q_mid'
+    assert bank.select(0.0, exclude_ids={'q_mid'}, randomesque=1).id in {'q_easy', 'q_hard'}
+    assert bank.select(0.0, exclude_ids={'q_easy', 'q_mid', 'q_hard'}) is None
+
+
+def test_irt_session_selects_from_index_and_stops_on_precision():
+    """IRT sessions select items from the index without lookups and may finish early."""
+    db = MagicMock()
+    with patch.multiple('services.adaptive_test_service.Config', ADAPTIVE_ENGINE='irt', ADAPTIVE_SESSION_MODE='memory'):
+        service = AdaptiveTestService(db)
+    service.question_service.pool = None
+    service.question_service.get_question = MagicMock()
+    service._calculate_results = MagicMock(side_effect=lambda session: {'answers': len(session['answers'])})
+
+    index = QuestionIndex(None)
+    for i, b in enumerate(np.linspace(-2, 2, 30)):
+        index.upsert(f'q_{i}', {'curriculum_system': 'US', 'grade': '8', 'difficulty': 'Medium',
+                                'correct_answer': 'A', 'irt_a': 2.0, 'irt_b': float(b)})
+    index.ready = True
+    service.engine = IRTEngine(index, min_items=2, se_target=0.7)
+    db.collection.return_value.document.return_value.id = 'session_1'
+
+    started = service.start_test({'system': 'US', 'grade': '8'})
+    question, result = started['first_question'], None
+    for _ in range(service.TOTAL_QUESTIONS):
+        result = service.submit_answer('session_1', question['id'], 'A')
+        if result['is_finished']:
+            break
+        question = result['next_question']
+
+    assert result['is_finished'] is True
+    assert 2 <= result['results']['answers'] < service.TOTAL_QUESTIONS
+    service.question_service.get_question.assert_not_called()
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from config import Config
+from services.question_service import QuestionService
+from utils.ai_client import call_ai_with_retry
+from utils.circuit_breaker import CircuitBreaker
+from utils.model_provider import StubModel, create_model
+
+
+def test_stub_replies_are_deterministic_per_prompt_kind():
+    """Same prompt, same reply; JSON mode yields a valid four-choice question."""
+    model = StubModel(latency_ms=0)
+
+    first = model.generate_content("Explain the solution for the following math problem step-by-step.")
+    again = StubModel(latency_ms=0, seed=42).generate_content(
+        "Explain the solution for the following math problem step-by-step.")
+    assert first.text == again.text and 'correct answer' in first.text
+
+    question = json.loads(model.generate_content("Generate a Hard question", generation_config=object()).text)
+    assert [c['id'] for c in question['choices']] == ['A', 'B', 'C', 'D']
+    assert question['correct_answer'] in 'ABCD'
+
+    assert StubModel.classify(f"{Config.ANALYSIS_SYSTEM_PROMPT}\n\n...") == 'weakness'
+    assert StubModel.classify(f"{Config.SOLUTION_SYSTEM_PROMPT}\n\n...") == 'solution'
+    assert StubModel.classify("Analyze the following student math test performance") == 'summary'
+    assert model.snapshot() == {'calls': 2, 'explanation': 1, 'question': 1}
+
+
+def test_stub_injects_faults_at_configured_rates():
+    """Fault rates are honoured and the injected errors are the ones the retry path classifies."""
+    model = StubModel(latency_ms=0, rate_429=0.2, rate_500=0.1, rate_empty=0.1, seed=7)
+    outcomes = {'429': 0, '500': 0, 'empty': 0, 'ok': 0}
+    for _ in range(2000):
+        try:
+            response = model.generate_content("prompt")
+            outcomes['ok' if response.text else 'empty'] += 1
+        except google_exceptions.TooManyRequests:
+            outcomes['429'] += 1
+        except google_exceptions.InternalServerError:
+            outcomes['500'] += 1
+
+    assert 330 < outcomes['429'] < 470
+    assert 140 < outcomes['500'] < 260
+    assert 140 < outcomes['empty'] < 260
+    assert model.snapshot()['fault_429'] == outcomes['429']
+
+    always_empty = StubModel(latency_ms=0, rate_empty=1.0)
+    assert call_ai_with_retry(always_empty, "prompt", max_retries=2,
+                              breaker=CircuitBreaker('stub-test')) is None
+
+
+def test_stub_latency_distributions():
+    fixed = StubModel(latency_dist='fixed', latency_ms=5)
+    assert fixed._sample()[0] == pytest.approx(0.005)
+
+    uniform = StubModel(latency_dist='uniform', latency_ms=5)
+    assert all(0 <= uniform._sample()[0] <= 0.010 for _ in range(100))
+
+    model = StubModel(latency_dist='lognormal', latency_ms=20, latency_sigma=0.1)
+    reply = asyncio.run(model.generate_content_async("prompt"))
+    assert reply.text
+
+    with pytest.raises(ValueError):
+        StubModel(latency_dist='gamma')
+
+
+def test_provider_setting_selects_the_stub():
+    with patch.multiple(Config, AI_PROVIDER='stub', AI_STUB_LATENCY_MS=0.0,
+                        QUESTION_INDEX_MODE='off', QUESTION_POOL_ENABLED=False):
+        assert isinstance(create_model(), StubModel)
+        service = QuestionService(None)
+        assert isinstance(service.model, StubModel)
+
+    with patch.object(Config, 'AI_PROVIDER', 'openai'), pytest.raises(ValueError):
+        create_model()
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.question_index import QuestionIndex
+from services.question_service import QuestionService
+
+
+def _change(kind, doc_id, data=None):
+    document = SimpleNamespace(id=doc_id, to_dict=lambda: data)
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=document)
+
+
+def _question(difficulty='Easy', topic='Algebra'):
+    return {
+        'curriculum_system': 'US', 'grade': '8', 'difficulty': difficulty, 'topic': topic,
+        'text_latex': 'x', 'choices': [{'id': 'A', 'text': '1'}], 'correct_answer': 'A',
+        'explanation': 'long text that is not indexed'
+    }
+
+
+def test_snapshot_changes_keep_cells_current():
+    """Added, modified and removed documents move between cells; legacy ids are skipped."""
+    index = QuestionIndex(MagicMock(), mode='listener')
+    index._on_snapshot(None, [
+        _change('ADDED', 'US_8_Algebra_1', _question()),
+        _change('ADDED', 'US_8_Algebra_2', _question()),
+        _change('ADDED', 'legacy1', _question())
+    ], None)
+
+    assert index.ready
+    assert index.cell_size('US', '8', 'Easy') == 2
+    assert index.cell_size('US', '8', 'Easy', 'Algebra') == 2
+
+    index._on_snapshot(None, [
+        _change('MODIFIED', 'US_8_Algebra_1', _question(difficulty='Hard')),
+        _change('REMOVED', 'US_8_Algebra_2')
+    ], None)
+
+    assert index.cell_size('US', '8', 'Easy') == 0
+    size, question = index.pick('US', '8', 'Hard')
+    assert size == 1 and question['id'] == 'US_8_Algebra_1'
+    assert 'explanation' not in question
+    assert index.pick('US', '8', 'Hard', exclude_ids=['US_8_Algebra_1']) == (1, None)
+
+
+def test_get_question_reads_from_ready_index_without_querying_firestore():
+    """Once the index is ready, selection does not touch the questions collection."""
+    db = MagicMock()
+    service = QuestionService(db)
+    service.pool = None
+    service.index._on_snapshot(None, [_change('ADDED', 'US_8_Algebra_1', _question())], None)
+    db.collection.reset_mock()
+
+    question = service.get_question('US', '8', difficulty='Easy')
+
+    assert question['id'] == 'US_8_Algebra_1'
+    db.collection.assert_not_called()
+
+
+def test_get_question_without_index_samples_by_random_key_with_wraparound():
+    """With no index, selection reads a few docs after a random pivot and wraps to the start."""
+    db = MagicMock()
+    service = QuestionService(db)
+    service.index = None
+    service.pool = None
+
+    query = MagicMock()
+    query.where.return_value = query
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    wrapped_doc = SimpleNamespace(id='US_8_Algebra_1', to_dict=lambda: _question())
+    query.get.side_effect = [[], [wrapped_doc]]
+    db.collection.return_value.where.return_value = query
+
+    question = service.get_question('US', '8', difficulty='Easy', exclude_ids=[])
+
+    assert question['id'] == 'US_8_Algebra_1'
+    operators = [c.args[1] for c in query.where.call_args_list if c.args[0] == 'random_key']
+    assert operators == ['>=', '<']
+    query.limit.assert_called_with(3)
@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from config import Config
+from services.question_pool_service import QuestionPoolService
+from services.question_service import QuestionService
+from utils.single_flight import FirestoreLease
+
+
+def test_low_cell_is_topped_up_to_target_in_background():
+    """A cell seen below the low watermark is generated up to the target, then left alone."""
+    question_service = MagicMock()
+    done = threading.Semaphore(0)
+    question_service.generate_question.side_effect = lambda *args: done.release()
+    pool = QuestionPoolService(question_service, low_watermark=3, target=5, workers=2,
+                               rate_per_minute=60000, max_pending=10)
+    cell = ('US', '8', 'Easy', None)
+
+    assert pool.observe(cell, 1) == 4
+    for _ in range(4):
+        assert done.acquire(timeout=5)
+    pool.executor.shutdown(wait=True)
+
+    question_service.generate_question.assert_called_with('US', '8', None, 'Easy')
+    assert pool.snapshot()['generated'] == 4
+    assert pool.observe(cell, 5) == 0
+
+
+def test_pending_generations_are_bounded():
+    """Scheduling stops at max_pending and the shortfall is counted as dropped."""
+    release = threading.Event()
+    question_service = MagicMock()
+    question_service.generate_question.side_effect = lambda *args: release.wait(5)
+    pool = QuestionPoolService(question_service, low_watermark=10, target=10, workers=1,
+                               rate_per_minute=60000, max_pending=3)
+
+    assert pool.observe(('US', '8', 'Hard', None), 0) == 3
+    assert pool.observe(('US', '9', 'Hard', None), 0) == 0
+    assert pool.snapshot()['dropped'] == 17
+    release.set()
+
+
+def test_truncated_sample_of_a_large_cell_does_not_trigger_replenishment(fake_db):
+    """A cold-cache Firestore sample reads a fixed page and never reports it as the cell's stock."""
+    fake_db.load('questions', {
+        f'US_8_Medium_{n}': {'curriculum_system': 'US', 'grade': '8', 'difficulty': 'Medium',
+                             'text_latex': 'x', 'random_key': n / 500}
+        for n in range(500)
+    })
+    generator = MagicMock()
+    pool = QuestionPoolService(generator, low_watermark=10, target=20, workers=1,
+                               rate_per_minute=60000, max_pending=50)
+    with patch.multiple(Config, QUESTION_INDEX_MODE='off', QUESTION_POOL_ENABLED=False):
+        service = QuestionService(fake_db)
+    service.pool = pool
+    fake_db.reset_counts()
+
+    assert service.get_question('US', '8', difficulty='Medium')['id'].startswith('US_8_Medium_')
+    exclude = [f'US_8_Medium_{n}' for n in range(0, 500, 5)]
+    question = service.get_question('US', '8', difficulty='Medium', exclude_ids=exclude)
+
+    assert question['id'] not in exclude
+    assert fake_db.reads <= 2 * 2 * Config.QUESTION_SAMPLE_SIZE * Config.QUESTION_SAMPLE_ATTEMPTS
+    assert pool.snapshot()['scheduled'] == 0
+    pool.executor.shutdown(wait=True)
+    generator.generate_question.assert_not_called()
+
+
+def test_instances_sharing_a_lease_replenish_a_cell_once(fake_db):
+    """Only the instance holding a cell's lease generates; the others defer, even with a stale count."""
+    release = threading.Event()
+    cell = ('US', '8', 'Easy', None)
+
+    def generate(curriculum_system, grade, topic, difficulty):
+        release.wait(5)
+        fake_db.collection('questions').document().set(
+            {'curriculum_system': curriculum_system, 'grade': grade, 'difficulty': difficulty}
+        )
+
+    def instance(workers):
+        question_service = MagicMock(db=fake_db, index=None)
+        question_service.generate_question.side_effect = generate
+        pool = QuestionPoolService(question_service, low_watermark=3, target=5, workers=workers,
+                                   rate_per_minute=60000, max_pending=10, lease=FirestoreLease(fake_db, ttl=60))
+        return pool, question_service
+
+    first, first_service = instance(workers=2)
+    second, second_service = instance(workers=1)
+
+    first.observe(cell, 0)
+    for _ in range(500):
+        if fake_db.peek('single_flight_leases/question_pool:US:8:Easy:*'):
+            break
+        time.sleep(0.01)
+    second.observe(cell, 0)
+    second.executor.submit(lambda: None).result(timeout=5)
+    assert second.snapshot()['deferred'] == 5
+
+    release.set()
+    first.executor.shutdown(wait=True)
+    assert first.snapshot()['generated'] == 5
+    assert fake_db.peek('single_flight_leases/question_pool:US:8:Easy:*') is None
+
+    # The lease is free now, but the recount shows the cell is already stocked
+    second.observe(cell, 0)
+    second.executor.shutdown(wait=True)
+    assert second.snapshot()['deferred'] == 10
+    second_service.generate_question.assert_not_called()
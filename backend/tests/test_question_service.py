@@ -0,0 +1,130 @@
+import json
+from unittest.mock import MagicMock
+
+from config import Config
+from services.question_service import QuestionService
+from utils.response_cache import ResponseCache
+
+
+def _question(**overrides):
+    data = {
+        'text_latex': 'What is $\\sqrt{4}$?',
+        'choices': [{'id': c, 'text': str(i)} for i, c in enumerate('ABCD')],
+        'correct_answer': 'C',
+        'explanation': 'Because $2^2 = 4$.',
+        'topic': 'Roots',
+        'subtopic': 'Square roots'
+    }
+    data.update(overrides)
+    return data
+
+
+def _service(*replies):
+    service = QuestionService(MagicMock())
+    service.model = MagicMock()
+    service.model.generate_content.side_effect = [MagicMock(text=reply) for reply in replies]
+    return service
+
+
+def test_generate_question_repairs_malformed_json_locally():
+    """Fences, raw LaTeX backslashes and trailing commas are repaired without another model call."""
+    reply = '```json\n{"text_latex": "What is $\\sqrt{4}$?", "choices": [' \
+            '{"id": "A", "text": "1"}, {"id": "B", "text": "2"}, {"id": "C", "text": "3"}, {"id": "D", "text": "4"},],' \
+            ' "correct_answer": "B", "explanation": "x", "topic": "Roots", "subtopic": "Square roots",}\n```'
+    service = _service(reply)
+
+    question = service.generate_question('US', '8', 'Roots', 'Easy')
+
+    assert question['text_latex'] == 'What is $\\sqrt{4}$?'
+    assert service.model.generate_content.call_count == 1
+    assert service.generation_stats['repaired'] == 1
+
+
+def test_generate_question_regenerates_only_missing_fields():
+    """A reply missing the explanation triggers one follow-up call for just that field."""
+    first = _question()
+    del first['explanation']
+    service = _service(json.dumps(first), json.dumps({'explanation': 'Two squared is four.'}))
+
+    question = service.generate_question('US', '8', 'Roots', 'Easy')
+
+    assert question['explanation'] == 'Two squared is four.'
+    assert question['text_latex'] == first['text_latex']
+    follow_up = service.model.generate_content.call_args_list[1]
+    schema = follow_up.kwargs['generation_config'].to_dict()['response_schema']
+    assert list(schema['properties']) == ['explanation']
+    assert service.generation_stats['field_retries'] == 1
+
+
+def _summary_stats(topic_analysis, **overrides):
+    stats = {'grade': '8', 'score': 7, 'total': 10, 'final_difficulty': 'Hard', 'topic_analysis': topic_analysis}
+    stats.update(overrides)
+    return stats
+
+
+def _summary_key(stats):
+    return ResponseCache.make_key(QuestionService._canonical_summary_stats(stats), Config.SUMMARY_PROMPT_VERSION)
+
+
+def test_summary_key_ignores_topic_order():
+    algebra = {'topic': 'Algebra', 'accuracy': 80, 'total': 5}
+    geometry = {'topic': 'Geometry', 'accuracy': 40, 'total': 5}
+
+    assert _summary_key(_summary_stats([algebra, geometry])) == _summary_key(_summary_stats([geometry, algebra]))
+
+
+def test_summary_key_buckets_topic_accuracy():
+    """Accuracies in the same SUMMARY_ACCURACY_BUCKET step share a key; other buckets do not."""
+    def key(accuracy):
+        return _summary_key(_summary_stats([{'topic': 'Algebra', 'accuracy': accuracy, 'total': 5}]))
+
+    assert key(70) == key(80)
+    assert key(70) != key(30)
+
+
+def test_summary_cache_hit_skips_the_model():
+    service = _service('Nice work on algebra.')
+    stats = _summary_stats([{'topic': 'Algebra', 'accuracy': 80, 'total': 5}])
+
+    first = service.generate_performance_summary(stats)
+    second = service.generate_performance_summary(_summary_stats([{'topic': 'Algebra', 'accuracy': 75, 'total': 5}]))
+
+    assert first == second == 'Nice work on algebra.'
+    assert service.model.generate_content.call_count == 1
+
+
+def test_summary_fallback_text_is_not_cached():
+    service = _service()
+    service.model.generate_content.side_effect = [RuntimeError('model down'), MagicMock(text='Nice work on algebra.')]
+    stats = _summary_stats([{'topic': 'Algebra', 'accuracy': 80, 'total': 5}])
+
+    fallback = service.generate_performance_summary(stats)
+    assert service.summary_cache.get(_summary_key(stats)) is None
+
+    assert service.generate_performance_summary(stats) == 'Nice work on algebra.'
+    assert fallback != 'Nice work on algebra.'
+    assert service.model.generate_content.call_count == 2
+
+
+def test_summary_prompt_uses_only_the_keyed_values():
+    """Scores in the same accuracy bucket get separate summaries, and the prompt never shows exact accuracy."""
+    service = _service('Seven right.', 'Eight right.')
+
+    seven = service.generate_performance_summary(
+        _summary_stats([{'topic': 'Algebra', 'accuracy': 72, 'total': 5}], score=7))
+    eight = service.generate_performance_summary(
+        _summary_stats([{'topic': 'Algebra', 'accuracy': 78, 'total': 5}], score=8))
+
+    assert (seven, eight) == ('Seven right.', 'Eight right.')
+    prompts = [c.args[0] for c in service.model.generate_content.call_args_list]
+    assert 'Score: 7/10' in prompts[0] and 'Score: 8/10' in prompts[1]
+    assert "'accuracy': 75" in prompts[0] and '72' not in prompts[0]
+
+
+def test_summary_empty_reply_is_not_cached():
+    service = _service('   ', 'Nice work on algebra.')
+    stats = _summary_stats([{'topic': 'Algebra', 'accuracy': 80, 'total': 5}])
+
+    assert service.generate_performance_summary(stats).strip()
+    assert service.summary_cache.get(_summary_key(stats)) is None
+    assert service.generate_performance_summary(stats) == 'Nice work on algebra.'
@@ -0,0 +1,67 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from google.api_core import exceptions as google_exceptions
+
+from utils import ai_client
+from utils.ai_client import call_ai_with_retry
+from utils.circuit_breaker import CircuitBreaker
+from utils.retry import Deadline, is_retryable
+
+
+def test_is_retryable_classifies_by_exception_type():
+    """Transient server errors retry; client errors do not."""
+    assert is_retryable(google_exceptions.ResourceExhausted('quota'))
+    assert is_retryable(google_exceptions.ServiceUnavailable('down'))
+    assert not is_retryable(google_exceptions.InvalidArgument('bad prompt'))
+    assert not is_retryable(google_exceptions.PermissionDenied('nope'))
+
+
+def test_call_ai_with_retry_stops_on_client_error(monkeypatch):
+    """A non-retryable error makes exactly one call and never sleeps."""
+    monkeypatch.setattr(ai_client.time, 'sleep', lambda s: (_ for _ in ()).throw(AssertionError))
+    model = MagicMock()
+    model.generate_content.side_effect = google_exceptions.InvalidArgument('bad prompt')
+
+    assert call_ai_with_retry(model, 'prompt', breaker=CircuitBreaker('test')) is None
+    assert model.generate_content.call_count == 1
+
+
+def test_call_ai_with_retry_retries_transient_error(monkeypatch):
+    """A transient error is retried with jittered backoff and the next success is returned."""
+    sleeps = []
+    monkeypatch.setattr(ai_client.time, 'sleep', sleeps.append)
+    model = MagicMock()
+    ok = MagicMock(text='ok')
+    model.generate_content.side_effect = [google_exceptions.ServiceUnavailable('down'), ok]
+
+    assert call_ai_with_retry(model, 'prompt', breaker=CircuitBreaker('test')) is ok
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 2.0
+
+
+def test_call_ai_with_retry_gives_up_when_deadline_cannot_fit_another_attempt(monkeypatch):
+    """With too little budget left for backoff plus another call, retrying stops early."""
+    monkeypatch.setattr(ai_client.time, 'sleep', lambda s: (_ for _ in ()).throw(AssertionError))
+    model = MagicMock()
+    model.generate_content.side_effect = google_exceptions.ServiceUnavailable('down')
+
+    started = time.monotonic()
+    assert call_ai_with_retry(model, 'prompt', deadline=Deadline(1.0), breaker=CircuitBreaker('test')) is None
+    assert model.generate_content.call_count == 1
+    assert time.monotonic() - started < 1.0
+
+
+def test_call_ai_with_retry_caps_a_hanging_attempt_at_the_deadline(monkeypatch):
+    """A blocking generate_content call is abandoned once the request budget is spent."""
+    monkeypatch.setattr(ai_client.time, 'sleep', lambda s: None)
+    release = threading.Event()
+    model = MagicMock()
+    model.generate_content.side_effect = lambda *args, **kwargs: release.wait(5)
+
+    started = time.monotonic()
+    try:
+        assert call_ai_with_retry(model, 'prompt', deadline=Deadline(0.3), breaker=CircuitBreaker('test')) is None
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
@@ -0,0 +1,94 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from app import create_app
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Concurrent callers with the same key run the function once and share its result."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'explanation'
+
+    results = []
+
+    def worker():
+        results.append(flight.do('solution:p1:v1', generate))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    assert started.wait(5)
+
+    followers = [threading.Thread(target=worker) for _ in range(4)]
+    for t in followers:
+        t.start()
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1]) == [('explanation', False)] * 4 + [('explanation', True)]
+
+
+class _HeldLease:
+    """A lease that is always held by another instance."""
+    ttl = 5
+
+    def acquire(self, key):
+        return None
+
+    def release(self, key, token):
+        pass
+
+
+def test_lease_holder_elsewhere_shares_stored_result():
+    """When another instance holds the lease, the stored result is fetched instead of regenerated."""
+    flight = SingleFlight(lease=_HeldLease(), poll_interval=0.01)
+
+    value, executed = flight.do('solution:p1:v1', lambda: 'regenerated', fetch=lambda: 'stored')
+
+    assert (value, executed) == ('stored', False)
+
+
+class _RecordingLease:
+    """An always-free lease that records what another instance's fetch would see at release time."""
+    ttl = 5
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.seen_at_release = []
+
+    def acquire(self, key):
+        return 'token'
+
+    def release(self, key, token):
+        self.seen_at_release.append(self.fetch())
+
+
+def test_generated_explanation_is_stored_before_the_lease_is_released(fake_db):
+    """A follower polling after the leader releases the lease finds the explanation, even before the submit commits."""
+    fake_db.load('problems', {'p1': {
+        'text_latex': 'x + 1 = 2', 'correct_answer': 'A', 'category': 'Algebra', 'difficulty': 'Easy'
+    }})
+    lease = _RecordingLease(lambda: (fake_db.peek('problems/p1') or {}).get('explanation'))
+
+    with patch('app.initialize_firebase', return_value=fake_db), \
+         patch('app.initialize_ai_client', return_value=MagicMock()), \
+         patch('config.Config.QUESTION_POOL_ENABLED', False), \
+         patch('routes.api_routes.build_single_flight', return_value=SingleFlight(lease=lease)), \
+         patch('services.ai_service.AIService.generate_solution', return_value='Subtract 1 from both sides.'):
+        client = create_app().test_client()
+        response = client.post('/submit_and_analyze', json={
+            'user_id': 'guest-1', 'is_guest': True, 'answers': {'p1': 'B'}
+        })
+
+    assert response.status_code == 200
+    assert lease.seen_at_release == ['Subtract 1 from both sides.']
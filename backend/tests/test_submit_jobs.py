@@ -0,0 +1,48 @@
+import time
+
+
+def test_submit_and_analyze_job_mode(client):
+    """Job mode returns graded results immediately and the job can be polled to completion."""
+    response = client.post('/submit_and_analyze?mode=job', json={
+        'user_id': 'guest-1',
+        'is_guest': True,
+        'answers': {'p1': 'A'}
+    })
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['status'] == 'running'
+    assert data['test_results'][0]['id'] == 'p1'
+
+    job = None
+    for _ in range(50):
+        job = client.get(f"/submit_and_analyze/jobs/{data['job_id']}").get_json()
+        if job['status'] != 'running':
+            break
+        time.sleep(0.1)
+
+    assert job['status'] == 'completed'
+    assert job['ai_analysis_report'] is not None
+
+
+def test_unknown_job_returns_404(client):
+    """Polling an unknown job id returns 404."""
+    response = client.get('/submit_and_analyze/jobs/does-not-exist?user_id=someone')
+    assert response.status_code == 404
+
+
+def test_submit_and_analyze_stream_event_order(client):
+    """The SSE variant sends graded results first and finishes with a done event."""
+    response = client.post('/submit_and_analyze/stream', json={
+        'user_id': 'guest-1',
+        'is_guest': True,
+        'answers': {'p1': 'A'}
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    body = response.get_data(as_text=True)
+    events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+    assert events[0] == 'graded'
+    assert 'explanation' in events
+    assert events.index('analysis') < events.index('done')
+    assert events[-1] == 'done'
@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock
+
+from google.cloud import firestore
+
+from services.user_service import UserService
+from utils.unit_of_work import UnitOfWork
+
+
+def _ref(path):
+    ref = MagicMock()
+    ref.path = path
+    return ref
+
+
+def test_writes_to_same_document_are_coalesced_into_one_batch():
+    """Session create + complete collapse into a single set committed in one batch."""
+    db = MagicMock()
+    uow = UnitOfWork(db)
+    session = _ref('users/u1/test_sessions/s1')
+    answer = _ref('users/u1/test_sessions/s1/answers/p1')
+
+    uow.set(session, {'is_completed': False, 'score': 0})
+    uow.set(answer, {'is_correct': True})
+    uow.update(session, {'is_completed': True, 'score': 100})
+    stats = uow.commit()
+
+    batch = db.batch.return_value
+    assert batch.commit.call_count == 1
+    batch.set.assert_any_call(session, {'is_completed': True, 'score': 100}, merge=False)
+    assert batch.update.call_count == 0
+    assert stats['staged'] == 3
+    assert stats['coalesced'] == 1
+    assert stats['writes'] == 2
+
+
+def test_writes_after_commit_are_applied_immediately():
+    """Late writes (e.g. explanations that missed the deadline) bypass the batch."""
+    uow = UnitOfWork(MagicMock())
+    uow.commit()
+
+    problem = _ref('problems/p1')
+    uow.update(problem, {'explanation': 'late'})
+
+    problem.update.assert_called_once_with({'explanation': 'late'})
+    assert uow.summary()['late_writes'] == 1
+
+
+def test_transforms_on_the_same_field_are_not_coalesced(fake_db):
+    """Two Increment(1) updates on one document both reach Firestore."""
+    ref = fake_db.collection('users').document('u1')
+    ref.set({'stats': {'total_tests': 0}, 'count': 0})
+    uow = UnitOfWork(fake_db)
+
+    uow.update(ref, {'count': firestore.Increment(1)})
+    uow.update(ref, {'count': firestore.Increment(1), 'name': 'a'})
+    uow.update(ref, {'name': 'b'})
+    stats = uow.commit()
+
+    assert fake_db.peek('users/u1')['count'] == 2
+    assert fake_db.peek('users/u1')['name'] == 'b'
+    assert stats['coalesced'] == 1 and stats['writes'] == 2
+
+
+def test_user_stats_read_and_write_in_one_transaction(fake_db):
+    """update_user_stats commits its read-modify-write atomically instead of staging it."""
+    fake_db.collection('users').document('u1').set({'stats': {'total_tests': 2, 'total_problems_solved': 4,
+                                                             'total_correct': 3}})
+    uow = UnitOfWork(fake_db)
+    results = [{'is_correct': True, 'category': 'Algebra', 'difficulty': 'Easy'},
+               {'is_correct': False, 'category': 'Geometry', 'difficulty': 'Hard'}]
+
+    assert UserService(fake_db).update_user_stats('u1', results, 50.0, uow=uow)
+
+    stats = fake_db.peek('users/u1')['stats']
+    assert (stats['total_tests'], stats['total_problems_solved'], stats['total_correct']) == (3, 6, 4)
+    assert uow.stats['staged'] == 0
+    assert fake_db.ops['transaction_commit'] == 1
@@ -1,74 +1,366 @@
 from google.cloud import aiplatform
-from vertexai.generative_models import GenerativeModel
 import vertexai
 from config import Config
 from utils.logger import setup_logger
+from utils.model_provider import create_model
+from utils.circuit_breaker import CircuitOpenError, get_breaker
+from utils.hedging import get_call_site, hedged_call, hedged_call_async
+from utils.retry import EmptyResponseError, RetryPolicy, is_retryable
+import asyncio
+import concurrent.futures
+import threading
 import time
+import weakref
 
 logger = setup_logger(__name__)
 
 def initialize_ai_client():
     """Vertex AI 클라이언트 초기화 및 반환"""
     try:
-        # Vertex AI 초기화
-        vertexai.init(
-            project=Config.PROJECT_ID,
-            location=Config.AI_LOCATION
-        )
+        # Vertex AI 초기화 (stub 공급자는 네트워크/인증 불필요)
+        if Config.AI_PROVIDER != 'stub':
+            vertexai.init(
+                project=Config.PROJECT_ID,
+                location=Config.AI_LOCATION
+            )
 
         # 모델 초기화
-        model = GenerativeModel(Config.MODEL_FLASH)
+        model = create_model(Config.MODEL_FLASH)
 
-        logger.info(f"AI 클라이언트 초기화 성공 (모델: {Config.MODEL_FLASH})")
+        logger.info(f"AI 클라이언트 초기화 성공 (공급자: {Config.AI_PROVIDER}, 모델: {Config.MODEL_FLASH})")
         return model
 
     except Exception as e:
         logger.error(f"AI 클라이언트 초기화 실패: {e}", exc_info=True)
         return None
 
-def call_ai_with_retry(model, contents, max_retries=3):
+def _is_failure(error):
+    """서킷 브레이커 기준 실패 여부 (클라이언트 오류/빈 응답은 서비스 상태와 무관)"""
+    if isinstance(error, EmptyResponseError):
+        return None
+    return True if is_retryable(error) else None
+
+
+def guarded_generate(model, contents, breaker=None, **kwargs):
+    """
+    서킷 브레이커를 거쳐 generate_content 1회 호출
+
+    회로가 열려 있으면 모델을 호출하지 않고 CircuitOpenError 발생
+
+    Args:
+        model: Vertex AI 모델
+        contents: 프롬프트 내용
+        breaker: CircuitBreaker (기본값: 공유 'vertex' 브레이커)
+        **kwargs: generate_content 추가 인자
+    """
+    breaker = breaker or get_breaker()
+    permit = breaker.allow()
+    if not permit:
+        raise CircuitOpenError(f"circuit '{breaker.name}' is open")
+
+    started = time.monotonic()
+    try:
+        response = model.generate_content(contents, **kwargs)
+    except Exception as e:
+        breaker.record(time.monotonic() - started, _is_failure(e), permit)
+        raise
+    breaker.record(time.monotonic() - started, False, permit)
+    return response
+
+
+async def guarded_generate_async(model, contents, breaker=None, timeout=None, **kwargs):
+    """guarded_generate의 비동기 버전 (timeout 초과도 실패로 기록, 취소는 기록하지 않음)"""
+    breaker = breaker or get_breaker()
+    permit = breaker.allow()
+    if not permit:
+        raise CircuitOpenError(f"circuit '{breaker.name}' is open")
+
+    started = time.monotonic()
+    try:
+        response = await asyncio.wait_for(model.generate_content_async(contents, **kwargs), timeout=timeout)
+    except asyncio.CancelledError:
+        breaker.release(permit)
+        raise
+    except Exception as e:
+        breaker.record(time.monotonic() - started, _is_failure(e), permit)
+        raise
+    breaker.record(time.monotonic() - started, False, permit)
+    return response
+
+
+_sync_executor = None
+_sync_executor_lock = threading.Lock()
+
+
+def _get_sync_executor():
+    """동기 AI 호출을 시간 제한과 함께 실행하는 스레드 풀 (최초 호출 시 생성)"""
+    global _sync_executor
+    with _sync_executor_lock:
+        if _sync_executor is None:
+            _sync_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=Config.AI_SYNC_CALL_WORKERS, thread_name_prefix='ai-sync-call'
+            )
+        return _sync_executor
+
+
+def call_ai_with_retry(model, contents, max_retries=3, deadline=None, breaker=None, call_site=None,
+                       hedge=None, **kwargs):
     """
     AI API 호출 with 재시도 로직
 
+    - 예외 타입으로 재시도 여부 판단 (utils.retry.is_retryable)
+    - 지터가 적용된 지수 백오프
+    - deadline이 주어지면 다음 시도가 마감 전에 끝날 수 없을 때 조기 포기
+    - 시도별 타임아웃은 AI_CALL_TIMEOUT과 deadline의 남은 시간 중 작은 값 (넘으면 재시도 대상 실패)
+    - 공유 서킷 브레이커가 열려 있으면 재시도 없이 즉시 None 반환
+    - call_site가 주어지면 지연 시간을 기록하고, 헤지 모드에서는 백분위 임계값까지
+      응답이 없을 때 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+
     Args:
         model: Vertex AI 모델
         contents: 프롬프트 내용 (str 또는 list)
-        max_retries: 최대 재시도 횟수
+        max_retries: 최대 시도 횟수
+        deadline: utils.retry.Deadline (요청의 남은 시간 예산), None이면 제한 없음
+        breaker: CircuitBreaker (기본값: 공유 'vertex' 브레이커)
+        call_site: 지연/헤지 통계를 모을 호출 지점 이름 (예: 'generate_solution')
+        hedge: 헤지 사용 여부 (None이면 Config.AI_HEDGE_ENABLED, call_site가 있어야 동작)
+        **kwargs: generate_content 추가 인자 (generation_config 등)
 
     Returns:
         AI 응답 또는 None
     """
+    policy = RetryPolicy(max_attempts=max_retries, expected_attempt_time=Config.AI_EXPECTED_CALL_TIME)
+    site = get_call_site(call_site) if call_site else None
+    use_hedge = site is not None and (Config.AI_HEDGE_ENABLED if hedge is None else hedge)
+    durations = []
     last_error = None
 
+    def _attempt(attempt_ends_at):
+        # 동기 SDK 호출은 취소할 수 없으므로 별도 스레드에서 실행하고 마감까지만 대기
+        # (시간 초과 시 호출은 백그라운드에서 끝나고 결과는 버림)
+        attempt_started = time.monotonic()
+        future = _get_sync_executor().submit(guarded_generate, model, contents, breaker=breaker, **kwargs)
+        try:
+            response = future.result(timeout=max(0.0, attempt_ends_at - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"AI call exceeded {attempt_ends_at - attempt_started:.1f}s")
+        if site is not None:
+            site.record_latency(time.monotonic() - attempt_started)
+        return response
+
     for attempt in range(1, max_retries + 1):
+        attempt_timeout = deadline.cap(Config.AI_CALL_TIMEOUT) if deadline is not None else Config.AI_CALL_TIMEOUT
+        if attempt_timeout <= 0:
+            logger.warning(f"AI API 호출 중단 - 요청 마감 시간 초과 (시도 {attempt}/{max_retries})")
+            break
+
+        started = time.monotonic()
+        attempt_ends_at = started + attempt_timeout
         try:
             logger.info(f"AI API 호출 시도 {attempt}/{max_retries}")
 
-            response = model.generate_content(contents)
+            if use_hedge:
+                response = hedged_call(lambda: _attempt(attempt_ends_at), site, max_delay=attempt_timeout)
+            else:
+                response = _attempt(attempt_ends_at)
 
             if response and hasattr(response, 'text') and response.text:
                 logger.info(f"AI API 호출 성공 (시도 {attempt}/{max_retries})")
                 return response
-            else:
-                logger.warning(f"AI 응답이 비어있음 (시도 {attempt}/{max_retries})")
-                last_error = Exception("Empty AI response")
+
+            logger.warning(f"AI 응답이 비어있음 (시도 {attempt}/{max_retries})")
+            last_error = EmptyResponseError("Empty AI response")
+
+        except CircuitOpenError as e:
+            logger.warning(f"AI API 호출 생략 - {e}")
+            return None
 
         except Exception as e:
             logger.error(f"AI API 호출 실패 (시도 {attempt}/{max_retries}): {e}", exc_info=True)
+            last_error = e
+
+        durations.append(time.monotonic() - started)
+
+        wait_time = policy.next_delay(last_error, attempt, deadline, durations)
+        if wait_time is None:
+            if not is_retryable(last_error):
+                logger.error(f"재시도 불가 오류 ({type(last_error).__name__}) - 재시도 중단")
+            elif attempt < max_retries:
+                logger.warning(f"남은 시간 부족 - 재시도 중단 (남은 시간: {deadline.remaining():.1f}초)")
+            break
+
+        logger.info(f"⏳ {wait_time:.1f}초 후 재시도...")
+        time.sleep(wait_time)
+
+    logger.error(f"AI API 호출 최종 실패. 마지막 에러: {last_error}")
+    return None
+
+
+# ==================== 비동기 (asyncio) 클라이언트 ====================
+
+# 이벤트 루프별 동시 요청 제한 세마포어
+# (운영 경로는 모두 공유 AI 루프에서 실행되므로 프로세스 전역 제한으로 동작)
+_semaphores = weakref.WeakKeyDictionary()
+
+_ai_loop = None
+_ai_loop_lock = threading.Lock()
+
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(Config.AI_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+def get_ai_loop():
+    """AI 비동기 호출 전용 백그라운드 이벤트 루프 (최초 호출 시 시작)"""
+    global _ai_loop
+    with _ai_loop_lock:
+        if _ai_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='ai-event-loop', daemon=True)
+            thread.start()
+            _ai_loop = loop
+            logger.info(f"AI 이벤트 루프 시작 (최대 동시 요청: {Config.AI_MAX_CONCURRENCY})")
+        return _ai_loop
+
 
-            # 클라이언트 에러는 재시도하지 않음
-            if "400" in str(e) or "invalid" in str(e).lower():
-                logger.error("클라이언트 에러 - 재시도 중단")
-                return None
+def run_ai_coroutine(coro, timeout=None):
+    """
+    동기 코드(Flask 핸들러)에서 코루틴을 공유 AI 루프에 실행하고 결과 대기
+
+    timeout이 지나면 코루틴을 취소하고 concurrent.futures.TimeoutError를 발생시킴
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_ai_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+async def call_ai_async(model, contents, max_retries=3, deadline=None, breaker=None, call_site=None,
+                        hedge=None, **kwargs):
+    """
+    AI API 비동기 호출 with 재시도 로직
+
+    - 전역 세마포어로 동시 요청 수 제한 (AI_MAX_CONCURRENCY)
+    - 대기(backoff)는 asyncio.sleep으로 스레드를 점유하지 않음
+    - 시도별 타임아웃은 AI_CALL_TIMEOUT과 deadline의 남은 시간 중 작은 값
+    - 재시도 판단은 call_ai_with_retry와 같은 RetryPolicy 사용
+    - 공유 서킷 브레이커가 열려 있으면 재시도 없이 즉시 None 반환
+    - 취소(CancelledError) 전파
+
+    Args:
+        model: Vertex AI 모델
+        contents: 프롬프트 내용 (str 또는 list)
+        max_retries: 최대 시도 횟수
+        deadline: utils.retry.Deadline, None이면 제한 없음
+        breaker: CircuitBreaker (기본값: 공유 'vertex' 브레이커)
+        call_site: 지연/헤지 통계를 모을 호출 지점 이름
+        hedge: 헤지 사용 여부 (None이면 Config.AI_HEDGE_ENABLED, 진 쪽 호출은 취소)
+        **kwargs: generate_content_async 추가 인자 (generation_config 등)
+
+    Returns:
+        AI 응답 또는 None
+    """
+    semaphore = _get_semaphore()
+    policy = RetryPolicy(max_attempts=max_retries, expected_attempt_time=Config.AI_EXPECTED_CALL_TIME)
+    site = get_call_site(call_site) if call_site else None
+    use_hedge = site is not None and (Config.AI_HEDGE_ENABLED if hedge is None else hedge)
+    durations = []
+    last_error = None
+
+    async def _attempt(timeout):
+        # 세마포어는 실제 호출 동안만 점유 (backoff 대기 중에는 반환)
+        async with semaphore:
+            attempt_started = time.monotonic()
+            response = await guarded_generate_async(
+                model, contents, breaker=breaker, timeout=timeout, **kwargs
+            )
+        if site is not None:
+            site.record_latency(time.monotonic() - attempt_started)
+        return response
+
+    for attempt in range(1, max_retries + 1):
+        attempt_timeout = deadline.cap(Config.AI_CALL_TIMEOUT) if deadline is not None else Config.AI_CALL_TIMEOUT
+        if attempt_timeout is not None and attempt_timeout <= 0:
+            logger.warning(f"AI API 비동기 호출 중단 - 요청 마감 시간 초과 (시도 {attempt}/{max_retries})")
+            break
+
+        started = time.monotonic()
+        try:
+            if use_hedge:
+                response = await hedged_call_async(
+                    lambda: _attempt(attempt_timeout), site, max_delay=attempt_timeout
+                )
+            else:
+                response = await _attempt(attempt_timeout)
 
+            if response and hasattr(response, 'text') and response.text:
+                logger.info(f"AI API 비동기 호출 성공 (시도 {attempt}/{max_retries})")
+                return response
+
+            logger.warning(f"AI 응답이 비어있음 (시도 {attempt}/{max_retries})")
+            last_error = EmptyResponseError("Empty AI response")
+
+        except asyncio.CancelledError:
+            logger.info("AI API 비동기 호출 취소됨")
+            raise
+
+        except CircuitOpenError as e:
+            logger.warning(f"AI API 비동기 호출 생략 - {e}")
+            return None
+
+        except Exception as e:
+            logger.error(f"AI API 비동기 호출 실패 (시도 {attempt}/{max_retries}): {e}")
             last_error = e
 
-        # 마지막 시도가 아니면 재시도 전 대기
-        if attempt < max_retries:
-            wait_time = min(2 ** attempt, 10)  # 지수 백오프 (최대 10초)
-            logger.info(f"⏳ {wait_time}초 후 재시도...")
-            time.sleep(wait_time)
+        durations.append(time.monotonic() - started)
+
+        wait_time = policy.next_delay(last_error, attempt, deadline, durations)
+        if wait_time is None:
+            if not is_retryable(last_error):
+                logger.error(f"재시도 불가 오류 ({type(last_error).__name__}) - 재시도 중단")
+            break
+
+        await asyncio.sleep(wait_time)
 
-    # 모든 재시도 실패
-    logger.error(f"AI API 호출 최종 실패 - 모든 재시도 소진. 마지막 에러: {last_error}")
+    logger.error(f"AI API 비동기 호출 최종 실패. 마지막 에러: {last_error}")
     return None
+
+
+async def fan_out(coros, timeout=None):
+    """
+    여러 AI 코루틴을 동시에 실행 (마감 시간 적용)
+
+    Args:
+        coros: {key: coroutine}
+        timeout: 마감 시간 (초), 지나면 남은 작업은 취소
+
+    Returns:
+        tuple: ({key: 결과}, [마감 시간 내 끝나지 않은 key])
+    """
+    if not coros:
+        return {}, []
+
+    tasks = {asyncio.ensure_future(coro): key for key, coro in coros.items()}
+    done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
+
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for task in done:
+        key = tasks[task]
+        try:
+            results[key] = task.result()
+        except Exception as e:
+            logger.error(f"AI 비동기 작업 실패 - {key}: {e}")
+            results[key] = None
+
+    return results, [tasks[task] for task in pending]
@@ -0,0 +1,222 @@
+from collections import deque
+from config import Config
+from utils.logger import setup_logger
+import threading
+import time
+
+logger = setup_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 호출을 즉시 거부함"""
+
+
+class FallbackText(str):
+    """AI 대신 반환된 대체 문구 (캐싱하지 않음)"""
+
+
+class _Permit:
+    """allow()가 내준 호출 허가 (허가 시점의 상태 세대와 시험 호출 여부)"""
+
+    __slots__ = ('generation', 'probe')
+
+    def __init__(self, generation, probe):
+        self.generation = generation
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """
+    롤링 윈도우 기반 서킷 브레이커
+
+    - closed: 정상 호출, 최근 window초 동안의 오류율/지연 비율을 기록
+    - open: 오류율 또는 느린 호출 비율이 임계값을 넘으면 열림, 호출 즉시 거부
+    - half_open: open_duration초 후 소수의 시험 호출만 허용,
+                 성공하면 closed, 실패하면 다시 open
+                 (시험 호출 자신의 결과만 반영, 클라이언트 오류 등 중립 결과는 슬롯만 반환)
+
+    allow()가 돌려준 허가를 record()/release()에 넘겨야 함
+    상태가 바뀌기 전에 허가된 호출의 결과는 무시
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=60.0, min_calls=10, error_rate=0.5, slow_call_seconds=20.0,
+                 slow_call_rate=0.5, open_duration=30.0, half_open_max_calls=1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._half_open_calls = 0
+        self._generation = 0  # 상태 전환마다 증가
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._lock = threading.Lock()
+        self.transitions = deque(maxlen=20)
+        self.stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0}
+
+    def allow(self):
+        """
+        호출 허가 (거부되면 False)
+
+        half_open이면 시험 호출 슬롯을 점유하고, 반환된 허가를 record()/release()에 넘겨야 슬롯이 반환됨
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_duration:
+                    self.stats['rejected'] += 1
+                    return False
+                self._transition(self.HALF_OPEN, 'open 유지 시간 경과')
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.stats['rejected'] += 1
+                    return False
+                self._half_open_calls += 1
+                return _Permit(self._generation, probe=True)
+
+            return _Permit(self._generation, probe=False)
+
+    def _is_current(self, permit):
+        return permit is not None and permit.generation == self._generation
+
+    def record(self, duration, failed, permit=None):
+        """
+        호출 결과 기록
+
+        Args:
+            duration: 소요 시간 (초)
+            failed: True=서버/네트워크 오류, False=성공, None=서비스 상태와 무관한 결과 (클라이언트 오류 등)
+            permit: 이 호출에 대해 allow()가 반환한 허가
+                    (없으면 closed 상태의 롤링 윈도우에만 반영, half_open 전환에는 쓰지 않음)
+        """
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            self.stats['calls'] += 1
+            if failed:
+                self.stats['failures'] += 1
+            if slow:
+                self.stats['slow_calls'] += 1
+
+            if self.state == self.HALF_OPEN:
+                # 현재 시험 호출의 결과만 상태를 바꿈 (이전 상태에서 시작된 호출은 무시)
+                if not self._is_current(permit) or not permit.probe:
+                    return
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+                if failed or slow:
+                    self._transition(self.OPEN, f"시험 호출 실패 (소요 {duration:.1f}초)")
+                elif failed is False:
+                    self._transition(self.CLOSED, '시험 호출 성공')
+                return
+
+            if self.state == self.OPEN:
+                # 열리기 전에 시작된 호출의 결과는 무시
+                return
+
+            if permit is not None and not self._is_current(permit):
+                # 마지막 상태 전환(예: 다시 closed) 이전에 시작된 호출은 새 윈도우에 넣지 않음
+                return
+
+            now = time.monotonic()
+            self._calls.append((now, bool(failed), slow))
+            self._trim(now)
+            self._evaluate()
+
+    def release(self, permit=None):
+        """결과 없이 끝난 호출 (취소 등) - 현재 half_open 시험 호출이면 슬롯만 반환"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._is_current(permit) and permit.probe:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return failures / total, slow / total
+
+    def _evaluate(self):
+        if len(self._calls) < self.min_calls:
+            return
+        error_rate, slow_rate = self._rates()
+        if error_rate >= self.error_rate:
+            self._transition(self.OPEN, f"오류율 {error_rate:.0%}")
+        elif slow_rate >= self.slow_call_rate:
+            self._transition(self.OPEN, f"느린 호출 비율 {slow_rate:.0%}")
+
+    def _transition(self, state, reason):
+        previous = self.state
+        self.state = state
+        self._generation += 1
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            self._half_open_calls = 0
+        elif state == self.CLOSED:
+            self._calls.clear()
+            self._half_open_calls = 0
+
+        self.transitions.append({
+            'from': previous,
+            'to': state,
+            'reason': reason,
+            'at': time.time()
+        })
+        log = logger.warning if state == self.OPEN else logger.info
+        log(f"[circuit:{self.name}] {previous} → {state} ({reason})")
+
+    def snapshot(self):
+        """계측용 상태 스냅샷"""
+        with self._lock:
+            self._trim(time.monotonic())
+            error_rate, slow_rate = self._rates()
+            return {
+                'name': self.name,
+                'state': self.state,
+                'window_calls': len(self._calls),
+                'error_rate': error_rate,
+                'slow_call_rate': slow_rate,
+                'stats': dict(self.stats),
+                'transitions': list(self.transitions)
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name='vertex'):
+    """이름별 공유 서킷 브레이커 (최초 호출 시 Config 값으로 생성)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                window=Config.CIRCUIT_WINDOW,
+                min_calls=Config.CIRCUIT_MIN_CALLS,
+                error_rate=Config.CIRCUIT_ERROR_RATE,
+                slow_call_seconds=Config.CIRCUIT_SLOW_CALL_SECONDS,
+                slow_call_rate=Config.CIRCUIT_SLOW_CALL_RATE,
+                open_duration=Config.CIRCUIT_OPEN_DURATION
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_snapshots():
+    """등록된 모든 서킷 브레이커 상태"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,494 @@
+"""
+Firestore 읽기/쓰기 계측
+
+Firestore 클라이언트를 감싸서 모든 읽기·쓰기의 문서 수, 바이트(추정), 지연 시간을
+- 호출한 서비스 메서드별 (예: AdaptiveTestService._load_questions)
+- HTTP 요청별 (middleware.firestore_metrics_middleware 가 요청 시작/종료 처리)
+로 집계합니다. 한 요청에서 같은 컬렉션에 단건 get이 반복되면 N+1 의심 경고를 남깁니다.
+
+과금 기준에 맞춰 결과가 없는 쿼리와 집계 쿼리(count)는 읽기 1회로 계산합니다.
+요청 컨텍스트는 contextvars로 전달되므로 백그라운드 스레드(선행 조회, write-behind,
+스냅샷 리스너)의 작업은 메서드별 집계에만 포함됩니다.
+"""
+
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+# 호출 위치 판별 시 건너뛰는 공용 헬퍼 (실제 호출한 서비스 메서드로 집계)
+_TRANSPARENT_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(_PROJECT_ROOT, 'utils', 'unit_of_work.py'),
+}
+_DOCUMENT_ID = re.compile(r'/[^/]+(/|$)')
+
+_current_request = contextvars.ContextVar('firestore_request', default=None)
+
+
+def estimate_size(value):
+    """Firestore 저장 크기 규칙에 따른 값 크기 추정 (바이트)"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k).encode('utf-8')) + 1 + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return 8
+
+
+def _snapshot_size(snapshot):
+    if not getattr(snapshot, 'exists', True):
+        return 0
+    return estimate_size(snapshot.to_dict() or {}) + 32
+
+
+def collection_pattern(document_path):
+    """문서 경로의 컬렉션 패턴 (users/u1/test_sessions/s1 → users/*/test_sessions)"""
+    parent = document_path.rsplit('/', 1)[0]
+    return _DOCUMENT_ID.sub(lambda m: '/*' + m.group(1), parent)
+
+
+_site_names = {}
+
+
+def _call_site():
+    """Firestore를 호출한 프로젝트 코드 위치 (모듈.클래스.메서드)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if (filename.startswith(_PROJECT_ROOT) and filename not in _TRANSPARENT_FILES
+                and 'site-packages' not in filename):
+            name = _site_names.get(code)
+            if name is None:
+                qualname = getattr(code, 'co_qualname', code.co_name)
+                module = os.path.splitext(os.path.basename(filename))[0]
+                name = qualname if '.' in qualname and '<locals>' not in qualname else f"{module}.{qualname}"
+                _site_names[code] = name
+            return name
+        frame = frame.f_back
+    return 'external'
+
+
+class RequestStats:
+    """HTTP 요청 1건의 Firestore 사용량"""
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.elapsed = 0.0
+        self.single_gets = Counter()                # {컬렉션 패턴: 단건 get 횟수}
+        self.single_get_sites = defaultdict(Counter)  # {컬렉션 패턴: {호출 위치: 횟수}}
+        self.sites = Counter()                      # {호출 위치: 작업 수}
+
+    def n_plus_one(self, threshold=None):
+        """단건 get이 threshold회 이상 반복된 컬렉션 {패턴: 횟수}"""
+        threshold = threshold or Config.FIRESTORE_N_PLUS_ONE_THRESHOLD
+        return {collection: n for collection, n in self.single_gets.items() if n >= threshold}
+
+    def headers(self):
+        headers = {
+            'X-Firestore-Reads': str(self.reads),
+            'X-Firestore-Writes': str(self.writes),
+            'X-Firestore-Bytes-Read': str(self.bytes_read),
+            'X-Firestore-Bytes-Written': str(self.bytes_written),
+            'X-Firestore-Time-Ms': f"{self.elapsed * 1000:.1f}",
+        }
+        suspects = self.n_plus_one()
+        if suspects:
+            headers['X-Firestore-N-Plus-One'] = ', '.join(f"{c}={n}" for c, n in sorted(suspects.items()))
+        return headers
+
+
+def _totals():
+    return {'calls': 0, 'reads': 0, 'writes': 0, 'bytes_read': 0, 'bytes_written': 0, 'time_ms': 0.0}
+
+
+class FirestoreMetrics:
+    """서비스 메서드별 / 엔드포인트별 Firestore 사용량 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = defaultdict(_totals)
+        self._endpoints = defaultdict(_totals)
+        self._n_plus_one = Counter()
+
+    def record(self, site, reads=0, writes=0, bytes_read=0, bytes_written=0, elapsed=0.0, single_get=None):
+        """
+        Firestore 작업 1건 기록
+
+        Args:
+            site: 호출 위치
+            single_get: 단건 문서 get이면 해당 문서 경로 (N+1 탐지용)
+        """
+        with self._lock:
+            totals = self._sites[site]
+            totals['calls'] += 1
+            totals['reads'] += reads
+            totals['writes'] += writes
+            totals['bytes_read'] += bytes_read
+            totals['bytes_written'] += bytes_written
+            totals['time_ms'] += elapsed * 1000
+
+        request = _current_request.get()
+        if request is not None:
+            request.reads += reads
+            request.writes += writes
+            request.bytes_read += bytes_read
+            request.bytes_written += bytes_written
+            request.elapsed += elapsed
+            request.sites[site] += 1
+            if single_get:
+                collection = collection_pattern(single_get)
+                request.single_gets[collection] += 1
+                request.single_get_sites[collection][site] += 1
+
+    def begin_request(self, endpoint=None):
+        """현재 컨텍스트에서 요청 계측 시작 (end_request에 넘길 토큰 반환)"""
+        request = RequestStats(endpoint)
+        return request, _current_request.set(request)
+
+    def end_request(self, handle):
+        """요청 계측 종료, 엔드포인트별 집계 및 N+1 경고 후 RequestStats 반환"""
+        request, token = handle
+        try:
+            _current_request.reset(token)
+        except ValueError:
+            _current_request.set(None)
+
+        endpoint = request.endpoint or 'unknown'
+        suspects = request.n_plus_one()
+        with self._lock:
+            totals = self._endpoints[endpoint]
+            totals['calls'] += 1
+            totals['reads'] += request.reads
+            totals['writes'] += request.writes
+            totals['bytes_read'] += request.bytes_read
+            totals['bytes_written'] += request.bytes_written
+            totals['time_ms'] += request.elapsed * 1000
+            for collection in suspects:
+                self._n_plus_one[f"{endpoint} {collection}"] += 1
+
+        for collection, count in suspects.items():
+            sites = ', '.join(site for site, _ in request.single_get_sites[collection].most_common(3))
+            logger.warning(
+                f"Firestore N+1 의심 - {endpoint}: {collection} 단건 get {count}회 "
+                f"(get_all로 묶을 수 있는지 확인, 호출 위치: {sites})"
+            )
+        return request
+
+    def snapshot(self):
+        """메서드별/엔드포인트별 누적 사용량 (엔드포인트는 요청당 평균 포함)"""
+        with self._lock:
+            sites = {site: dict(totals, time_ms=round(totals['time_ms'], 1)) for site, totals in self._sites.items()}
+            endpoints = {}
+            for endpoint, totals in self._endpoints.items():
+                requests = totals['calls'] or 1
+                endpoints[endpoint] = dict(
+                    totals,
+                    time_ms=round(totals['time_ms'], 1),
+                    reads_per_request=round(totals['reads'] / requests, 2),
+                    writes_per_request=round(totals['writes'] / requests, 2)
+                )
+            return {'methods': sites, 'endpoints': endpoints, 'n_plus_one': dict(self._n_plus_one)}
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+            self._endpoints.clear()
+            self._n_plus_one.clear()
+
+
+_metrics = FirestoreMetrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def firestore_snapshot():
+    """전역 Firestore 계측 집계"""
+    return _metrics.snapshot()
+
+
+# ==================== 클라이언트 래퍼 ====================
+
+def _unwrap(value):
+    return value._raw if isinstance(value, _Proxy) else value
+
+
+class _Proxy:
+    """감싼 객체로 나머지 속성을 위임하는 기본 래퍼"""
+
+    def __init__(self, raw, metrics):
+        self._raw = raw
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __eq__(self, other):
+        return self._raw == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._raw)
+
+    def __repr__(self):
+        return f"Instrumented({self._raw!r})"
+
+    def _wrap_snapshot(self, snapshot):
+        return _SnapshotProxy(snapshot, self._metrics) if snapshot is not None else None
+
+    def _read(self, site, call, single_get=None):
+        """스냅샷 1건을 돌려주는 읽기 실행 및 기록"""
+        started = time.perf_counter()
+        snapshot = call()
+        self._metrics.record(site, reads=1, bytes_read=_snapshot_size(snapshot),
+                             elapsed=time.perf_counter() - started, single_get=single_get)
+        return self._wrap_snapshot(snapshot)
+
+    def _write(self, site, call, data=None):
+        started = time.perf_counter()
+        result = call()
+        self._metrics.record(site, writes=1, bytes_written=estimate_size(data) if data else 0,
+                             elapsed=time.perf_counter() - started)
+        return result
+
+    def _stream(self, site, iterator, min_reads=1):
+        """쿼리 결과를 스트리밍하며 문서 수/크기/소요 시간 기록 (쿼리는 결과가 없어도 읽기 1회)"""
+        reads = size = 0
+        elapsed = 0.0
+        iterator = iter(iterator)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    snapshot = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started
+                reads += 1
+                size += _snapshot_size(snapshot)
+                yield self._wrap_snapshot(snapshot)
+        finally:
+            self._metrics.record(site, reads=max(reads, min_reads), bytes_read=size, elapsed=elapsed)
+
+
+class _SnapshotProxy(_Proxy):
+    @property
+    def reference(self):
+        return DocumentProxy(self._raw.reference, self._metrics)
+
+
+class QueryProxy(_Proxy):
+    def _chain(name):
+        def method(self, *args, **kwargs):
+            args = [_unwrap(a) for a in args]
+            return QueryProxy(getattr(self._raw, name)(*args, **kwargs), self._metrics)
+        method.__name__ = name
+        return method
+
+    where = _chain('where')
+    order_by = _chain('order_by')
+    limit = _chain('limit')
+    limit_to_last = _chain('limit_to_last')
+    offset = _chain('offset')
+    select = _chain('select')
+    start_at = _chain('start_at')
+    start_after = _chain('start_after')
+    end_at = _chain('end_at')
+    end_before = _chain('end_before')
+    del _chain
+
+    def stream(self, transaction=None, **kwargs):
+        return self._stream(_call_site(), self._raw.stream(transaction=_unwrap(transaction), **kwargs))
+
+    def get(self, transaction=None, **kwargs):
+        return list(self._stream(_call_site(), self._raw.stream(transaction=_unwrap(transaction), **kwargs)))
+
+    def count(self, alias=None):
+        return _AggregationProxy(self._raw.count(alias=alias), self._metrics)
+
+
+class _AggregationProxy(_Proxy):
+    def get(self, transaction=None, **kwargs):
+        site = _call_site()
+        started = time.perf_counter()
+        result = self._raw.get(transaction=_unwrap(transaction), **kwargs)
+        self._metrics.record(site, reads=1, elapsed=time.perf_counter() - started)
+        return result
+
+
+class CollectionProxy(QueryProxy):
+    def document(self, document_id=None):
+        return DocumentProxy(self._raw.document(document_id), self._metrics)
+
+    def add(self, document_data, document_id=None):
+        site = _call_site()
+        update_time, ref = self._write(site, lambda: self._raw.add(document_data, document_id=document_id),
+                                       document_data)
+        return update_time, DocumentProxy(ref, self._metrics)
+
+    def list_documents(self, *args, **kwargs):
+        for ref in self._raw.list_documents(*args, **kwargs):
+            yield DocumentProxy(ref, self._metrics)
+
+    def on_snapshot(self, callback):
+        site = f"{self._raw.id}.on_snapshot"
+
+        def counted(col_snapshot, changes, read_time):
+            self._metrics.record(site, reads=len(changes),
+                                 bytes_read=sum(_snapshot_size(change.document) for change in changes))
+            return callback(col_snapshot, changes, read_time)
+        return self._raw.on_snapshot(counted)
+
+    @property
+    def parent(self):
+        parent = self._raw.parent
+        return DocumentProxy(parent, self._metrics) if parent is not None else None
+
+
+class DocumentProxy(_Proxy):
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        return self._read(_call_site(), lambda: self._raw.get(
+            field_paths=field_paths, transaction=_unwrap(transaction), **kwargs), single_get=self._raw.path)
+
+    def set(self, document_data, merge=False):
+        return self._write(_call_site(), lambda: self._raw.set(document_data, merge=merge), document_data)
+
+    def update(self, field_updates, option=None):
+        if option is None:
+            return self._write(_call_site(), lambda: self._raw.update(field_updates), field_updates)
+        return self._write(_call_site(), lambda: self._raw.update(field_updates, option=option), field_updates)
+
+    def create(self, document_data):
+        return self._write(_call_site(), lambda: self._raw.create(document_data), document_data)
+
+    def delete(self, option=None):
+        return self._write(_call_site(), lambda: self._raw.delete(option=option))
+
+    def collection(self, collection_id):
+        return CollectionProxy(self._raw.collection(collection_id), self._metrics)
+
+    @property
+    def parent(self):
+        return CollectionProxy(self._raw.parent, self._metrics)
+
+
+class WriteBatchProxy(_Proxy):
+    """쓰기는 모아 두었다가 commit 시점에 건수/바이트/지연을 한 번에 기록"""
+
+    def __init__(self, raw, metrics):
+        super().__init__(raw, metrics)
+        self._staged = 0
+        self._bytes = 0
+
+    def _stage(self, data):
+        self._staged += 1
+        self._bytes += estimate_size(data) if data else 0
+
+    def create(self, reference, document_data):
+        self._stage(document_data)
+        return self._raw.create(_unwrap(reference), document_data)
+
+    def set(self, reference, document_data, merge=False):
+        self._stage(document_data)
+        return self._raw.set(_unwrap(reference), document_data, merge=merge)
+
+    def update(self, reference, field_updates, option=None):
+        self._stage(field_updates)
+        if option is None:
+            return self._raw.update(_unwrap(reference), field_updates)
+        return self._raw.update(_unwrap(reference), field_updates, option=option)
+
+    def delete(self, reference, option=None):
+        self._stage(None)
+        return self._raw.delete(_unwrap(reference), option=option)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def commit(self, *args, **kwargs):
+        site = _call_site()
+        started = time.perf_counter()
+        try:
+            return self._raw.commit(*args, **kwargs)
+        finally:
+            self._metrics.record(site, writes=self._staged, bytes_written=self._bytes,
+                                 elapsed=time.perf_counter() - started)
+            self._staged = self._bytes = 0
+
+
+class TransactionProxy(WriteBatchProxy):
+    """
+    트랜잭션 래퍼 (@firestore.transactional 에 그대로 전달 가능)
+
+    트랜잭션 커밋은 라이브러리 내부에서 호출되므로 쓰기는 스테이징 시점에 기록
+    """
+
+    def _stage(self, data):
+        self._metrics.record(_call_site(), writes=1, bytes_written=estimate_size(data) if data else 0)
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, DocumentProxy):
+            return iter([ref_or_query.get(transaction=self._raw, **kwargs)])
+        return self._stream(_call_site(), self._raw.get(_unwrap(ref_or_query), **kwargs))
+
+
+class InstrumentedFirestore(_Proxy):
+    """
+    Firestore 클라이언트 래퍼
+
+    collection/document/collection_group/get_all/batch/transaction 이 돌려주는 객체도
+    모두 계측 래퍼이며, 그 밖의 속성은 원래 클라이언트로 위임합니다.
+    """
+
+    def __init__(self, client, metrics=None):
+        super().__init__(client, metrics or _metrics)
+
+    def collection(self, *path):
+        return CollectionProxy(self._raw.collection(*path), self._metrics)
+
+    def document(self, *path):
+        return DocumentProxy(self._raw.document(*path), self._metrics)
+
+    def collection_group(self, collection_id):
+        return QueryProxy(self._raw.collection_group(collection_id), self._metrics)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = [_unwrap(ref) for ref in references]
+        return self._stream(_call_site(), self._raw.get_all(
+            references, field_paths=field_paths, transaction=_unwrap(transaction), **kwargs), min_reads=0)
+
+    def batch(self):
+        return WriteBatchProxy(self._raw.batch(), self._metrics)
+
+    def transaction(self, **kwargs):
+        return TransactionProxy(self._raw.transaction(**kwargs), self._metrics)
+
+
+def instrument_firestore(client, metrics=None):
+    """Firestore 클라이언트를 계측 래퍼로 감쌈 (None이면 그대로 반환)"""
+    if client is None or isinstance(client, InstrumentedFirestore):
+        return client
+    return InstrumentedFirestore(client, metrics)
@@ -0,0 +1,210 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from config import Config
+from utils.logger import setup_logger
+import asyncio
+import math
+import threading
+
+logger = setup_logger(__name__)
+
+# 동기 경로의 1차/헤지 호출 실행용 풀 (진 쪽 호출은 취소할 수 없어 끝까지 실행됨)
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=Config.AI_HEDGE_WORKERS,
+    thread_name_prefix='ai-hedge'
+)
+
+
+class CallSite:
+    """
+    호출 지점별 지연 시간 분포와 헤지 통계
+
+    - 최근 성공 호출 지연 시간으로 헤지 임계값(백분위) 계산
+    - 헤지 요청 수는 전체 호출 수의 budget 비율로 제한
+    """
+
+    def __init__(self, name, percentile=95, min_samples=20, min_delay=1.0, budget=0.1, sample_size=500):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget
+        self._latencies = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'primary_wins': 0, 'budget_exhausted': 0}
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def quantile(self, percentile):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def hedge_delay(self):
+        """헤지 요청을 보낼 대기 시간, 표본이 부족하면 None"""
+        with self._lock:
+            self.stats['calls'] += 1
+            enough = len(self._latencies) >= self.min_samples
+        if not enough:
+            return None
+        return max(self.min_delay, self.quantile(self.percentile))
+
+    def try_acquire_hedge(self):
+        """예산 안에서 헤지 요청 1회 허용 여부"""
+        with self._lock:
+            if self.stats['hedged'] + 1 > self.budget * self.stats['calls']:
+                self.stats['budget_exhausted'] += 1
+                return False
+            self.stats['hedged'] += 1
+            return True
+
+    def record_winner(self, hedge_won):
+        with self._lock:
+            self.stats['hedge_wins' if hedge_won else 'primary_wins'] += 1
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        hedged = stats['hedge_wins'] + stats['primary_wins']
+        stats['hedge_win_rate'] = stats['hedge_wins'] / hedged if hedged else 0.0
+        stats['hedge_rate'] = stats['hedged'] / stats['calls'] if stats['calls'] else 0.0
+        stats['p50'] = self.quantile(50)
+        stats['p95'] = self.quantile(95)
+        stats['p99'] = self.quantile(99)
+        return stats
+
+
+_call_sites = {}
+_call_sites_lock = threading.Lock()
+
+
+def get_call_site(name):
+    """이름별 공유 CallSite (최초 호출 시 Config 값으로 생성)"""
+    with _call_sites_lock:
+        site = _call_sites.get(name)
+        if site is None:
+            site = CallSite(
+                name,
+                percentile=Config.AI_HEDGE_PERCENTILE,
+                min_samples=Config.AI_HEDGE_MIN_SAMPLES,
+                min_delay=Config.AI_HEDGE_MIN_DELAY,
+                budget=Config.AI_HEDGE_BUDGET
+            )
+            _call_sites[name] = site
+        return site
+
+
+def call_site_snapshots():
+    """등록된 모든 호출 지점의 지연/헤지 통계"""
+    with _call_sites_lock:
+        sites = list(_call_sites.values())
+    return {site.name: site.snapshot() for site in sites}
+
+
+_NO_RESULT = object()
+
+
+def _is_valid_response(result):
+    """헤지 경쟁에서 승자로 인정할 결과인지 (None이나 text가 빈 응답은 제외)"""
+    if result is None:
+        return False
+    return bool(getattr(result, 'text', True))
+
+
+def hedged_call(fn, site, max_delay=None):
+    """
+    fn()을 실행하고, 임계값 안에 끝나지 않으면 같은 호출을 한 번 더 보내 먼저 성공한 결과 사용
+
+    빈 응답(text 없음)은 승리로 치지 않고 다른 쪽 호출을 계속 기다림
+    둘 다 유효하지 않으면 마지막 빈 응답을 반환하거나 마지막 예외를 발생
+
+    Args:
+        fn: 인자 없는 호출 함수 (예외를 발생시키면 실패)
+        site: CallSite
+        max_delay: 헤지를 보낼 수 있는 최대 대기 시간 (남은 마감 시간 등), 넘으면 헤지 생략
+    """
+    delay = site.hedge_delay()
+    if delay is None or (max_delay is not None and delay >= max_delay):
+        return fn()
+
+    primary = _hedge_executor.submit(fn)
+    done, _ = wait([primary], timeout=delay)
+    if done or not site.try_acquire_hedge():
+        return primary.result()
+
+    logger.info(f"[hedge:{site.name}] {delay:.1f}초 내 응답 없음 - 헤지 요청 전송")
+    hedge = _hedge_executor.submit(fn)
+    pending = {primary, hedge}
+    last_error = None
+    invalid_result = _NO_RESULT
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if not _is_valid_response(result):
+                invalid_result = result
+                continue
+            site.record_winner(future is hedge)
+            return result
+
+    if invalid_result is not _NO_RESULT:
+        return invalid_result
+    raise last_error
+
+
+async def hedged_call_async(coro_factory, site, max_delay=None):
+    """
+    hedged_call의 비동기 버전 (진 쪽 호출은 취소, 빈 응답 처리는 동일)
+
+    Args:
+        coro_factory: 호출마다 새 코루틴을 만드는 인자 없는 함수
+    """
+    delay = site.hedge_delay()
+    if delay is None or (max_delay is not None and delay >= max_delay):
+        return await coro_factory()
+
+    primary = asyncio.ensure_future(coro_factory())
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done or not site.try_acquire_hedge():
+        return await primary
+
+    logger.info(f"[hedge:{site.name}] {delay:.1f}초 내 응답 없음 - 헤지 요청 전송")
+    hedge = asyncio.ensure_future(coro_factory())
+    pending = {primary, hedge}
+    last_error = None
+    invalid_result = _NO_RESULT
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if not _is_valid_response(result):
+                    invalid_result = result
+                    continue
+                site.record_winner(task is hedge)
+                return result
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if invalid_result is not _NO_RESULT:
+        return invalid_result
+    raise last_error
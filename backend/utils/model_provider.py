@@ -0,0 +1,214 @@
+"""
+생성 모델 공급자 (AI_PROVIDER)
+
+- vertex: Vertex AI GenerativeModel (실제 호출, 과금)
+- stub: 네트워크 없이 프롬프트 종류별 고정 응답을 돌려주는 로컬 모델
+        (지연 분포와 429/500/빈 응답 주입으로 재시도·서킷 브레이커·동시성 부하 테스트용)
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from google.api_core import exceptions as google_exceptions
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CHOICE_IDS = ['A', 'B', 'C', 'D']
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal', 'exponential')
+
+# 프롬프트 종류 판별 키워드 (앞에서부터 먼저 일치하는 종류)
+_PROMPT_KINDS = (
+    ('weakness', ('커리큘럼 카테고리', '카테고리 리스트')),
+    ('solution', ('SAT 수학 튜터', '단계별로 설명')),
+    ('summary', ('performance', 'summary')),
+    ('explanation', ('Explain the solution',)),
+)
+
+# 종류별 고정 응답 (프롬프트 해시로 하나를 고름)
+_CANNED_TEXT = {
+    'solution': (
+        "먼저 식을 정리합니다. 양변에서 상수항 ${n}$를 빼면 변수만 남습니다.\n\n"
+        "그다음 계수로 양변을 나누면 정답 **{answer}**가 나옵니다. 잘 하고 있어요!",
+        "문제의 조건을 식으로 세우면 $x + {n} = {m}$입니다.\n\n"
+        "양변에서 ${n}$를 빼는 이유는 $x$만 남기기 위해서입니다. 따라서 정답은 **{answer}**입니다.",
+    ),
+    'weakness': (
+        "틀린 문제가 대수 영역에 집중되어 있습니다. 일차방정식의 이항 과정을 다시 복습해보세요. "
+        "다음에는 연립방정식 기본 문제로 연습하는 것을 추천합니다.",
+        "기하와 비율 문제에서 실수가 반복되었습니다. 공식을 적용하기 전에 조건을 정리하는 습관을 들여보세요. "
+        "다음 학습으로 비와 비율 단원을 추천합니다.",
+    ),
+    'explanation': (
+        "Subtract {n} from both sides to isolate the variable, then simplify. The correct answer is {answer}.",
+        "Write the condition as $x + {n} = {m}$ and solve for $x$ step by step. The correct answer is {answer}.",
+    ),
+    'summary': (
+        "You answered most questions correctly and reached a solid level. "
+        "The recommended module builds on the topics where your accuracy was lowest.",
+        "Your results show steady progress at this difficulty. "
+        "Practicing the recommended topics will help you move up a level.",
+    ),
+    'text': (
+        "Stub response {n}.",
+    ),
+}
+
+
+class _StubResponse:
+    """generate_content 응답 대체 (text만 제공)"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _prompt_text(contents):
+    """contents(문자열 또는 Part 리스트)를 프롬프트 문자열로 변환"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return '\n'.join(part if isinstance(part, str) else getattr(part, 'text', '') or '' for part in contents)
+    return str(contents)
+
+
+class StubModel:
+    """
+    GenerativeModel 대체 로컬 모델
+
+    응답 내용은 프롬프트 해시로 결정되어 같은 프롬프트에는 항상 같은 응답을 돌려줌
+    (generation_config가 있으면 문제 JSON, 없으면 프롬프트 종류별 텍스트)
+    지연 시간과 오류 주입은 seed로 초기화한 난수로 샘플링
+    """
+
+    def __init__(self, model_name=None, latency_dist=None, latency_ms=None, latency_sigma=None,
+                 rate_429=None, rate_500=None, rate_empty=None, seed=None):
+        self.model_name = model_name or Config.MODEL_FLASH
+        self.latency_dist = latency_dist or Config.AI_STUB_LATENCY_DIST
+        if self.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown AI_STUB_LATENCY_DIST: {self.latency_dist}")
+        self.latency_ms = Config.AI_STUB_LATENCY_MS if latency_ms is None else latency_ms
+        self.latency_sigma = Config.AI_STUB_LATENCY_SIGMA if latency_sigma is None else latency_sigma
+        self.rate_429 = Config.AI_STUB_RATE_429 if rate_429 is None else rate_429
+        self.rate_500 = Config.AI_STUB_RATE_500 if rate_500 is None else rate_500
+        self.rate_empty = Config.AI_STUB_RATE_EMPTY if rate_empty is None else rate_empty
+        self._rng = random.Random(Config.AI_STUB_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    # ==================== 지연 / 오류 주입 ====================
+
+    def _sample(self):
+        """(지연 초, 주입할 결과) 샘플링: 결과는 None(정상) / '429' / '500' / 'empty'"""
+        with self._lock:
+            if self.latency_ms <= 0:
+                latency = 0.0
+            elif self.latency_dist == 'fixed':
+                latency = self.latency_ms
+            elif self.latency_dist == 'uniform':
+                latency = self._rng.uniform(0, 2 * self.latency_ms)
+            elif self.latency_dist == 'exponential':
+                latency = self._rng.expovariate(1.0 / self.latency_ms)
+            else:
+                latency = self.latency_ms * math.exp(self._rng.gauss(0, self.latency_sigma))
+
+            draw = self._rng.random()
+            fault = None
+            if draw < self.rate_429:
+                fault = '429'
+            elif draw < self.rate_429 + self.rate_500:
+                fault = '500'
+            elif draw < self.rate_429 + self.rate_500 + self.rate_empty:
+                fault = 'empty'
+        return latency / 1000.0, fault
+
+    def _respond(self, contents, kwargs, fault):
+        prompt = _prompt_text(contents)
+        kind = self.classify(prompt, kwargs.get('generation_config') is not None)
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats[kind] += 1
+            if fault:
+                self.stats[f"fault_{fault}"] += 1
+
+        if fault == '429':
+            raise google_exceptions.TooManyRequests("stub: resource exhausted")
+        if fault == '500':
+            raise google_exceptions.InternalServerError("stub: internal error")
+        if fault == 'empty':
+            return _StubResponse('')
+        return _StubResponse(self.reply(kind, prompt))
+
+    # ==================== 응답 내용 ====================
+
+    @staticmethod
+    def classify(prompt, json_mode=False):
+        """프롬프트 종류: question(JSON) / solution / weakness / summary / explanation / text"""
+        if json_mode:
+            return 'question'
+        for kind, keywords in _PROMPT_KINDS:
+            if any(keyword in prompt for keyword in keywords):
+                return kind
+        return 'text'
+
+    @staticmethod
+    def reply(kind, prompt):
+        """프롬프트 해시로 결정되는 고정 응답 텍스트"""
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        n, m = digest[1] % 90 + 10, digest[2] % 100 + 100
+        answer = CHOICE_IDS[digest[0] % len(CHOICE_IDS)]
+
+        if kind == 'question':
+            return json.dumps({
+                'text_latex': f"Solve for $x$: $x + {n} = {m}$",
+                'choices': [
+                    {'id': c, 'text': f"${m - n + (i - CHOICE_IDS.index(answer)) * 3}$"}
+                    for i, c in enumerate(CHOICE_IDS)
+                ],
+                'correct_answer': answer,
+                'explanation': f"Subtract ${n}$ from both sides: $x = {m} - {n} = {m - n}$.",
+                'topic': 'Algebra',
+                'subtopic': 'Linear Equations'
+            })
+
+        templates = _CANNED_TEXT.get(kind, _CANNED_TEXT['text'])
+        return templates[digest[3] % len(templates)].format(n=n, m=m, answer=answer)
+
+    # ==================== GenerativeModel 인터페이스 ====================
+
+    def generate_content(self, contents, **kwargs):
+        latency, fault = self._sample()
+        if latency:
+            time.sleep(latency)
+        return self._respond(contents, kwargs, fault)
+
+    async def generate_content_async(self, contents, **kwargs):
+        latency, fault = self._sample()
+        if latency:
+            await asyncio.sleep(latency)
+        return self._respond(contents, kwargs, fault)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+def create_model(model_name=None):
+    """
+    AI_PROVIDER 설정에 맞는 생성 모델 반환
+
+    vertex 모드는 vertexai.init 이후에 호출해야 함
+    """
+    model_name = model_name or Config.MODEL_FLASH
+    if Config.AI_PROVIDER == 'stub':
+        return StubModel(model_name)
+    if Config.AI_PROVIDER != 'vertex':
+        raise ValueError(f"Unknown AI_PROVIDER: {Config.AI_PROVIDER}")
+
+    from vertexai.generative_models import GenerativeModel
+    return GenerativeModel(model_name)
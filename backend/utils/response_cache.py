@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from google.cloud import firestore
+from utils.logger import setup_logger
+import hashlib
+import json
+import threading
+import time
+
+logger = setup_logger(__name__)
+
+
+class TTLCache:
+    """스레드 안전한 LRU + TTL 인메모리 캐시"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """
+    AI 응답 캐시 (콘텐츠 주소 기반)
+
+    키는 프롬프트를 결정하는 입력의 해시이며, 1차로 프로세스 내 LRU/TTL,
+    db가 주어지면 2차로 Firestore(ai_response_cache 컬렉션)를 사용합니다.
+    """
+
+    COLLECTION = 'ai_response_cache'
+
+    def __init__(self, namespace, maxsize, ttl, db=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.db = db
+        self.memory = TTLCache(maxsize, ttl)
+        self.stats = {'hits': 0, 'persistent_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def make_key(*parts):
+        """정규화된 입력으로 캐시 키 생성 (순서가 정해진 값만 전달해야 함)"""
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _ref(self, key):
+        return self.db.collection(self.COLLECTION).document(f"{self.namespace}_{key}")
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        if self.db is not None:
+            try:
+                doc = self._ref(key).get()
+                if doc.exists:
+                    data = doc.to_dict() or {}
+                    if data.get('expires_at', 0) > time.time() and data.get('text'):
+                        self.stats['persistent_hits'] += 1
+                        self.memory.set(key, data['text'])
+                        return data['text']
+            except Exception as e:
+                logger.warning(f"[{self.namespace}] 영구 캐시 조회 실패: {e}")
+
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+
+        if self.db is not None:
+            try:
+                self._ref(key).set({
+                    'namespace': self.namespace,
+                    'text': value,
+                    'created_at': firestore.SERVER_TIMESTAMP,
+                    'expires_at': time.time() + self.ttl
+                })
+            except Exception as e:
+                logger.warning(f"[{self.namespace}] 영구 캐시 저장 실패: {e}")
+
+    def summary(self):
+        total = self.stats['hits'] + self.stats['persistent_hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] + self.stats['persistent_hits']) / total if total else 0.0
+        return dict(self.stats, size=len(self.memory), hit_rate=hit_rate)
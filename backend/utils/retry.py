@@ -0,0 +1,116 @@
+from google.api_core import exceptions as google_exceptions
+import asyncio
+import random
+import time
+
+
+class EmptyResponseError(Exception):
+    """AI 응답이 비어 있음 (재시도 대상)"""
+
+
+# 재시도해도 결과가 같은 클라이언트 측 오류
+NON_RETRYABLE_ERRORS = (
+    google_exceptions.BadRequest,          # 400, InvalidArgument 포함
+    google_exceptions.Unauthorized,        # 401
+    google_exceptions.Forbidden,           # 403, PermissionDenied 포함
+    google_exceptions.NotFound,            # 404
+    google_exceptions.MethodNotImplemented,
+    ValueError,
+    TypeError,
+)
+
+# 일시적인 서버/네트워크 오류
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,     # 429, ResourceExhausted 포함
+    google_exceptions.ServerError,         # 5xx (InternalServerError, ServiceUnavailable 등)
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    google_exceptions.Unknown,
+    EmptyResponseError,
+    ConnectionError,
+    TimeoutError,
+    asyncio.TimeoutError,
+)
+
+
+def is_retryable(error):
+    """예외 타입으로 재시도 여부 판단 (분류되지 않은 예외는 재시도)"""
+    if isinstance(error, NON_RETRYABLE_ERRORS):
+        return False
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, google_exceptions.GoogleAPICallError) and error.code is not None:
+        code = int(error.code)
+        return code == 429 or code >= 500
+    return True
+
+
+class Deadline:
+    """요청 단위 남은 시간 예산 (None이면 제한 없음)"""
+
+    def __init__(self, budget=None):
+        self.expires_at = time.monotonic() + budget if budget is not None else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def cap(self, seconds):
+        """seconds와 남은 시간 중 작은 값 (둘 다 None이면 None)"""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        if seconds is None:
+            return remaining
+        return min(seconds, remaining)
+
+
+class RetryPolicy:
+    """
+    마감 시간을 고려한 재시도 정책
+
+    - 예외 타입 기반 분류 (is_retryable)
+    - 지터가 적용된 지수 백오프 (equal jitter)
+    - 다음 시도가 마감 전에 끝날 수 없으면 조기 포기
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=10.0, expected_attempt_time=5.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.expected_attempt_time = expected_attempt_time
+
+    def backoff(self, attempt):
+        """attempt번째 실패 후 대기 시간 (delay/2 ~ delay 사이 균등 분포)"""
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return random.uniform(delay / 2, delay)
+
+    def next_delay(self, error, attempt, deadline=None, attempt_durations=()):
+        """
+        재시도 전 대기 시간, 재시도하지 않아야 하면 None
+
+        Args:
+            error: 직전 시도의 예외
+            attempt: 직전 시도 번호 (1부터)
+            deadline: Deadline 또는 None
+            attempt_durations: 이번 호출에서 관측된 시도별 소요 시간
+        """
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return None
+
+        delay = self.backoff(attempt)
+
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining is not None:
+                # 관측된 가장 느린 시도를 다음 시도 예상 시간으로 사용
+                expected = max(attempt_durations) if attempt_durations else self.expected_attempt_time
+                if delay + expected > remaining:
+                    return None
+
+        return delay
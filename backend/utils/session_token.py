@@ -0,0 +1,74 @@
+from config import Config
+from utils.logger import setup_logger
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+logger = setup_logger(__name__)
+
+
+class InvalidSessionToken(ValueError):
+    """서명 불일치, 형식 오류 또는 만료된 세션 토큰"""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class SessionTokenSigner:
+    """
+    HMAC-SHA256 서명 세션 토큰 (`<payload>.<signature>`, 둘 다 base64url)
+
+    - 페이로드는 압축 JSON이며 암호화되지 않음 (정답 등 비밀 값은 넣지 말 것)
+    - 만료 시각(exp)은 서명 시 자동 추가
+    """
+
+    def __init__(self, secret=None, ttl=None):
+        secret = secret if secret is not None else Config.SESSION_TOKEN_SECRET
+        if not secret:
+            # 프로세스 임시 키를 쓰면 다른 인스턴스나 재시작 후에는 모든 토큰이 검증 실패
+            raise ValueError("SESSION_TOKEN_SECRET이 설정되지 않았습니다 (모든 인스턴스가 같은 값을 사용해야 함)")
+        self._key = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.ttl = ttl if ttl is not None else Config.SESSION_TOKEN_TTL
+
+    def _signature(self, body):
+        return hmac.new(self._key, body.encode('ascii'), hashlib.sha256).digest()
+
+    def sign(self, payload):
+        """페이로드 dict를 서명된 토큰 문자열로 변환"""
+        data = dict(payload, exp=int(time.time()) + self.ttl)
+        body = _b64encode(json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        return f"{body}.{_b64encode(self._signature(body))}"
+
+    def verify(self, token):
+        """
+        토큰 서명과 만료 시각을 검증하고 페이로드 반환
+
+        Raises:
+            InvalidSessionToken: 검증 실패
+        """
+        if not token or not isinstance(token, str) or token.count('.') != 1:
+            raise InvalidSessionToken("세션 토큰 형식 오류")
+
+        body, signature = token.split('.')
+        try:
+            expected = self._signature(body)
+            valid = hmac.compare_digest(expected, _b64decode(signature))
+        except (ValueError, UnicodeEncodeError):
+            valid = False
+        if not valid:
+            raise InvalidSessionToken("세션 토큰 서명 불일치")
+
+        try:
+            payload = json.loads(_b64decode(body))
+        except ValueError:
+            raise InvalidSessionToken("세션 토큰 페이로드 오류")
+        if not isinstance(payload, dict) or payload.get('exp', 0) < time.time():
+            raise InvalidSessionToken("세션 토큰 만료")
+        return payload
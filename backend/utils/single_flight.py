@@ -0,0 +1,212 @@
+from google.cloud import firestore
+from config import Config
+from utils.logger import setup_logger
+import threading
+import time
+import uuid
+
+try:
+    import redis
+except ImportError:  # Redis 모드를 쓰지 않으면 필요 없음
+    redis = None
+
+logger = setup_logger(__name__)
+
+
+class _Call:
+    """진행 중인 single-flight 호출"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    같은 키의 동시 작업을 한 번만 실행하고 결과를 공유하는 계층
+
+    - 프로세스 내: 같은 키로 들어온 스레드는 첫 호출(리더)의 결과를 기다림
+    - 인스턴스 간: lease가 주어지면 리스를 잡은 인스턴스만 실행하고,
+      나머지는 fetch로 결과가 저장될 때까지 폴링함
+    """
+
+    def __init__(self, lease=None, poll_interval=1.0):
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, fetch=None):
+        """
+        키 단위로 fn 실행을 합침
+
+        Args:
+            key: 작업 키 (예: 'solution:{problem_id}:{prompt_version}')
+            fn: 실제 작업 함수 (결과 저장까지 포함해야 다른 인스턴스가 fetch 가능)
+            fetch: 다른 인스턴스가 저장한 결과 조회 함수 (없으면 None 반환)
+
+        Returns:
+            tuple: (결과, 이 호출이 fn을 직접 실행했는지 여부)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.value, False
+
+        executed = False
+        try:
+            call.value, executed = self._run(key, fn, fetch)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+        return call.value, executed
+
+    def _run(self, key, fn, fetch):
+        if not self.lease:
+            return fn(), True
+
+        give_up_at = time.monotonic() + self.lease.ttl
+        while True:
+            token = self.lease.acquire(key)
+            if token:
+                try:
+                    return fn(), True
+                finally:
+                    self.lease.release(key, token)
+
+            if time.monotonic() >= give_up_at:
+                # 리스 보유 인스턴스가 응답하지 않음 - 직접 실행
+                logger.warning(f"single-flight 리스 대기 시간 초과 - 직접 실행: {key}")
+                return fn(), True
+
+            time.sleep(self.poll_interval)
+
+            if fetch:
+                value = fetch()
+                if value:
+                    logger.info(f"single-flight 다른 인스턴스 결과 공유: {key}")
+                    return value, False
+
+
+class FirestoreLease:
+    """Firestore 문서 기반 리스 (인스턴스 간 single-flight)"""
+
+    def __init__(self, db, ttl, collection='single_flight_leases'):
+        self.db = db
+        self.ttl = ttl
+        self.collection = collection
+
+    def _ref(self, key):
+        # 문서 ID에 '/'는 사용할 수 없음
+        return self.db.collection(self.collection).document(key.replace('/', '_'))
+
+    def acquire(self, key):
+        """리스 획득 시 토큰, 다른 인스턴스가 보유 중이면 None"""
+        ref = self._ref(key)
+        token = str(uuid.uuid4())
+
+        @firestore.transactional
+        def _acquire(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if snapshot.exists:
+                lease = snapshot.to_dict() or {}
+                if lease.get('expires_at', 0) > time.time():
+                    return None
+            transaction.set(ref, {
+                'owner': token,
+                'expires_at': time.time() + self.ttl
+            })
+            return token
+
+        try:
+            return _acquire(self.db.transaction())
+        except Exception as e:
+            logger.error(f"Firestore 리스 획득 실패 - {key}: {e}", exc_info=True)
+            # 리스 저장소 장애 시에는 중복 생성을 감수하고 진행
+            return token
+
+    def release(self, key, token):
+        ref = self._ref(key)
+        try:
+            snapshot = ref.get()
+            if snapshot.exists and (snapshot.to_dict() or {}).get('owner') == token:
+                # 그 사이 다른 인스턴스가 리스를 가져갔다면 삭제하지 않음
+                ref.delete(option=self.db.write_option(last_update_time=snapshot.update_time))
+        except Exception as e:
+            logger.warning(f"Firestore 리스 해제 실패 (TTL 만료 대기) - {key}: {e}")
+
+
+class RedisLease:
+    """Redis SET NX 기반 리스 (로컬/스테이징용 Firestore 대체)"""
+
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, client, ttl, prefix='single_flight:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def acquire(self, key):
+        token = str(uuid.uuid4())
+        try:
+            if self.client.set(self.prefix + key, token, nx=True, px=int(self.ttl * 1000)):
+                return token
+            return None
+        except Exception as e:
+            logger.error(f"Redis 리스 획득 실패 - {key}: {e}", exc_info=True)
+            return token
+
+    def release(self, key, token):
+        try:
+            self.client.eval(self._RELEASE_SCRIPT, 1, self.prefix + key, token)
+        except Exception as e:
+            logger.warning(f"Redis 리스 해제 실패 (TTL 만료 대기) - {key}: {e}")
+
+
+def build_lease(db, ttl):
+    """
+    설정(SINGLE_FLIGHT_BACKEND)에 따른 인스턴스 간 리스, local 모드면 None
+
+    - firestore: Firestore 리스 문서
+    - redis: REDIS_URL의 Redis
+    """
+    backend = Config.SINGLE_FLIGHT_BACKEND
+    if backend == 'firestore' and db is not None:
+        return FirestoreLease(db, ttl)
+    if backend == 'redis':
+        if redis is None:
+            logger.warning("redis 패키지가 없어 인스턴스 간 리스 없이 프로세스 내 모드로 실행합니다.")
+            return None
+        return RedisLease(redis.Redis.from_url(Config.REDIS_URL), ttl)
+    return None
+
+
+def build_single_flight(db):
+    """
+    설정(SINGLE_FLIGHT_BACKEND)에 따라 SingleFlight 생성
+
+    - local: 프로세스 내에서만 합침
+    - firestore: Firestore 리스 문서로 인스턴스 간에도 합침
+    - redis: REDIS_URL의 Redis로 인스턴스 간에도 합침
+    """
+    lease = build_lease(db, Config.SINGLE_FLIGHT_LEASE_TTL)
+
+    logger.info(f"single-flight 모드: {type(lease).__name__ if lease else 'local'}")
+    return SingleFlight(lease=lease, poll_interval=Config.SINGLE_FLIGHT_POLL_INTERVAL)
@@ -0,0 +1,206 @@
+from google.cloud.firestore_v1.transforms import Sentinel, _NumericValue, _ValueList
+from utils.logger import setup_logger
+import threading
+
+logger = setup_logger(__name__)
+
+# Firestore WriteBatch 한 번에 담을 수 있는 최대 쓰기 수
+MAX_BATCH_SIZE = 500
+
+
+def _deep_merge(base, extra):
+    """merge=True set 두 개를 하나로 합칠 때 사용 (맵 필드는 재귀 병합)"""
+    merged = dict(base)
+    for key, value in extra.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _is_transform(value):
+    """Increment/ArrayUnion/ArrayRemove/SERVER_TIMESTAMP 등 서버 측 변환 값 여부"""
+    return isinstance(value, (Sentinel, _NumericValue, _ValueList))
+
+
+def _conflicting_transforms(first, second):
+    """
+    두 쓰기가 같은 필드를 쓰고 그중 하나라도 변환 값이면 True
+
+    (예: Increment(1) 두 번을 dict.update로 합치면 한 번만 남음)
+    """
+    for key in first.keys() & second.keys():
+        a, b = first[key], second[key]
+        if isinstance(a, dict) and isinstance(b, dict):
+            if _conflicting_transforms(a, b):
+                return True
+        elif _is_transform(a) or _is_transform(b):
+            return True
+    return False
+
+
+class _WriteOp:
+    def __init__(self, kind, ref, data, merge=False):
+        self.kind = kind  # 'set' | 'update'
+        self.ref = ref
+        self.data = dict(data)
+        self.merge = merge
+
+
+class UnitOfWork:
+    """
+    요청 단위 Firestore 쓰기 모음
+
+    요청 처리 중 발생하는 set/update를 모아 두었다가 commit() 시
+    최소한의 WriteBatch로 커밋합니다. 같은 문서에 대한 연속 쓰기는
+    하나로 합칩니다 (예: 세션 생성 set + 세션 완료 update → set 1회).
+    commit 이후에 들어온 쓰기(마감 이후 완료된 해설 캐싱 등)는 즉시 실행합니다.
+    """
+
+    def __init__(self, db, name='request'):
+        self.db = db
+        self.name = name
+        self.committed = False
+        self._ops = []
+        self._last_op_by_path = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'staged': 0,      # 서비스가 요청한 쓰기 수
+            'coalesced': 0,   # 다른 쓰기에 합쳐진 수
+            'writes': 0,      # 실제 Firestore에 커밋된 문서 쓰기 수
+            'batches': 0,     # WriteBatch commit 호출 수
+            'late_writes': 0  # commit 이후 즉시 실행된 쓰기 수
+        }
+
+    def set(self, ref, data, merge=False):
+        self._stage(_WriteOp('set', ref, data, merge=merge))
+
+    def update(self, ref, data):
+        self._stage(_WriteOp('update', ref, data))
+
+    def _stage(self, op):
+        with self._lock:
+            self.stats['staged'] += 1
+
+            if self.committed:
+                self.stats['late_writes'] += 1
+                late = True
+            else:
+                late = False
+                last = self._last_op_by_path.get(op.ref.path)
+                if last is not None and self._coalesce(last, op):
+                    self.stats['coalesced'] += 1
+                    return
+                self._ops.append(op)
+                self._last_op_by_path[op.ref.path] = op
+
+        if late:
+            self._apply(op)
+
+    @staticmethod
+    def _coalesce(last, op):
+        """가능하면 op를 같은 문서의 직전 쓰기에 합침"""
+        # 점(.) 경로 업데이트는 필드 경로 의미가 달라 합치지 않음
+        if op.kind == 'update' and any('.' in key for key in op.data):
+            return False
+        # 같은 필드의 변환 값은 서버에서 차례로 적용되어야 하므로 합치지 않음
+        if _conflicting_transforms(last.data, op.data):
+            return False
+
+        if op.kind == 'set' and not op.merge:
+            # 전체 덮어쓰기는 이전 쓰기를 대체
+            last.kind, last.data, last.merge = 'set', dict(op.data), False
+            return True
+
+        if op.kind == 'set' and op.merge:
+            if last.kind == 'set':
+                last.data = _deep_merge(last.data, op.data)
+                return True
+            return False
+
+        # op.kind == 'update': 최상위 필드 교체
+        if last.kind == 'set' and not last.merge:
+            last.data.update(op.data)
+            return True
+        if last.kind == 'update':
+            last.data.update(op.data)
+            return True
+        return False
+
+    @staticmethod
+    def _apply(op):
+        if op.kind == 'set':
+            op.ref.set(op.data, merge=op.merge)
+        else:
+            op.ref.update(op.data)
+
+    def commit(self):
+        """
+        모아 둔 쓰기를 WriteBatch로 커밋
+
+        배치 커밋이 실패하면 (예: 존재하지 않는 문서 update) 해당 배치의
+        쓰기를 개별 실행하여 나머지 쓰기는 보존합니다.
+
+        Returns:
+            dict: 쓰기 통계
+        """
+        with self._lock:
+            if self.committed:
+                return self.summary()
+            self.committed = True
+            ops = self._ops
+            self._ops = []
+            self._last_op_by_path = {}
+
+        for start in range(0, len(ops), MAX_BATCH_SIZE):
+            chunk = ops[start:start + MAX_BATCH_SIZE]
+            try:
+                batch = self.db.batch()
+                for op in chunk:
+                    if op.kind == 'set':
+                        batch.set(op.ref, op.data, merge=op.merge)
+                    else:
+                        batch.update(op.ref, op.data)
+                batch.commit()
+                self.stats['batches'] += 1
+                self.stats['writes'] += len(chunk)
+            except Exception as e:
+                logger.error(f"[{self.name}] 배치 커밋 실패 - 개별 쓰기로 재시도: {e}", exc_info=True)
+                for op in chunk:
+                    try:
+                        self._apply(op)
+                        self.stats['writes'] += 1
+                    except Exception as op_error:
+                        logger.error(f"[{self.name}] 쓰기 실패 - {op.ref.path}: {op_error}")
+
+        summary = self.summary()
+        logger.info(
+            f"[{self.name}] Firestore 쓰기 통계 - 요청: {summary['staged']}, "
+            f"병합: {summary['coalesced']}, 커밋: {summary['writes']}, "
+            f"배치: {summary['batches']}, 증폭률: {summary['amplification']:.2f}"
+        )
+        return summary
+
+    def summary(self):
+        """쓰기 통계 (amplification = 실제 쓰기 / 서비스 요청 쓰기)"""
+        stats = dict(self.stats)
+        committed_writes = stats['writes'] + stats['late_writes']
+        stats['amplification'] = committed_writes / stats['staged'] if stats['staged'] else 0.0
+        return stats
+
+
+def stage_set(ref, data, uow=None, merge=False):
+    """uow가 있으면 쓰기를 모으고, 없으면 즉시 set"""
+    if uow is not None:
+        uow.set(ref, data, merge=merge)
+    else:
+        ref.set(data, merge=merge)
+
+
+def stage_update(ref, data, uow=None):
+    """uow가 있으면 쓰기를 모으고, 없으면 즉시 update"""
+    if uow is not None:
+        uow.update(ref, data)
+    else:
+        ref.update(data)